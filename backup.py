@@ -0,0 +1,223 @@
+"""Backups online do banco com a API de backup do SQLite.
+
+A cópia é feita em passos de poucas páginas enquanto o bot segue
+atendendo; cada snapshot é conferido (quick_check), comprimido com gzip e
+apenas os mais recentes são mantidos.
+
+A restauração deve ser feita com o bot parado:
+
+    python backup.py restaurar backups/tarefas_bot-20250101-030000.db.gz
+"""
+import argparse
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+# Páginas copiadas por passo e pausa entre passos (os escritores entram nas pausas)
+PAGINAS_POR_PASSO = 256
+PAUSA_ENTRE_PASSOS = 0.005
+
+# Recomeços tolerados (o SQLite reinicia a cópia quando outra conexão escreve
+# no meio dela) antes de copiar o restante em um passo só
+MAX_RECOMECOS = 3
+
+
+class ResultadoBackup(NamedTuple):
+    """Snapshot gravado por fazer_backup"""
+    caminho: str
+    tamanho: int
+    tamanho_banco: int
+    duracao: float
+    passos: int
+    removidos: int
+
+
+class _Recomecou(Exception):
+    """A cópia recomeçou vezes demais"""
+
+
+def nome_base(db_name: str) -> str:
+    """Prefixo dos arquivos de backup de um banco (nome do arquivo sem extensão)"""
+    return os.path.splitext(os.path.basename(db_name))[0]
+
+
+def listar_backups(diretorio: str, base: str) -> List[str]:
+    """Backups de ``base`` em ``diretorio``, do mais antigo ao mais recente"""
+    return sorted(glob.glob(os.path.join(glob.escape(diretorio), f"{glob.escape(base)}-*.db.gz")))
+
+
+def _copiar(origem: sqlite3.Connection, destino: sqlite3.Connection,
+            paginas: int, pausa: float) -> int:
+    """Copia o banco em passos de ``paginas`` páginas; retorna quantos passos deu"""
+    estado = {'passos': 0, 'recomecos': 0, 'restante': None}
+
+    def progresso(status, restante, total):
+        estado['passos'] += 1
+        if estado['restante'] is not None and restante > estado['restante']:
+            estado['recomecos'] += 1
+            if estado['recomecos'] > MAX_RECOMECOS:
+                raise _Recomecou()
+        estado['restante'] = restante
+        time.sleep(pausa)
+
+    try:
+        origem.backup(destino, pages=paginas, progress=progresso)
+    except _Recomecou:
+        # Muitas escritas concorrentes: termina em um passo (bloqueia só agora)
+        origem.backup(destino, pages=-1)
+        estado['passos'] += 1
+    return estado['passos']
+
+
+def fazer_backup(origem: sqlite3.Connection, diretorio: str, base: str, manter: int = 7,
+                 paginas: int = PAGINAS_POR_PASSO, pausa: float = PAUSA_ENTRE_PASSOS) -> ResultadoBackup:
+    """Grava um snapshot comprimido de ``origem`` e remove os excedentes
+
+    O snapshot só recebe o nome final depois de conferido e comprimido, então
+    um backup interrompido nunca aparece em listar_backups. Mantém os
+    ``manter`` mais recentes (0 mantém todos).
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    inicio = time.monotonic()
+    caminho = os.path.join(diretorio, f"{base}-{datetime.now():%Y%m%d-%H%M%S}.db.gz")
+
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix=".db.parcial")
+    os.close(descritor)
+    try:
+        destino = sqlite3.connect(temporario)
+        try:
+            passos = _copiar(origem, destino, paginas, pausa)
+            resultado = destino.execute("PRAGMA quick_check").fetchone()[0]
+            if resultado != "ok":
+                raise sqlite3.DatabaseError(f"cópia inconsistente: {resultado}")
+        finally:
+            destino.close()
+
+        tamanho_banco = os.path.getsize(temporario)
+        with open(temporario, "rb") as entrada, gzip.open(caminho + ".parcial", "wb") as saida:
+            shutil.copyfileobj(entrada, saida)
+        os.replace(caminho + ".parcial", caminho)
+    finally:
+        for sobra in (temporario, caminho + ".parcial"):
+            if os.path.exists(sobra):
+                os.remove(sobra)
+
+    removidos = 0
+    if manter > 0:
+        for antigo in listar_backups(diretorio, base)[:-manter]:
+            os.remove(antigo)
+            removidos += 1
+
+    return ResultadoBackup(
+        caminho=caminho,
+        tamanho=os.path.getsize(caminho),
+        tamanho_banco=tamanho_banco,
+        duracao=time.monotonic() - inicio,
+        passos=passos,
+        removidos=removidos
+    )
+
+
+def verificar(caminho: str) -> Optional[str]:
+    """Roda integrity_check em um banco descomprimido; None se estiver íntegro"""
+    # Sem mode=ro: ao fechar, o SQLite consegue apagar os -wal/-shm que criou
+    conn = sqlite3.connect(caminho)
+    try:
+        resultado = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if resultado != "ok":
+            return resultado
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tarefas'").fetchone():
+            return "tabela tarefas ausente"
+        return None
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    finally:
+        conn.close()
+
+
+def restaurar(arquivo: str, db_name: str) -> str:
+    """Substitui ``db_name`` pelo backup ``arquivo`` (.db.gz ou .db)
+
+    O backup é descomprimido ao lado do banco e conferido com
+    integrity_check antes da troca; se falhar, nada é alterado. O banco
+    atual é consolidado (checkpoint do WAL) e guardado como
+    ``<banco>.antes-restauracao``. Retorna o caminho dessa cópia.
+    """
+    diretorio = os.path.dirname(os.path.abspath(db_name))
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix=".db.restauracao")
+    os.close(descritor)
+    try:
+        abrir = gzip.open if arquivo.endswith(".gz") else open
+        with abrir(arquivo, "rb") as entrada, open(temporario, "wb") as saida:
+            shutil.copyfileobj(entrada, saida)
+
+        erro = verificar(temporario)
+        if erro:
+            raise sqlite3.DatabaseError(f"backup {arquivo} não passou na verificação: {erro}")
+
+        anterior = db_name + ".antes-restauracao"
+        if os.path.exists(db_name):
+            conn = sqlite3.connect(db_name)
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                conn.close()
+            os.replace(db_name, anterior)
+        for sufixo in ("-wal", "-shm"):
+            if os.path.exists(db_name + sufixo):
+                os.remove(db_name + sufixo)
+
+        os.replace(temporario, db_name)
+        return anterior
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backup e restauração do banco do Ashy Task")
+    parser.add_argument("--banco", default="tarefas_bot.db", help="arquivo do banco (padrão: tarefas_bot.db)")
+    parser.add_argument("--diretorio", default=os.getenv("BACKUP_DIR", "backups"), help="pasta dos backups")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    comandos.add_parser("listar", help="lista os backups disponíveis")
+    criar = comandos.add_parser("criar", help="grava um backup agora")
+    criar.add_argument("--manter", type=int, default=int(os.getenv("BACKUP_MANTER", "7")))
+    restaurar_cmd = comandos.add_parser("restaurar", help="restaura um backup (com o bot parado)")
+    restaurar_cmd.add_argument("arquivo")
+
+    args = parser.parse_args(argv)
+    base = nome_base(args.banco)
+
+    if args.comando == "listar":
+        for caminho in listar_backups(args.diretorio, base):
+            print(f"{caminho}  {os.path.getsize(caminho) / 1024:.1f} KiB")
+        return 0
+
+    if args.comando == "criar":
+        conn = sqlite3.connect(args.banco)
+        try:
+            resultado = fazer_backup(conn, args.diretorio, base, args.manter)
+        finally:
+            conn.close()
+        print(f"{resultado.caminho}: {resultado.tamanho / 1024:.1f} KiB em {resultado.duracao:.2f}s")
+        return 0
+
+    try:
+        anterior = restaurar(args.arquivo, args.banco)
+    except (OSError, sqlite3.DatabaseError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    print(f"{args.banco} restaurado de {args.arquivo} (banco anterior em {anterior})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
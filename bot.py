@@ -1,27 +1,39 @@
 import logging
+import re
+import secrets
 import warnings
 import os
+import tempfile
+from contextvars import ContextVar
 from typing import Dict, Optional
 from dotenv import load_dotenv
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ChatMember
+from telegram.error import BadRequest
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
     MessageHandler,
     ConversationHandler,
+    TypeHandler,
     filters,
     ContextTypes
 )
 from telegram.warnings import PTBUserWarning
 from datetime import datetime
+from urllib.parse import urlsplit
+
+# Carregar variáveis de ambiente (antes de abrir o banco, que lê DB_* do .env)
+load_dotenv()
 
-from database import Database
 from keyboards import *
 import handlers
-
-# Carregar variáveis de ambiente
-load_dotenv()
+from importacao import COLUNAS_EXPORTACAO, FORMATOS, formato_do_arquivo
+from shards import chat_atual
+from envio import LimitadorEnvio, PRIORIDADE_FUNDO
+from processamento import FilaUpdates, ProcessadorPorUsuario
+from rotas import RoteadorCallbacks
+from cache import CacheLRU
 
 # Filtrar aviso específico do ConversationHandler
 warnings.filterwarnings("ignore", category=PTBUserWarning, message=".*per_message.*")
@@ -48,13 +60,71 @@ ADD_COMENTARIO = 10
 # Estados para changelog
 CHANGELOG_CATEGORIA, CHANGELOG_DESCRICAO = range(11, 13)
 
-# Inicializar banco de dados
-db = Database()
+# Banco de dados (mesmo roteador de shards usado em handlers.py)
+db = handlers.db
 
 # Constantes
 CATEGORIAS = ["XFCE", "Cinnamon", "GNOME", "Geral"]
 STATUS = ["pendente", "em_andamento", "concluido"]
 
+# Resposta quando uma alteração condicionada (status visto, autoria) não encontra a tarefa como esperado
+TAREFA_MUDOU = "⚠️ A tarefa mudou enquanto isso; nada foi alterado"
+
+# Rotas dos botões inline (registradas com @rotas.rota junto de cada função)
+rotas = RoteadorCallbacks()
+
+# Se o callback em despacho já foi respondido (ver responder)
+callback_respondido: ContextVar[bool] = ContextVar("callback_respondido", default=False)
+
+# Texto e botões de cada versão de tarefa, compartilhados por todos que a veem
+cache_render = CacheLRU(int(os.getenv("CACHE_RENDER", "512")), ttl=None)
+
+# Renderização mostrada em cada mensagem (chat, mensagem): reeditar igual seria recusado
+renderizacoes_exibidas = CacheLRU(2048, ttl=3600)
+edicoes_evitadas = 0
+
+# Tarefas por página nas listas com botões
+TAREFAS_POR_PAGINA = 20
+
+# IDs de usuários com acesso administrativo em qualquer chat (ADMIN_IDS no .env)
+ADMIN_IDS = {int(uid) for uid in os.getenv("ADMIN_IDS", "").replace(",", " ").split() if uid.isdigit()}
+
+# Tarefas concluídas há mais que estes dias vão para o arquivo (ARQUIVO_DIAS no .env; 0 desliga)
+ARQUIVO_DIAS = int(os.getenv("ARQUIVO_DIAS", "30"))
+
+# Backups automáticos: pasta, quantos manter e intervalo em horas (0 desliga o agendamento)
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_MANTER = int(os.getenv("BACKUP_MANTER", "7"))
+BACKUP_INTERVALO_HORAS = float(os.getenv("BACKUP_INTERVALO_HORAS", "24"))
+
+# Fila de envio: todo pedido à API do Telegram passa por aqui (limites de flood do Telegram)
+limitador = LimitadorEnvio(
+    global_por_segundo=float(os.getenv("ENVIO_GLOBAL_POR_SEGUNDO", "30")),
+    grupo_por_minuto=float(os.getenv("ENVIO_GRUPO_POR_MINUTO", "20"))
+)
+
+# Updates processados ao mesmo tempo (usuários diferentes; os de um mesmo usuário seguem em ordem)
+processador = ProcessadorPorUsuario(int(os.getenv("UPDATES_CONCORRENTES", "8")))
+
+# Tipos de update que os handlers tratam (o Telegram não envia os demais)
+UPDATES_TRATADOS = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+# Updates recebidos e ainda não processados; cheia, a recepção espera (0 = sem limite)
+FILA_UPDATES = int(os.getenv("FILA_UPDATES", "256"))
+
+# Updates retirados da fila e ainda não concluídos (em andamento ou esperando a vez do usuário)
+fila_updates = FilaUpdates(FILA_UPDATES, max_em_voo=int(os.getenv("UPDATES_EM_VOO", "64")))
+
+# Modo webhook: com WEBHOOK_URL (URL pública, https) o bot sobe um servidor HTTP
+# em vez de consultar o Telegram por polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_MAX_CONEXOES = int(os.getenv("WEBHOOK_MAX_CONEXOES", "40"))
+WEBHOOK_CERT = os.getenv("WEBHOOK_CERT") or None
+WEBHOOK_KEY = os.getenv("WEBHOOK_KEY") or None
+
 
 def keyboard_filtros():
     """Teclado com filtros de status e categoria"""
@@ -68,6 +138,7 @@ def keyboard_filtros():
         ],
         [
             InlineKeyboardButton("✅ Concluídas", callback_data="filtro_status_concluido"),
+            InlineKeyboardButton("🗄️ Arquivo", callback_data="filtro_arquivo"),
         ],
         [
             InlineKeyboardButton("🖥️ Por Categoria", callback_data="filtro_categorias"),
@@ -101,6 +172,7 @@ Este bot ajuda a organizar as tarefas da equipe de desenvolvimento.
 /tarefas - Ver todas as tarefas
 /minhas - Ver suas tarefas
 /buscar [termo] - Buscar tarefas
+/arquivo - Ver tarefas arquivadas
 /comentar [id] [texto] - Adicionar comentário
 /addcategoria [nome] - Criar nova categoria
 /changelog - Gerenciar mudanças do projeto
@@ -134,6 +206,7 @@ async def ajuda(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /tarefas - Listar todas as tarefas
 /minhas - Ver apenas suas tarefas
 /buscar [termo] - Buscar tarefas por palavra-chave
+/arquivo - Ver tarefas concluídas arquivadas
 /comentar [id] [texto] - Adicionar comentário em uma tarefa
 /addcategoria [nome] - Criar uma nova categoria
 /changelog - Gerenciar mudanças do projeto
@@ -185,7 +258,14 @@ async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(mensagem, parse_mode='Markdown')
         return
 
-    stats = db.estatisticas()
+    stats = await db.estatisticas()
+
+    await update.message.reply_text(formatar_estatisticas(stats), parse_mode='Markdown')
+
+
+def formatar_estatisticas(stats: dict) -> str:
+    """Monta o texto de /stats a partir do resultado de db.estatisticas()"""
+    prioridades = stats['por_prioridade']
 
     texto = f"""
 📊 *Estatísticas do Ashy Task*
@@ -194,17 +274,17 @@ async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 ⏳ Pendentes: `{stats['pendentes']}`
 🔄 Em andamento: `{stats['em_andamento']}`
-✅ Resolvidas: `{stats['resolvidas']}`
+✅ Resolvidas: `{stats['resolvidas']}` (`{stats['concluidas_semana']}` nos últimos 7 dias)
+
+{PRIORIDADE_EMOJI['alta']} Alta: `{prioridades['alta']}` | {PRIORIDADE_EMOJI['media']} Média: `{prioridades['media']}` | {PRIORIDADE_EMOJI['baixa']} Baixa: `{prioridades['baixa']}`
 """
 
     # Estatísticas por categoria
-    categorias = db.listar_categorias()
-    for cat in categorias:
-        tarefas_cat = db.listar_tarefas(categoria_id=cat['id'], status="pendente")
-        if tarefas_cat:
-            texto += f"\n{cat['nome']}: `{len(tarefas_cat)}` pendente(s)"
+    for nome, contagem in stats['por_categoria'].items():
+        if contagem['pendente']:
+            texto += f"\n{nome}: `{contagem['pendente']}` pendente(s)"
 
-    await update.message.reply_text(texto, parse_mode='Markdown')
+    return texto
 
 
 async def topicoid(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -253,9 +333,7 @@ async def settopico(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         # Se é "off", desabilita
         if topic_id.lower() == 'off':
-            db.salvar_config('topico_permitido', 'off')
-            db.salvar_config('topico_nome', '')
-            db.salvar_config('topico_chat_id', '')
+            await db.salvar_info_topico('off', '', '')
             await message.reply_text(
                 "✅ *Restrição desabilitada!*\n\nO bot agora responderá em qualquer tópico.",
                 parse_mode='Markdown'
@@ -272,7 +350,7 @@ async def settopico(update: Update, context: ContextTypes.DEFAULT_TYPE):
         chat_id = str(message.chat_id)
 
         # Salvar informações completas do tópico
-        db.salvar_info_topico(topic_id, topico_nome, chat_id)
+        await db.salvar_info_topico(topic_id, topico_nome, chat_id)
 
         texto = f"""
 ✅ *Tópico configurado com sucesso!*
@@ -292,15 +370,210 @@ Para desabilitar, use: `/settopico off`
         )
 
 
+async def eh_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Verifica se o usuário é admin: listado em ADMIN_IDS ou administrador do grupo"""
+    user = update.effective_user
+    chat = update.effective_chat
+
+    if user.id in ADMIN_IDS:
+        return True
+
+    if chat.type == chat.PRIVATE:
+        return False
+
+    membro = await context.bot.get_chat_member(chat.id, user.id)
+    return membro.status in (ChatMember.ADMINISTRATOR, ChatMember.OWNER)
+
+
+async def dbinfo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /dbinfo - mostra as configurações do banco em uso (admin)"""
+    if not await eh_admin(update, context):
+        await update.message.reply_text("❌ Apenas administradores podem usar este comando.")
+        return
+
+    info = await db.info_banco()
+
+    texto = "🗄️ *Banco de Dados*\n\n"
+    texto += f"📁 Arquivo: `{info['arquivo']}`\n"
+    texto += f"💾 Tamanho: `{info['tamanho'] / 1024:.1f} KiB`\n"
+    texto += f"🧩 SQLite: `{info['sqlite']}` (schema v{info['schema']})\n"
+    texto += f"🔌 Conexões no pool: `{info['pool']}`\n"
+
+    shards = db.info_shards()
+    if shards['particionado']:
+        texto += (
+            f"🧱 Shards: `{shards['abertos']}/{shards['max_abertos']}` abertos de `{shards['arquivos']}`, "
+            f"`{shards['em_uso']}` em uso "
+            f"(`{shards['aberturas']}` aberturas, `{shards['despejos']}` despejos)\n"
+        )
+
+    cache = info['cache_tarefas']
+    texto += (
+        f"🗃️ Cache de tarefas: `{cache['itens']}/{cache['capacidade']}` "
+        f"({cache['taxa_acerto']:.0%} de acerto, `{cache['acertos']}`/`{cache['erros']}`)\n"
+    )
+
+    fila = info['fila_escrita']
+    texto += (
+        f"✍️ Fila de escrita: `{fila['operacoes']}` escrita(s) em `{fila['lotes']}` commit(s) "
+        f"(lote médio `{fila['lote_medio']:.1f}`, maior `{fila['maior_lote']}`; "
+        f"commit médio `{fila['commit_medio_ms']:.1f} ms`, maior `{fila['maior_commit_ms']:.1f} ms`)\n"
+    )
+
+    envio = limitador.metricas()
+    prioridades = ", ".join(f"{nome} `{total}`" for nome, total in envio['por_prioridade'].items())
+    texto += (
+        f"📮 Envios: `{envio['enviados']}` (`{envio['reenvios']}` após flood control); "
+        f"na fila `{envio['na_fila']}` ({prioridades}), maior `{envio['maior_fila']}`; "
+        f"espera média `{envio['espera_media_ms']:.0f} ms`, maior `{envio['maior_espera_ms']:.0f} ms`\n"
+    )
+
+    updates = processador.metricas()
+    texto += (
+        f"📥 Updates: `{updates['processados']}` processados, `{updates['em_andamento']}/{updates['max_concorrentes']}` "
+        f"em andamento, `{updates['em_voo']}/{fila_updates.max_em_voo}` em voo, "
+        f"`{updates['na_fila']}` na fila de `{updates['usuarios_ativos']}` usuário(s); "
+        f"espera média `{updates['espera_media_ms']:.0f} ms`, p95 `{updates['espera_p95_ms']:.0f} ms`, "
+        f"maior `{updates['maior_espera_ms']:.0f} ms`; processamento médio `{updates['processamento_medio_ms']:.0f} ms`\n"
+    )
+
+    render = cache_render.estatisticas()
+    texto += (
+        f"🖼️ Renderizações: `{render['itens']}/{render['capacidade']}` em cache "
+        f"({render['taxa_acerto']:.0%} de acerto), `{edicoes_evitadas}` edição(ões) repetida(s) evitada(s)\n"
+    )
+
+    botoes = rotas.metricas()
+    texto += f"🔀 Botões: `{botoes['registradas']}` rotas, `{botoes['desconhecidos']}` callback(s) sem rota\n"
+    for rota in botoes['rotas'][:3]:
+        texto += f"• `{rota['rota']}`: `{rota['chamadas']}`x, média `{rota['media_ms']:.0f} ms`, maior `{rota['maior_ms']:.0f} ms`\n"
+    texto += "\n"
+
+    texto += "*⚙️ PRAGMAs em uso:*\n"
+    for nome, valor in info['pragmas'].items():
+        texto += f"• `{nome}`: `{valor}`\n"
+
+    await update.message.reply_text(texto, parse_mode='Markdown')
+
+
+def texto_backup(resultado) -> str:
+    """Resumo de um backup concluído"""
+    texto = f"💾 Backup gravado: {os.path.basename(resultado.caminho)}\n"
+    texto += (
+        f"📦 {resultado.tamanho / 1024:.1f} KiB comprimido "
+        f"({resultado.tamanho_banco / 1024:.1f} KiB de banco)\n"
+    )
+    texto += f"⏱️ {resultado.duracao:.2f}s em {resultado.passos} passo(s)"
+    if resultado.removidos:
+        texto += f"\n🧹 {resultado.removidos} backup(s) antigo(s) removido(s)"
+    return texto
+
+
+async def backup(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /backup - grava um backup do banco agora (admin)"""
+    if not await eh_admin(update, context):
+        await update.message.reply_text("❌ Apenas administradores podem usar este comando.")
+        return
+
+    aviso = await update.message.reply_text("⏳ Gravando backup...")
+    try:
+        resultado = await db.fazer_backup(BACKUP_DIR, BACKUP_MANTER)
+    except Exception as e:
+        logger.error(f"Erro no backup: {e}")
+        await aviso.edit_text(f"❌ Falha no backup: {e}")
+        return
+
+    await aviso.edit_text(texto_backup(resultado))
+
+
+async def importar(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /importar - importa tarefas de um arquivo JSONL ou CSV (admin)
+
+    Aceita o arquivo enviado com a legenda /importar ou em resposta a ele.
+    """
+    if not await eh_admin(update, context):
+        await update.message.reply_text("❌ Apenas administradores podem usar este comando.")
+        return
+
+    message = update.message
+    documento = message.document or (message.reply_to_message.document if message.reply_to_message else None)
+
+    if not documento:
+        await message.reply_text(
+            "📥 *Importar tarefas*\n\n"
+            "Envie um arquivo `.jsonl` ou `.csv` com a legenda `/importar`, "
+            "ou responda ao arquivo com `/importar`.\n\n"
+            "Campos: `titulo`, `categoria` (obrigatórios), `descricao`, `status`, "
+            "`prioridade`, `autor_id`, `autor_nome`, `atribuido_nome`, "
+            "`data_criacao`, `data_conclusao` (epoch ou AAAA-MM-DD HH:MM:SS).",
+            parse_mode='Markdown'
+        )
+        return
+
+    formato = formato_do_arquivo(documento.file_name)
+    if not formato:
+        await message.reply_text("❌ Formato não suportado. Use um arquivo `.jsonl` ou `.csv`.", parse_mode='Markdown')
+        return
+
+    user = update.effective_user
+    descritor, caminho = tempfile.mkstemp(suffix=f".{formato}")
+    os.close(descritor)
+    try:
+        # Baixa para disco e importa em streaming, sem manter o arquivo em memória
+        arquivo = await documento.get_file()
+        await arquivo.download_to_drive(caminho)
+        resultado = await db.importar_arquivo(caminho, formato, user.id, user.first_name)
+    except UnicodeDecodeError:
+        await message.reply_text("❌ O arquivo precisa estar em UTF-8.")
+        return
+    finally:
+        os.remove(caminho)
+
+    texto = f"✅ {resultado['importadas']} tarefa(s) importada(s)."
+    if resultado['total_erros']:
+        texto += f"\n\n⚠️ {resultado['total_erros']} linha(s) ignorada(s):\n"
+        texto += "\n".join(resultado['erros'])
+        if resultado['total_erros'] > len(resultado['erros']):
+            texto += "\n..."
+
+    # Sem Markdown: as mensagens de erro repetem trechos do arquivo
+    await message.reply_text(texto)
+
+
+async def exportar(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /exportar [tabela] [formato] - exporta tarefas, comentários ou changelogs (admin)"""
+    if not await eh_admin(update, context):
+        await update.message.reply_text("❌ Apenas administradores podem usar este comando.")
+        return
+
+    tabela = context.args[0].lower() if context.args else "tarefas"
+    formato = context.args[1].lower() if len(context.args) > 1 else "jsonl"
+
+    if tabela not in COLUNAS_EXPORTACAO or formato not in FORMATOS:
+        await update.message.reply_text(
+            f"Use: `/exportar [{'|'.join(COLUNAS_EXPORTACAO)}] [{'|'.join(FORMATOS)}]`",
+            parse_mode='Markdown'
+        )
+        return
+
+    descritor, caminho = tempfile.mkstemp(suffix=f".{formato}")
+    os.close(descritor)
+    try:
+        total = await db.exportar_arquivo(tabela, caminho, formato)
+        with open(caminho, "rb") as arquivo:
+            await update.message.reply_document(
+                document=arquivo,
+                filename=f"{tabela}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}",
+                caption=f"📤 {total} registro(s) de {tabela}",
+                rate_limit_args=PRIORIDADE_FUNDO
+            )
+    finally:
+        os.remove(caminho)
+
+
 def obter_thread_id_configurado() -> Optional[int]:
     """Retorna o thread_id do tópico configurado, se existir"""
-    topico_config = db.obter_config('topico_permitido')
-    if topico_config and topico_config != 'off':
-        try:
-            return int(topico_config)
-        except (ValueError, TypeError):
-            return None
-    return None
+    return db.topico().thread_id
 
 async def enviar_mensagem_no_topico(bot, chat_id, text, parse_mode='Markdown', reply_markup=None):
     """Envia mensagem no tópico configurado"""
@@ -467,8 +740,7 @@ async def receber_descricao(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['descricao'] = update.message.text
 
     # Buscar categorias do banco
-    categorias = db.listar_categorias()
-    keyboard = selecionar_categoria_nova_tarefa(categorias)
+    keyboard = selecionar_categoria_nova_tarefa(db.catalogo_categorias())
 
     await update.message.reply_text(
         "📁 Selecione a categoria:",
@@ -491,8 +763,7 @@ async def receber_categoria(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['categoria_id'] = categoria_id
 
     # Buscar nome da categoria para mostrar
-    categorias = db.listar_categorias()
-    categoria_nome = next((c['nome'] for c in categorias if c['id'] == categoria_id), "Desconhecida")
+    categoria_nome = db.nome_categoria(categoria_id) or "Desconhecida"
 
     keyboard = selecionar_prioridade()
 
@@ -544,10 +815,9 @@ async def receber_imagem(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
 
     # Buscar nome da categoria para exibir
-    categorias = db.listar_categorias()
-    categoria_nome = next((c['nome'] for c in categorias if c['id'] == context.user_data['categoria_id']), "Desconhecida")
+    categoria_nome = db.nome_categoria(context.user_data['categoria_id']) or "Desconhecida"
 
-    tarefa_id = db.criar_tarefa(
+    tarefa_id = await db.criar_tarefa(
         titulo=context.user_data['titulo'],
         descricao=context.user_data['descricao'],
         categoria_id=context.user_data['categoria_id'],
@@ -589,10 +859,9 @@ async def pular_imagem(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
 
     # Buscar nome da categoria para exibir
-    categorias = db.listar_categorias()
-    categoria_nome = next((c['nome'] for c in categorias if c['id'] == context.user_data['categoria_id']), "Desconhecida")
+    categoria_nome = db.nome_categoria(context.user_data['categoria_id']) or "Desconhecida"
 
-    tarefa_id = db.criar_tarefa(
+    tarefa_id = await db.criar_tarefa(
         titulo=context.user_data['titulo'],
         descricao=context.user_data['descricao'],
         categoria_id=context.user_data['categoria_id'],
@@ -640,7 +909,7 @@ async def processar_mensagem_texto(update: Update, context: ContextTypes.DEFAULT
 
     # Verificar se está criando categoria de tarefa inline
     if 'criando_categoria_tarefa' in context.user_data:
-        sucesso = db.adicionar_categoria(texto)
+        sucesso = await db.adicionar_categoria(texto)
         if sucesso:
             await update.message.reply_text(
                 f"✅ Categoria *{texto}* criada com sucesso!",
@@ -673,8 +942,7 @@ async def processar_mensagem_texto(update: Update, context: ContextTypes.DEFAULT
 
     if context.user_data.get('aguardando') == 'descricao_tarefa':
         context.user_data['descricao'] = texto
-        categorias = db.listar_categorias()
-        keyboard = selecionar_categoria_nova_tarefa(categorias)
+        keyboard = selecionar_categoria_nova_tarefa(db.catalogo_categorias())
         await update.message.reply_text(
             "📁 Selecione a categoria:",
             reply_markup=keyboard
@@ -689,89 +957,55 @@ async def processar_mensagem_texto(update: Update, context: ContextTypes.DEFAULT
 
     # Verificar se está aguardando comentário
     if 'aguardando_comentario' in context.user_data:
-        tarefa_id = context.user_data['aguardando_comentario']
+        tarefa_id = context.user_data.pop('aguardando_comentario')
         user = update.effective_user
-        db.adicionar_comentario(tarefa_id, user.id, user.first_name, texto)
+
+        # A tarefa pode ter sido apagada ou arquivada enquanto o comentário era digitado
+        tarefa = await db.obter_tarefa(tarefa_id)
+        if not tarefa:
+            await update.message.reply_text("❌ Tarefa não encontrada")
+            return
+        if tarefa['arquivada']:
+            await update.message.reply_text("🗄️ Tarefa arquivada não recebe novos comentários")
+            return
+
+        await db.adicionar_comentario(tarefa_id, user.id, user.first_name, texto)
         await update.message.reply_text(f"✅ Comentário adicionado à tarefa #{tarefa_id}!")
-        del context.user_data['aguardando_comentario']
 
         # Mostrar a tarefa novamente
-        tarefa = db.obter_tarefa(tarefa_id)
+        tarefa = await db.obter_tarefa(tarefa_id)
         if tarefa:
-            texto_tarefa = formatar_tarefa(tarefa)
-            keyboard = acoes_tarefa(tarefa_id, tarefa['autor_id'], user.id)
-
-            if tarefa['imagem_file_id']:
-                await update.message.reply_photo(
-                    photo=tarefa['imagem_file_id'],
-                    caption=texto_tarefa,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
-            else:
-                await update.message.reply_text(
-                    texto_tarefa,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
+            await responder_tarefa(update.message, tarefa, user.id)
         return
 
     # Verificar se está editando título
     if 'editando_titulo' in context.user_data:
         tarefa_id = context.user_data['editando_titulo']
         user = update.effective_user
-        db.atualizar_tarefa(tarefa_id, titulo=texto)
-        await update.message.reply_text(f"✅ Título da tarefa #{tarefa_id} atualizado!")
+        tarefa = await db.atualizar_tarefa(tarefa_id, titulo=texto, autor_id=user.id)
         del context.user_data['editando_titulo']
+        if not tarefa:
+            await update.message.reply_text(f"{TAREFA_MUDOU} (#{tarefa_id})")
+            return
+        await update.message.reply_text(f"✅ Título da tarefa #{tarefa_id} atualizado!")
 
-        # Mostrar a tarefa novamente
-        tarefa = db.obter_tarefa(tarefa_id)
-        if tarefa:
-            texto_tarefa = formatar_tarefa(tarefa)
-            keyboard = acoes_tarefa(tarefa_id, tarefa['autor_id'], user.id)
-
-            if tarefa['imagem_file_id']:
-                await update.message.reply_photo(
-                    photo=tarefa['imagem_file_id'],
-                    caption=texto_tarefa,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
-            else:
-                await update.message.reply_text(
-                    texto_tarefa,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
+        # Mostrar a tarefa novamente (a linha já vem da própria alteração)
+        await responder_tarefa(update.message, tarefa, user.id)
         return
 
     # Verificar se está editando descrição
     if 'editando_descricao' in context.user_data:
         tarefa_id = context.user_data['editando_descricao']
         user = update.effective_user
-        db.atualizar_tarefa(tarefa_id, descricao=texto)
-        await update.message.reply_text(f"✅ Descrição da tarefa #{tarefa_id} atualizada!")
+        tarefa = await db.atualizar_tarefa(tarefa_id, descricao=texto, autor_id=user.id)
         del context.user_data['editando_descricao']
+        if not tarefa:
+            await update.message.reply_text(f"{TAREFA_MUDOU} (#{tarefa_id})")
+            return
+        await update.message.reply_text(f"✅ Descrição da tarefa #{tarefa_id} atualizada!")
 
-        # Mostrar a tarefa novamente
-        tarefa = db.obter_tarefa(tarefa_id)
-        if tarefa:
-            texto_tarefa = formatar_tarefa(tarefa)
-            keyboard = acoes_tarefa(tarefa_id, tarefa['autor_id'], user.id)
-
-            if tarefa['imagem_file_id']:
-                await update.message.reply_photo(
-                    photo=tarefa['imagem_file_id'],
-                    caption=texto_tarefa,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
-            else:
-                await update.message.reply_text(
-                    texto_tarefa,
-                    parse_mode='Markdown',
-                    reply_markup=keyboard
-                )
+        # Mostrar a tarefa novamente (a linha já vem da própria alteração)
+        await responder_tarefa(update.message, tarefa, user.id)
         return
 
 
@@ -811,13 +1045,13 @@ async def menu_changelog(update_or_query, is_command=True):
 async def listar_changelogs_inline(query, filtro=None, categoria=None):
     """Lista changelogs com filtros"""
     if filtro == "pinados":
-        changelogs = db.listar_changelogs(pinado=True)
+        changelogs = await db.listar_changelogs(pinado=True)
         titulo = "📌 *Changelogs Pinados*"
     elif categoria:
-        changelogs = db.listar_changelogs(categoria=categoria)
+        changelogs = await db.listar_changelogs(categoria=categoria)
         titulo = f"📍 *Changelog - {categoria}*"
     else:
-        changelogs = db.listar_changelogs()
+        changelogs = await db.listar_changelogs()
         titulo = "📋 *Todos os Changelogs*"
 
     if not changelogs:
@@ -830,16 +1064,14 @@ async def listar_changelogs_inline(query, filtro=None, categoria=None):
 
     for log in changelogs[:15]:  # Limita a 15
         pin_emoji = "📌 " if log['pinado'] else ""
-        data = datetime.fromisoformat(log['data_criacao'])
-        texto += f"{pin_emoji}📍 `{data.strftime('%d/%m/%Y %H:%M')}` - *{log['autor_nome']}*\n"
+        texto += f"{pin_emoji}📍 `{formatar_data(log['data_criacao'])}` - *{log['autor_nome']}*\n"
         texto += f"*{log['categoria']}:* {log['descricao'][:80]}{'...' if len(log['descricao']) > 80 else ''}\n\n"
 
     # Criar botões para cada changelog
     buttons = []
     for log in changelogs[:15]:
         pin_emoji = "📌 " if log['pinado'] else ""
-        data = datetime.fromisoformat(log['data_criacao'])
-        label = f"{pin_emoji}#{log['id']} - {log['categoria']} ({data.strftime('%d/%m %H:%M')})"
+        label = f"{pin_emoji}#{log['id']} - {log['categoria']} ({formatar_data(log['data_criacao'], '%d/%m %H:%M')})"
         buttons.append([InlineKeyboardButton(label, callback_data=f"changelog_ver_{log['id']}")])
 
     buttons.append([InlineKeyboardButton("🔙 Voltar", callback_data="changelog_menu")])
@@ -847,21 +1079,21 @@ async def listar_changelogs_inline(query, filtro=None, categoria=None):
     await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(buttons))
 
 
-async def mostrar_changelog(query, changelog_id: int):
-    """Mostra detalhes de um changelog"""
-    changelog = db.obter_changelog(changelog_id)
+async def mostrar_changelog(query, changelog_id: int, changelog: Optional[dict] = None):
+    """Mostra detalhes de um changelog (o recebido, se já veio de uma alteração)"""
+    if changelog is None:
+        changelog = await db.obter_changelog(changelog_id)
 
     if not changelog:
         await query.edit_message_text("❌ Changelog não encontrado.")
         return
 
     pin_emoji = "📌 " if changelog['pinado'] else ""
-    data = datetime.fromisoformat(changelog['data_criacao'])
 
     texto = f"{pin_emoji}*Changelog #{changelog['id']}*\n\n"
     texto += f"📍 *Categoria:* `{changelog['categoria']}`\n"
     texto += f"👤 *Autor:* `{changelog['autor_nome']}`\n"
-    texto += f"📅 *Data:* `{data.strftime('%d/%m/%Y %H:%M')}`\n\n"
+    texto += f"📅 *Data:* `{formatar_data(changelog['data_criacao'])}`\n\n"
     texto += f"📝 *Descrição:*\n{changelog['descricao']}"
 
     user_id = query.from_user.id
@@ -882,7 +1114,7 @@ async def processar_changelog_texto(update: Update, context: ContextTypes.DEFAUL
 
     # Criando nova categoria
     if 'criando_categoria_changelog' in context.user_data:
-        sucesso = db.adicionar_categoria_changelog(texto)
+        sucesso = await db.adicionar_categoria_changelog(texto)
         if sucesso:
             await update.message.reply_text(
                 f"✅ Categoria *{texto}* criada com sucesso!",
@@ -906,7 +1138,7 @@ async def processar_changelog_texto(update: Update, context: ContextTypes.DEFAUL
     # Editando descrição de changelog
     if 'editando_changelog_desc' in context.user_data:
         changelog_id = context.user_data['editando_changelog_desc']
-        db.atualizar_changelog(changelog_id, descricao=texto)
+        await db.atualizar_changelog(changelog_id, descricao=texto)
         await update.message.reply_text(f"✅ Descrição do changelog #{changelog_id} atualizada!")
         del context.user_data['editando_changelog_desc']
         return
@@ -914,7 +1146,7 @@ async def processar_changelog_texto(update: Update, context: ContextTypes.DEFAUL
     # Criando novo changelog (aguardando descrição)
     if 'criando_changelog_cat' in context.user_data:
         categoria = context.user_data['criando_changelog_cat']
-        changelog_id = db.criar_changelog(categoria, texto, user.id, user.first_name)
+        changelog_id = await db.criar_changelog(categoria, texto, user.id, user.first_name)
 
         pin_emoji = "📍"
         texto_sucesso = f"✅ *Changelog criado com sucesso!*\n\n"
@@ -941,30 +1173,47 @@ async def listar_tarefas(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(mensagem, parse_mode='Markdown')
         return
 
-    tarefas = db.listar_tarefas()
+    contagem = await db.contar_tarefas()
 
-    if not tarefas:
+    if not contagem['total']:
         await update.message.reply_text(
             "📋 Nenhuma tarefa cadastrada ainda.\n\nUse /nova para criar a primeira tarefa!"
         )
         return
-    
+
+    await update.message.reply_text(
+        texto_resumo_tarefas(contagem),
+        parse_mode='Markdown',
+        reply_markup=keyboard_filtros()
+    )
+
+
+async def arquivo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /arquivo - lista as tarefas concluídas que foram arquivadas"""
+    # Verificar tópico
+    if not await verificar_topico(update):
+        topico_info = db.obter_info_topico()
+        mensagem = await obter_mensagem_topico_restrito(topico_info)
+        await update.message.reply_text(mensagem, parse_mode='Markdown')
+        return
+
+    texto, keyboard = await montar_lista_filtrada("arq")
+    await update.message.reply_text(texto, parse_mode='Markdown', reply_markup=keyboard)
+
+
+def texto_resumo_tarefas(contagem: dict) -> str:
+    """Monta o resumo por status a partir de db.contar_tarefas()"""
     texto = "📋 *Tarefas do Ashy Task*\n\n"
     texto += "_Use os filtros abaixo para organizar:_\n\n"
 
-    # Mostrar resumo
     for status in STATUS:
-        count = len([t for t in tarefas if t['status'] == status])
+        count = contagem['por_status'].get(status, 0)
         emoji = STATUS_EMOJI.get(status, '📌')
         # Substituir underscore por espaço e capitalizar
         status_nome = status.replace('_', ' ').title()
         texto += f"{emoji} {status_nome}: `{count}`\n"
-    
-    await update.message.reply_text(
-        texto,
-        parse_mode='Markdown',
-        reply_markup=keyboard_filtros()
-    )
+
+    return texto
 
 
 async def minhas_tarefas(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -976,7 +1225,7 @@ async def minhas_tarefas(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(mensagem, parse_mode='Markdown')
         return
     user = update.effective_user
-    tarefas = db.listar_tarefas(autor_id=user.id)
+    tarefas = await db.listar_tarefas(autor_id=user.id, ordem="atividade")
     
     if not tarefas:
         await update.message.reply_text(
@@ -992,7 +1241,10 @@ async def minhas_tarefas(update: Update, context: ContextTypes.DEFAULT_TYPE):
         status_nome = tarefa['status'].replace('_', ' ').title()
 
         texto += f"{emoji_status} #{tarefa['id']} - {tarefa['titulo']}\n"
-        texto += f"   {emoji_pri} {tarefa['categoria']} | {status_nome}\n\n"
+        texto += f"   {emoji_pri} {tarefa['categoria']} | {status_nome}"
+        if tarefa['total_comentarios']:
+            texto += f" | 💬 {tarefa['total_comentarios']}"
+        texto += "\n\n"
     
     if len(tarefas) > 10:
         texto += f"... e mais {len(tarefas) - 10} tarefas.\n"
@@ -1016,374 +1268,364 @@ def formatar_tarefa(tarefa: dict) -> str:
     texto += f"👤 *Criada por:* `{tarefa['autor_nome']}`\n"
 
     # Data de criação
-    data_criacao = datetime.fromisoformat(tarefa['data_criacao'])
-    texto += f"📅 *Criada em:* `{data_criacao.strftime('%d/%m/%Y %H:%M')}`\n"
+    texto += f"📅 *Criada em:* `{formatar_data(tarefa['data_criacao'])}`\n"
 
     if tarefa['data_conclusao']:
-        data_conclusao = datetime.fromisoformat(tarefa['data_conclusao'])
-        texto += f"✅ *Concluída em:* `{data_conclusao.strftime('%d/%m/%Y %H:%M')}`\n"
+        texto += f"✅ *Concluída em:* `{formatar_data(tarefa['data_conclusao'])}`\n"
+
+    if tarefa['arquivada']:
+        texto += "\n🗄️ _Tarefa arquivada_\n"
     
     return texto
 
 
-# ============ CALLBACKS ============
-
-async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler principal para callbacks dos botões inline"""
-    query = update.callback_query
-    await query.answer()
-
-    data = query.data
-
-    # Filtros de listagem
-    if data.startswith("filtro_"):
-        await handle_filtro(query, context)
-        return
+def renderizar_tarefa(tarefa: dict, user_id: int):
+    """Texto e botões de uma tarefa para quem a vê (do cache, se a versão já foi renderizada)
 
-    # Filtrar por categoria (vindo do menu de categorias)
-    elif data.startswith("cat_") and not data.startswith("cancelar"):
-        categoria_id = int(data.split("_")[1])
-        tarefas = db.listar_tarefas(categoria_id=categoria_id)
-
-        # Buscar nome da categoria
-        categorias = db.listar_categorias()
-        categoria_nome = next((c['nome'] for c in categorias if c['id'] == categoria_id), "Desconhecida")
+    A chave é a versão da tarefa (incrementada a cada alteração). O texto
+    é o mesmo para todos; os botões dependem do papel de quem vê: só o
+    autor tem os de editar/deletar.
+    """
+    if tarefa['arquivada']:
+        papel = "arquivada"
+    else:
+        papel = "autor" if tarefa['autor_id'] == user_id else "leitor"
+
+    # Os ids se repetem entre shards: a chave inclui o banco do chat. Categoria
+    # renomeada e arquivamento não mudam a versão, então também entram
+    versionada = tarefa['versao'] is not None
+    origem = (db.caminho(chat_atual.get()), tarefa['id'], tarefa['versao'], tarefa['categoria'], papel == "arquivada")
+
+    texto = cache_render.obter(origem + ("texto",)) if versionada else None
+    if texto is None:
+        texto = formatar_tarefa(tarefa)
+        if versionada:
+            cache_render.guardar(origem + ("texto",), texto)
+
+    keyboard = cache_render.obter(origem + (papel,)) if versionada else None
+    if keyboard is None:
+        if papel == "arquivada":
+            keyboard = acoes_tarefa_arquivada(tarefa['id'])
+        else:
+            keyboard = acoes_tarefa(tarefa['id'], tarefa['autor_id'], user_id, tarefa['status'])
+        if versionada:
+            cache_render.guardar(origem + (papel,), keyboard)
+    return texto, keyboard
 
-        if not tarefas:
-            await query.edit_message_text(
-                f"📁 *Categoria: {categoria_nome}*\n\n❌ Nenhuma tarefa encontrada.",
-                reply_markup=keyboard_filtros(),
-                parse_mode='Markdown'
-            )
-            return
 
-        # Mostrar lista de tarefas
-        texto = f"*📁 Categoria: {categoria_nome}*\n\n"
+def registrar_exibicao(mensagem, render):
+    """Anota a renderização que a mensagem passou a mostrar"""
+    if mensagem is not None:
+        renderizacoes_exibidas.guardar((mensagem.chat_id, mensagem.message_id), render)
 
-        buttons = []
-        for tarefa in tarefas[:20]:  # Limita a 20
-            emoji_status = STATUS_EMOJI.get(tarefa['status'], '📌')
-            emoji_pri = PRIORIDADE_EMOJI.get(tarefa['prioridade'], '🟡')
 
-            label = f"{emoji_status} {emoji_pri} #{tarefa['id']} - {tarefa['titulo'][:30]}"
-            buttons.append([InlineKeyboardButton(label, callback_data=f"ver_{tarefa['id']}")])
+def ja_exibida(mensagem, render, com_foto: bool) -> bool:
+    """A mensagem já mostra exatamente esta renderização (mesmo texto, botões e formato)?"""
+    if bool(mensagem.photo) != com_foto or mensagem.reply_markup != render[1]:
+        return False
+    return renderizacoes_exibidas.obter((mensagem.chat_id, mensagem.message_id)) == render
 
-        buttons.append([InlineKeyboardButton("🔙 Voltar aos filtros", callback_data="voltar_filtros")])
 
-        await query.edit_message_text(
+async def responder_tarefa(message, tarefa: dict, user_id: int):
+    """Responde a uma mensagem com a tarefa (foto com legenda, se tiver imagem)"""
+    texto, keyboard = renderizar_tarefa(tarefa, user_id)
+    if tarefa['imagem_file_id']:
+        enviada = await message.reply_photo(
+            photo=tarefa['imagem_file_id'],
+            caption=texto,
+            parse_mode='Markdown',
+            reply_markup=keyboard
+        )
+    else:
+        enviada = await message.reply_text(
             texto,
             parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(buttons)
+            reply_markup=keyboard
         )
-        return
+    registrar_exibicao(enviada, (texto, keyboard))
 
-    # Ver detalhes de uma tarefa
-    elif data.startswith("ver_"):
-        tarefa_id = int(data.split("_")[1])
-        await mostrar_tarefa(query, tarefa_id)
-        return
 
-    # Mudar status
-    elif data.startswith("status_"):
-        parts = data.split("_")
-        tarefa_id = int(parts[1])
-        novo_status = "_".join(parts[2:])
-        await mudar_status(query, tarefa_id, novo_status)
-        return
+# ============ CALLBACKS ============
 
-    # Deletar tarefa
-    elif data.startswith("deletar_"):
-        tarefa_id = int(data.split("_")[1])
-        await confirmar_delecao(query, tarefa_id)
-        return
+async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handler principal para callbacks dos botões inline (despacha pela tabela de rotas)
 
-    # Confirmar deleção
-    elif "confirma_del_" in data:
-        tarefa_id = int(data.split("_")[2])
-        await deletar_tarefa(query, tarefa_id)
-        return
-    
-    elif "cancelar_del_" in data:
-        tarefa_id = int(data.split("_")[2])
-        await mostrar_tarefa(query, tarefa_id)
-        return
+    A rota responde o callback com responder() quando tem aviso ou alerta a
+    mostrar; se não respondeu, a resposta vazia sai ao final do despacho.
+    """
+    query = update.callback_query
+    callback_respondido.set(False)
+    try:
+        await rotas.despachar(query, context)
+    finally:
+        if not callback_respondido.get():
+            await query.answer()
 
-    # Editar tarefa
-    elif data.startswith("editar_"):
-        tarefa_id = int(data.split("_")[1])
-        await mostrar_opcoes_edicao(query, tarefa_id)
-        return
-    
-    # Comentários
-    elif data.startswith("comentarios_"):
-        tarefa_id = int(data.split("_")[1])
-        await mostrar_comentarios(query, tarefa_id)
-        return
 
-    # Adicionar comentário inline
-    elif data.startswith("add_comentario_"):
-        tarefa_id = int(data.split("_")[2])
-        context.user_data['aguardando_comentario'] = tarefa_id
-        await query.answer("✍️ Digite seu comentário agora...")
-        texto = f"💬 *Comentar na Tarefa #{tarefa_id}*\n\n"
-        texto += "_Digite seu comentário abaixo e envie:_"
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown')
-        else:
-            await query.edit_message_text(texto, parse_mode='Markdown')
+async def responder(query, texto: Optional[str] = None, show_alert: bool = False):
+    """Responde o callback em despacho uma única vez (o Telegram recusa a segunda resposta)"""
+    if callback_respondido.get():
+        logger.debug(f"Callback {query.data!r} já respondido; aviso descartado: {texto!r}")
         return
+    callback_respondido.set(True)
+    await query.answer(texto, show_alert=show_alert)
 
-    # Editar título
-    elif data.startswith("edit_titulo_"):
-        tarefa_id = int(data.split("_")[2])
-        context.user_data['editando_titulo'] = tarefa_id
-        await query.answer("✍️ Digite o novo título...")
-        texto = f"📝 *Editar Título da Tarefa #{tarefa_id}*\n\n"
-        texto += "_Digite o novo título e envie:_"
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown')
-        else:
-            await query.edit_message_text(texto, parse_mode='Markdown')
-        return
 
-    # Editar descrição
-    elif data.startswith("edit_desc_"):
-        tarefa_id = int(data.split("_")[2])
-        context.user_data['editando_descricao'] = tarefa_id
-        await query.answer("✍️ Digite a nova descrição...")
-        texto = f"📄 *Editar Descrição da Tarefa #{tarefa_id}*\n\n"
-        texto += "_Digite a nova descrição e envie:_"
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown')
-        else:
-            await query.edit_message_text(texto, parse_mode='Markdown')
-        return
+async def editar_ou_enviar(query, texto: str, reply_markup=None):
+    """Edita a mensagem do botão; se for uma foto, apaga e envia o texto no tópico"""
+    if query.message.photo:
+        chat_id = query.message.chat_id
+        await query.message.delete()
+        await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown', reply_markup=reply_markup)
+    else:
+        await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=reply_markup)
 
-    # Editar prioridade
-    elif data.startswith("edit_prior_"):
-        tarefa_id = int(data.split("_")[2])
-        texto = f"🎯 *Editar Prioridade da Tarefa #{tarefa_id}*\n\n"
-        texto += "Selecione a nova prioridade:"
-        keyboard = [
-            [InlineKeyboardButton("🔴 Alta", callback_data=f"set_prior_{tarefa_id}_alta")],
-            [InlineKeyboardButton("🟡 Média", callback_data=f"set_prior_{tarefa_id}_media")],
-            [InlineKeyboardButton("🟢 Baixa", callback_data=f"set_prior_{tarefa_id}_baixa")],
-            [InlineKeyboardButton("❌ Cancelar", callback_data=f"ver_{tarefa_id}")]
-        ]
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(keyboard))
-        else:
-            await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(keyboard))
-        return
 
-    # Salvar prioridade
-    elif data.startswith("set_prior_"):
-        parts = data.split("_")
-        tarefa_id = int(parts[2])
-        prioridade = parts[3]
-        db.atualizar_tarefa(tarefa_id, prioridade=prioridade)
-        await query.answer(f"✅ Prioridade atualizada para {prioridade}!")
-        await mostrar_tarefa(query, tarefa_id)
-        return
+# Navegação entre páginas (formato: pag_<origem>_<a|p>_<cursor>_<filtro>)
+@rotas.rota("pag_{origem}_{direcao}_{cursor:int}_{filtro:resto}")
+async def rota_pagina(query, context, origem: str, direcao: str, cursor: int, filtro: str):
+    await mostrar_lista_filtrada(query, filtro, origem=origem, direcao=direcao, cursor=cursor)
 
-    # Voltar para lista
-    elif data == "voltar_lista":
-        await voltar_lista(query)
-        return
 
-    # Voltar para filtros (mesmo comportamento que voltar_lista)
-    elif data == "voltar_filtros":
-        await voltar_lista(query)
-        return
+# Filtrar por categoria (vindo do menu de categorias)
+@rotas.rota("cat_{categoria_id:int}")
+async def rota_categoria(query, context, categoria_id: int):
+    await mostrar_lista_filtrada(query, f"c_{categoria_id}", origem="f")
 
-    # Voltar ao menu principal
-    elif data == "voltar_menu":
-        await handle_menu(query, "menu_voltar", context)
-        return
 
-    # Seleção de categoria para nova tarefa inline
-    elif data.startswith("newcat_") and context.user_data.get('aguardando') == 'categoria_tarefa':
-        categoria_id = int(data.replace("newcat_", ""))
-        context.user_data['categoria_id'] = categoria_id
+# Ver detalhes de uma tarefa
+@rotas.rota("ver_{tarefa_id:int}")
+async def rota_ver(query, context, tarefa_id: int):
+    await mostrar_tarefa(query, tarefa_id)
 
-        # Pedir prioridade
-        await query.edit_message_text(
-            "🎯 Selecione a prioridade:",
-            reply_markup=selecionar_prioridade()
-        )
-        context.user_data['aguardando'] = 'prioridade_tarefa'
-        return
 
-    # Cancelar criação inline
-    elif data == "cancelar_nova" and context.user_data.get('criando_tarefa_inline'):
-        await query.edit_message_text("❌ Criação de tarefa cancelada.")
-        context.user_data.clear()
+# Mudar status (formato: st_<id>_<status exibido>_<novo status>, em códigos curtos)
+@rotas.rota("st_{tarefa_id:int}_{atual}_{novo}")
+async def rota_status(query, context, tarefa_id: int, atual: str, novo: str):
+    if atual not in STATUS_POR_CODIGO or novo not in STATUS_POR_CODIGO:
+        await responder(query, "❌ Status inválido", show_alert=True)
         return
+    await mudar_status(query, tarefa_id, STATUS_POR_CODIGO[novo], STATUS_POR_CODIGO[atual])
 
-    # Seleção de prioridade para nova tarefa inline
-    elif data.startswith("prior_") and context.user_data.get('aguardando') == 'prioridade_tarefa':
-        prioridade = data.replace("prior_", "")
-        context.user_data['prioridade'] = prioridade
-
-        # Criar a tarefa
-        user = query.from_user
-        tarefa_id = db.criar_tarefa(
-            titulo=context.user_data['titulo'],
-            descricao=context.user_data.get('descricao', ''),
-            categoria_id=context.user_data['categoria_id'],
-            prioridade=prioridade,
-            autor_id=user.id,
-            autor_nome=user.first_name
-        )
 
-        await query.edit_message_text(
-            f"✅ *Tarefa criada com sucesso!*\n\n"
-            f"ID: #{tarefa_id}\n"
-            f"Título: {context.user_data['titulo']}",
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("👁️ Ver tarefa", callback_data=f"ver_{tarefa_id}"),
-                InlineKeyboardButton("📋 Ver todas", callback_data="menu_tarefas")
-            ]])
-        )
+# Botões de status de mensagens antigas (sem o status exibido): só recarregam a tarefa
+@rotas.rota("status_{tarefa_id:int}_{status:resto}")
+async def rota_status_antigo(query, context, tarefa_id: int, status: str):
+    await responder(query, "⚠️ Botão desatualizado: veja o status atual e tente de novo", show_alert=True)
+    await mostrar_tarefa(query, tarefa_id)
 
-        # Limpar dados
-        context.user_data.clear()
-        return
 
-    # Nova categoria inline
-    elif data == "nova_categoria":
-        context.user_data['criando_categoria_tarefa'] = True
-        await query.answer("✍️ Digite o nome da nova categoria...")
-        texto = "➕ *Nova Categoria de Tarefa*\n\n_Digite o nome da nova categoria:_"
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown')
-        else:
-            await query.edit_message_text(texto, parse_mode='Markdown')
-        return
+# Deletar tarefa
+@rotas.rota("deletar_{tarefa_id:int}")
+async def rota_deletar(query, context, tarefa_id: int):
+    await confirmar_delecao(query, tarefa_id)
 
-    # Changelog
-    elif data.startswith("changelog_") or data.startswith("newlog_"):
-        await handle_changelog(query, data, context)
-        return
 
-    # Menu principal
-    elif data.startswith("menu_"):
-        await handle_menu(query, data, context)
-        return
+# Confirmar deleção
+@rotas.rota("confirma_del_{tarefa_id:int}")
+async def rota_confirma_del(query, context, tarefa_id: int):
+    await deletar_tarefa(query, tarefa_id)
 
 
-async def handle_menu(query, data: str, context):
-    """Processa opções do menu principal"""
-    user = query.from_user
+@rotas.rota("cancelar_del_{tarefa_id:int}")
+async def rota_cancelar_del(query, context, tarefa_id: int):
+    await mostrar_tarefa(query, tarefa_id)
 
-    if data == "menu_nova":
-        # Iniciar processo de criação de tarefa
-        context.user_data['criando_tarefa_inline'] = True
-        await query.edit_message_text(
-            "📝 *Nova Tarefa*\n\n_Qual é o *título* da tarefa?_",
-            parse_mode='Markdown'
-        )
-        context.user_data['aguardando'] = 'titulo_tarefa'
 
-    elif data == "menu_tarefas":
-        tarefas = db.listar_tarefas()
+# Editar tarefa
+@rotas.rota("editar_{tarefa_id:int}")
+async def rota_editar(query, context, tarefa_id: int):
+    await mostrar_opcoes_edicao(query, tarefa_id)
 
-        if not tarefas:
-            await query.edit_message_text(
-                "📋 *Todas as Tarefas*\n\n❌ Nenhuma tarefa cadastrada ainda.\n\nUse /nova para criar a primeira tarefa!",
-                parse_mode='Markdown',
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Voltar ao Menu", callback_data="menu_voltar")
-                ]])
-            )
-            return
 
-        texto = "📋 *Tarefas do Ashy Task*\n\n"
-        texto += "_Use os filtros abaixo para organizar:_\n\n"
+# Comentários
+@rotas.rota("comentarios_{tarefa_id:int}")
+async def rota_comentarios(query, context, tarefa_id: int):
+    await mostrar_comentarios(query, tarefa_id)
 
-        for status in STATUS:
-            count = len([t for t in tarefas if t['status'] == status])
-            emoji = STATUS_EMOJI.get(status, '📌')
-            status_nome = status.replace('_', ' ').title()
-            texto += f"{emoji} {status_nome}: `{count}`\n"
 
-        await query.edit_message_text(
-            texto,
-            parse_mode='Markdown',
-            reply_markup=keyboard_filtros()
-        )
+# Adicionar comentário inline
+@rotas.rota("add_comentario_{tarefa_id:int}")
+async def rota_add_comentario(query, context, tarefa_id: int):
+    tarefa = await db.obter_tarefa(tarefa_id)
+    if not tarefa or tarefa['arquivada']:
+        await responder(query, "🗄️ Tarefa arquivada não recebe novos comentários" if tarefa else "❌ Tarefa não encontrada",
+                        show_alert=True)
+        return
+    context.user_data['aguardando_comentario'] = tarefa_id
+    await responder(query, "✍️ Digite seu comentário agora...")
+    texto = f"💬 *Comentar na Tarefa #{tarefa_id}*\n\n"
+    texto += "_Digite seu comentário abaixo e envie:_"
+    await editar_ou_enviar(query, texto)
+
+
+# Editar título
+@rotas.rota("edit_titulo_{tarefa_id:int}")
+async def rota_edit_titulo(query, context, tarefa_id: int):
+    context.user_data['editando_titulo'] = tarefa_id
+    await responder(query, "✍️ Digite o novo título...")
+    texto = f"📝 *Editar Título da Tarefa #{tarefa_id}*\n\n"
+    texto += "_Digite o novo título e envie:_"
+    await editar_ou_enviar(query, texto)
+
+
+# Editar descrição
+@rotas.rota("edit_desc_{tarefa_id:int}")
+async def rota_edit_desc(query, context, tarefa_id: int):
+    context.user_data['editando_descricao'] = tarefa_id
+    await responder(query, "✍️ Digite a nova descrição...")
+    texto = f"📄 *Editar Descrição da Tarefa #{tarefa_id}*\n\n"
+    texto += "_Digite a nova descrição e envie:_"
+    await editar_ou_enviar(query, texto)
+
+
+# Editar prioridade
+@rotas.rota("edit_prior_{tarefa_id:int}")
+async def rota_edit_prior(query, context, tarefa_id: int):
+    texto = f"🎯 *Editar Prioridade da Tarefa #{tarefa_id}*\n\n"
+    texto += "Selecione a nova prioridade:"
+    keyboard = [
+        [InlineKeyboardButton("🔴 Alta", callback_data=f"set_prior_{tarefa_id}_alta")],
+        [InlineKeyboardButton("🟡 Média", callback_data=f"set_prior_{tarefa_id}_media")],
+        [InlineKeyboardButton("🟢 Baixa", callback_data=f"set_prior_{tarefa_id}_baixa")],
+        [InlineKeyboardButton("❌ Cancelar", callback_data=f"ver_{tarefa_id}")]
+    ]
+    await editar_ou_enviar(query, texto, InlineKeyboardMarkup(keyboard))
 
-    elif data == "menu_minhas":
-        tarefas = db.listar_tarefas(autor_id=user.id)
 
-        if not tarefas:
-            await query.edit_message_text(
-                "📋 *Minhas Tarefas*\n\n❌ Você ainda não criou nenhuma tarefa.\n\nUse /nova para criar uma!",
-                parse_mode='Markdown',
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Voltar ao Menu", callback_data="menu_voltar")
-                ]])
-            )
-            return
+# Salvar prioridade
+@rotas.rota("set_prior_{tarefa_id:int}_{prioridade}")
+async def rota_set_prior(query, context, tarefa_id: int, prioridade: str):
+    tarefa = await db.atualizar_tarefa(tarefa_id, prioridade=prioridade, autor_id=query.from_user.id)
+    if not tarefa:
+        await responder(query, TAREFA_MUDOU, show_alert=True)
+        await mostrar_tarefa(query, tarefa_id)
+        return
+    await responder(query, f"✅ Prioridade atualizada para {prioridade}!")
+    await mostrar_tarefa(query, tarefa_id, tarefa)
 
-        texto = f"📋 *Suas tarefas ({len(tarefas)})*\n\n"
 
-        buttons = []
-        for tarefa in tarefas[:20]:
-            emoji_status = STATUS_EMOJI.get(tarefa['status'], '📌')
-            emoji_pri = PRIORIDADE_EMOJI.get(tarefa['prioridade'], '🟡')
+# Voltar para lista (voltar_filtros tem o mesmo comportamento)
+@rotas.rota("voltar_lista")
+@rotas.rota("voltar_filtros")
+async def rota_voltar_lista(query, context):
+    await voltar_lista(query)
 
-            label = f"{emoji_status} {emoji_pri} #{tarefa['id']} - {tarefa['titulo'][:30]}"
-            buttons.append([InlineKeyboardButton(label, callback_data=f"ver_{tarefa['id']}")])
 
-        buttons.append([InlineKeyboardButton("🔙 Voltar ao Menu", callback_data="menu_voltar")])
+# Seleção de categoria para nova tarefa inline
+@rotas.rota("newcat_{categoria_id:int}", quando=lambda context: context.user_data.get('aguardando') == 'categoria_tarefa')
+async def rota_newcat(query, context, categoria_id: int):
+    context.user_data['categoria_id'] = categoria_id
 
-        await query.edit_message_text(
-            texto,
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup(buttons)
-        )
+    # Pedir prioridade
+    await query.edit_message_text(
+        "🎯 Selecione a prioridade:",
+        reply_markup=selecionar_prioridade()
+    )
+    context.user_data['aguardando'] = 'prioridade_tarefa'
 
-    elif data == "menu_stats":
-        stats = db.estatisticas()
 
-        texto = f"""
-📊 *Estatísticas do Ashy Task*
+# Cancelar criação inline
+@rotas.rota("cancelar_nova", quando=lambda context: context.user_data.get('criando_tarefa_inline'))
+async def rota_cancelar_nova(query, context):
+    await query.edit_message_text("❌ Criação de tarefa cancelada.")
+    context.user_data.clear()
 
-📋 Total de tarefas: `{stats['total']}`
 
-⏳ Pendentes: `{stats['pendentes']}`
-🔄 Em andamento: `{stats['em_andamento']}`
-✅ Resolvidas: `{stats['resolvidas']}`
-"""
+# Seleção de prioridade para nova tarefa inline
+@rotas.rota("prior_{prioridade}", quando=lambda context: context.user_data.get('aguardando') == 'prioridade_tarefa')
+async def rota_prior(query, context, prioridade: str):
+    context.user_data['prioridade'] = prioridade
 
-        categorias = db.listar_categorias()
-        for cat in categorias:
-            tarefas_cat = db.listar_tarefas(categoria_id=cat['id'], status="pendente")
-            if tarefas_cat:
-                texto += f"\n{cat['nome']}: `{len(tarefas_cat)}` pendente(s)"
+    # Criar a tarefa
+    user = query.from_user
+    tarefa_id = await db.criar_tarefa(
+        titulo=context.user_data['titulo'],
+        descricao=context.user_data.get('descricao', ''),
+        categoria_id=context.user_data['categoria_id'],
+        prioridade=prioridade,
+        autor_id=user.id,
+        autor_nome=user.first_name
+    )
 
+    await query.edit_message_text(
+        f"✅ *Tarefa criada com sucesso!*\n\n"
+        f"ID: #{tarefa_id}\n"
+        f"Título: {context.user_data['titulo']}",
+        parse_mode='Markdown',
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("👁️ Ver tarefa", callback_data=f"ver_{tarefa_id}"),
+            InlineKeyboardButton("📋 Ver todas", callback_data="menu_tarefas")
+        ]])
+    )
+
+    # Limpar dados
+    context.user_data.clear()
+
+
+# Nova categoria inline
+@rotas.rota("nova_categoria")
+async def rota_nova_categoria(query, context):
+    context.user_data['criando_categoria_tarefa'] = True
+    await responder(query, "✍️ Digite o nome da nova categoria...")
+    await editar_ou_enviar(query, "➕ *Nova Categoria de Tarefa*\n\n_Digite o nome da nova categoria:_")
+
+
+# Menu principal
+
+@rotas.rota("menu_nova")
+async def rota_menu_nova(query, context):
+    # Iniciar processo de criação de tarefa
+    context.user_data['criando_tarefa_inline'] = True
+    await query.edit_message_text(
+        "📝 *Nova Tarefa*\n\n_Qual é o *título* da tarefa?_",
+        parse_mode='Markdown'
+    )
+    context.user_data['aguardando'] = 'titulo_tarefa'
+
+
+@rotas.rota("menu_tarefas")
+async def rota_menu_tarefas(query, context):
+    contagem = await db.contar_tarefas()
+
+    if not contagem['total']:
         await query.edit_message_text(
-            texto,
+            "📋 *Todas as Tarefas*\n\n❌ Nenhuma tarefa cadastrada ainda.\n\nUse /nova para criar a primeira tarefa!",
             parse_mode='Markdown',
             reply_markup=InlineKeyboardMarkup([[
                 InlineKeyboardButton("🔙 Voltar ao Menu", callback_data="menu_voltar")
             ]])
         )
+        return
 
-    elif data == "menu_ajuda":
-        texto = f"""
+    await query.edit_message_text(
+        texto_resumo_tarefas(contagem),
+        parse_mode='Markdown',
+        reply_markup=keyboard_filtros()
+    )
+
+
+@rotas.rota("menu_minhas")
+async def rota_menu_minhas(query, context):
+    await mostrar_lista_filtrada(query, f"a_{query.from_user.id}")
+
+
+@rotas.rota("menu_stats")
+async def rota_menu_stats(query, context):
+    stats = await db.estatisticas()
+
+    await query.edit_message_text(
+        formatar_estatisticas(stats),
+        parse_mode='Markdown',
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Voltar ao Menu", callback_data="menu_voltar")
+        ]])
+    )
+
+
+@rotas.rota("menu_ajuda")
+async def rota_menu_ajuda(query, context):
+    texto = f"""
 *📋 Ashy Task v{VERSION}*
 
 *Comandos disponíveis:*
@@ -1392,6 +1634,7 @@ async def handle_menu(query, data: str, context):
 /tarefas - Listar todas as tarefas
 /minhas - Ver apenas suas tarefas
 /buscar [termo] - Buscar tarefas por palavra-chave
+/arquivo - Ver tarefas concluídas arquivadas
 /comentar [id] [texto] - Adicionar comentário em uma tarefa
 /addcategoria [nome] - Criar uma nova categoria
 /changelog - Gerenciar mudanças do projeto
@@ -1431,389 +1674,394 @@ async def handle_menu(query, data: str, context):
 • 🟢 Baixa
 """
 
+    await query.edit_message_text(
+        texto,
+        parse_mode='Markdown',
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Voltar ao Menu", callback_data="menu_voltar")
+        ]])
+    )
+
+
+@rotas.rota("menu_filtro_{status:resto}")
+async def rota_menu_filtro(query, context, status: str):
+    await mostrar_lista_filtrada(query, f"s_{status}")
+
+
+@rotas.rota("menu_categorias")
+async def rota_menu_categorias(query, context):
+    keyboard = menu_categorias(
+        db.catalogo_categorias(),
+        voltar_callback="menu_voltar",
+        voltar_texto="🔙 Voltar ao Menu",
+        nova_categoria=False
+    )
+
+    await query.edit_message_text(
+        "*🖥️ Selecione uma categoria:*",
+        reply_markup=keyboard,
+        parse_mode='Markdown'
+    )
+
+
+@rotas.rota("voltar_menu")
+@rotas.rota("menu_voltar")
+async def rota_menu_voltar(query, context):
+    texto = """
+🏠 *Menu Principal - Ashy Task*
+
+_Escolha uma das opções abaixo para navegar:_
+"""
+
+    keyboard = [
+        [InlineKeyboardButton("➕ Nova Tarefa", callback_data="menu_nova")],
+        [
+            InlineKeyboardButton("📋 Todas as Tarefas", callback_data="menu_tarefas"),
+            InlineKeyboardButton("👤 Minhas Tarefas", callback_data="menu_minhas")
+        ],
+        [
+            InlineKeyboardButton("📝 Changelog", callback_data="changelog_menu"),
+            InlineKeyboardButton("📊 Estatísticas", callback_data="menu_stats")
+        ],
+        [
+            InlineKeyboardButton("⏳ Pendentes", callback_data="menu_filtro_pendente"),
+            InlineKeyboardButton("🔄 Em Andamento", callback_data="menu_filtro_em_andamento")
+        ],
+        [
+            InlineKeyboardButton("✅ Concluídas", callback_data="menu_filtro_concluido"),
+            InlineKeyboardButton("🖥️ Por Categoria", callback_data="menu_categorias")
+        ],
+        [InlineKeyboardButton("❓ Ajuda", callback_data="menu_ajuda")]
+    ]
+
+    # Verificar se mensagem tem foto
+    if query.message.photo:
+        chat_id = query.message.chat_id
+        await query.message.delete()
+        await enviar_mensagem_no_topico(
+            bot=query.get_bot(),
+            chat_id=chat_id,
+            text=texto,
+            parse_mode='Markdown',
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+    else:
         await query.edit_message_text(
             texto,
             parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Voltar ao Menu", callback_data="menu_voltar")
-            ]])
+            reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
-    elif data == "menu_filtro_pendente":
-        tarefas = db.listar_tarefas(status="pendente")
-        await mostrar_lista_filtrada(query, tarefas, "⏳ Pendentes")
 
-    elif data == "menu_filtro_em_andamento":
-        tarefas = db.listar_tarefas(status="em_andamento")
-        await mostrar_lista_filtrada(query, tarefas, "🔄 Em Andamento")
+# Changelog
 
-    elif data == "menu_filtro_concluido":
-        tarefas = db.listar_tarefas(status="concluido")
-        await mostrar_lista_filtrada(query, tarefas, "✅ Concluídas")
+@rotas.rota("changelog_menu")
+async def rota_changelog_menu(query, context):
+    await menu_changelog(query, is_command=False)
 
-    elif data == "menu_categorias":
-        categorias = db.listar_categorias()
 
-        buttons = []
-        for cat in categorias:
-            buttons.append([InlineKeyboardButton(f"🖥️ {cat['nome']}", callback_data=f"cat_{cat['id']}")])
+@rotas.rota("changelog_novo")
+async def rota_changelog_novo(query, context):
+    # Mostrar seleção de categoria
+    texto = "📝 *Novo Changelog*\n\n_Selecione a categoria:_"
+    categorias = await db.listar_categorias_changelog()
+    keyboard = selecionar_categoria_changelog(categorias)
+    await editar_ou_enviar(query, texto, keyboard)
 
-        buttons.append([InlineKeyboardButton("🔙 Voltar ao Menu", callback_data="menu_voltar")])
 
-        await query.edit_message_text(
-            "*🖥️ Selecione uma categoria:*",
-            reply_markup=InlineKeyboardMarkup(buttons),
-            parse_mode='Markdown'
-        )
+@rotas.rota("changelog_nova_cat")
+async def rota_changelog_nova_cat(query, context):
+    # Criar nova categoria
+    context.user_data['criando_categoria_changelog'] = True
+    await responder(query, "✍️ Digite o nome da nova categoria...")
+    texto = "➕ *Nova Categoria de Changelog*\n\n_Digite o nome da nova categoria:_"
+    await editar_ou_enviar(query, texto)
 
-    elif data == "menu_voltar":
-        texto = """
-🏠 *Menu Principal - Ashy Task*
 
-_Escolha uma das opções abaixo para navegar:_
-"""
+@rotas.rota("newlog_idx_{idx:int}")
+async def rota_newlog_idx(query, context, idx: int):
+    # Categoria selecionada por índice, pedir descrição
+    categorias = await db.listar_categorias_changelog()
 
-        keyboard = [
-            [InlineKeyboardButton("➕ Nova Tarefa", callback_data="menu_nova")],
-            [
-                InlineKeyboardButton("📋 Todas as Tarefas", callback_data="menu_tarefas"),
-                InlineKeyboardButton("👤 Minhas Tarefas", callback_data="menu_minhas")
-            ],
-            [
-                InlineKeyboardButton("📝 Changelog", callback_data="changelog_menu"),
-                InlineKeyboardButton("📊 Estatísticas", callback_data="menu_stats")
-            ],
-            [
-                InlineKeyboardButton("⏳ Pendentes", callback_data="menu_filtro_pendente"),
-                InlineKeyboardButton("🔄 Em Andamento", callback_data="menu_filtro_em_andamento")
-            ],
-            [
-                InlineKeyboardButton("✅ Concluídas", callback_data="menu_filtro_concluido"),
-                InlineKeyboardButton("🖥️ Por Categoria", callback_data="menu_categorias")
-            ],
-            [InlineKeyboardButton("❓ Ajuda", callback_data="menu_ajuda")]
-        ]
-
-        # Verificar se mensagem tem foto
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(
-                bot=query.get_bot(),
-                chat_id=chat_id,
-                text=texto,
-                parse_mode='Markdown',
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-        else:
-            await query.edit_message_text(
-                texto,
-                parse_mode='Markdown',
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
+    if idx >= len(categorias):
+        await responder(query, "❌ Categoria inválida!", show_alert=True)
+        return
 
+    categoria = categorias[idx]
+    context.user_data['criando_changelog_cat'] = categoria
 
-async def handle_changelog(query, data: str, context):
-    """Processa opções do menu de changelog"""
-    if data == "changelog_menu":
-        await menu_changelog(query, is_command=False)
-
-    elif data == "changelog_novo":
-        # Mostrar seleção de categoria
-        texto = "📝 *Novo Changelog*\n\n_Selecione a categoria:_"
-        categorias = db.listar_categorias_changelog()
-        keyboard = selecionar_categoria_changelog(categorias)
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown', reply_markup=keyboard)
-        else:
-            await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=keyboard)
-
-    elif data == "changelog_nova_cat":
-        # Criar nova categoria
-        context.user_data['criando_categoria_changelog'] = True
-        await query.answer("✍️ Digite o nome da nova categoria...")
-        texto = "➕ *Nova Categoria de Changelog*\n\n_Digite o nome da nova categoria:_"
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown')
-        else:
-            await query.edit_message_text(texto, parse_mode='Markdown')
+    texto = f"📝 *Novo Changelog - {categoria}*\n\n_Digite a descrição da mudança:_"
 
-    elif data.startswith("newlog_idx_"):
-        # Categoria selecionada por índice, pedir descrição
-        idx = int(data.replace("newlog_idx_", ""))
-        categorias = db.listar_categorias_changelog()
+    try:
+        await editar_ou_enviar(query, texto)
+        await responder(query, "✍️ Digite a descrição do changelog...")
+    except Exception as e:
+        logger.error(f"Erro ao processar newlog_idx: {e}")
+        await responder(query, f"Erro: {str(e)}", show_alert=True)
 
-        if idx >= len(categorias):
-            await query.answer("❌ Categoria inválida!", show_alert=True)
-            return
 
-        categoria = categorias[idx]
-        context.user_data['criando_changelog_cat'] = categoria
+@rotas.rota("changelog_listar_todos")
+async def rota_changelog_listar_todos(query, context):
+    await listar_changelogs_inline(query)
 
-        texto = f"📝 *Novo Changelog - {categoria}*\n\n_Digite a descrição da mudança:_"
 
-        try:
-            if query.message.photo:
-                chat_id = query.message.chat_id
-                await query.message.delete()
-                await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown')
-            else:
-                await query.edit_message_text(texto, parse_mode='Markdown')
-            await query.answer("✍️ Digite a descrição do changelog...")
-        except Exception as e:
-            logger.error(f"Erro ao processar newlog_idx: {e}")
-            await query.answer(f"Erro: {str(e)}", show_alert=True)
-
-    elif data == "changelog_listar_todos":
-        await listar_changelogs_inline(query)
-
-    elif data == "changelog_listar_pinados":
-        await listar_changelogs_inline(query, filtro="pinados")
-
-    elif data == "changelog_categorias":
-        # Mostrar menu de categorias
-        texto = "*🖥️ Filtrar por Categoria:*"
-        categorias = db.listar_categorias_changelog()
-        keyboard = menu_filtro_categoria_changelog(categorias)
-        await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=keyboard)
+@rotas.rota("changelog_listar_pinados")
+async def rota_changelog_listar_pinados(query, context):
+    await listar_changelogs_inline(query, filtro="pinados")
 
-    elif data.startswith("changelog_catidx_"):
-        idx = int(data.replace("changelog_catidx_", ""))
-        categorias = db.listar_categorias_changelog()
-        categoria = categorias[idx]
-        await listar_changelogs_inline(query, categoria=categoria)
-
-    elif data == "changelog_stats":
-        # Mostrar estatísticas
-        stats = db.estatisticas_changelog()
-
-        texto = "📊 *Estatísticas de Changelog*\n\n"
-        texto += f"📋 *Total de changelogs:* `{stats['total']}`\n"
-        texto += f"📌 *Pinados:* `{stats['pinados']}`\n\n"
-
-        # Por categoria
-        if stats['por_categoria']:
-            texto += "*📁 Por Categoria:*\n"
-            for cat, count in stats['por_categoria'].items():
-                texto += f"• {cat}: `{count}`\n"
-            texto += "\n"
-
-        # Por autor
-        if stats['por_autor']:
-            texto += "*👥 Por Autor:*\n"
-            for autor, count in stats['por_autor'].items():
-                texto += f"• {autor}: `{count}`\n"
 
-        keyboard = [[InlineKeyboardButton("🔙 Voltar", callback_data="changelog_menu")]]
-        await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(keyboard))
+@rotas.rota("changelog_categorias")
+async def rota_changelog_categorias(query, context):
+    # Mostrar menu de categorias
+    texto = "*🖥️ Filtrar por Categoria:*"
+    categorias = await db.listar_categorias_changelog()
+    keyboard = menu_filtro_categoria_changelog(categorias)
+    await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=keyboard)
 
-    elif data.startswith("changelog_ver_"):
-        changelog_id = int(data.split("_")[2])
-        await mostrar_changelog(query, changelog_id)
-
-    elif data.startswith("changelog_pin_"):
-        changelog_id = int(data.split("_")[2])
-        db.alternar_pinagem_changelog(changelog_id)
-        changelog = db.obter_changelog(changelog_id)
-        pin_status = "pinado" if changelog['pinado'] else "despinado"
-        await query.answer(f"✅ Changelog {pin_status}!")
-        await mostrar_changelog(query, changelog_id)
-
-    elif data.startswith("changelog_editar_"):
-        changelog_id = int(data.split("_")[2])
-        texto = f"✏️ *Editar Changelog #{changelog_id}*\n\n_Selecione o que deseja editar:_"
-        keyboard = menu_edicao_changelog(changelog_id)
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown', reply_markup=keyboard)
-        else:
-            await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=keyboard)
-
-    elif data.startswith("changelog_edit_desc_"):
-        changelog_id = int(data.split("_")[3])
-        context.user_data['editando_changelog_desc'] = changelog_id
-        await query.answer("✍️ Digite a nova descrição...")
-        texto = f"📝 *Editar Descrição - Changelog #{changelog_id}*\n\n_Digite a nova descrição:_"
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown')
-        else:
-            await query.edit_message_text(texto, parse_mode='Markdown')
-
-    elif data.startswith("changelog_edit_cat_"):
-        changelog_id = int(data.split("_")[3])
-        texto = f"📁 *Editar Categoria - Changelog #{changelog_id}*\n\n_Selecione a nova categoria:_"
-        categorias = db.listar_categorias_changelog()
-        buttons = []
-        for idx, cat in enumerate(categorias):
-            buttons.append([InlineKeyboardButton(f"📍 {cat}", callback_data=f"changelog_setcatidx_{changelog_id}_{idx}")])
-        buttons.append([InlineKeyboardButton("❌ Cancelar", callback_data=f"changelog_ver_{changelog_id}")])
-
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(buttons))
-        else:
-            await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(buttons))
-
-    elif data.startswith("changelog_setcatidx_"):
-        parts = data.split("_")
-        changelog_id = int(parts[2])
-        idx = int(parts[3])
-        categorias = db.listar_categorias_changelog()
-        categoria = categorias[idx]
-        db.atualizar_changelog(changelog_id, categoria=categoria)
-        await query.answer(f"✅ Categoria atualizada para {categoria}!")
-        await mostrar_changelog(query, changelog_id)
-
-    elif data.startswith("changelog_deletar_"):
-        changelog_id = int(data.split("_")[2])
-        changelog = db.obter_changelog(changelog_id)
-        texto = f"⚠️ *Confirmar exclusão*\n\n"
-        texto += f"Tem certeza que deseja deletar o changelog:\n\n"
-        texto += f"#{changelog_id} - {changelog['categoria']}\n"
-        texto += f"{changelog['descricao'][:100]}...\n\n"
-        texto += "Esta ação não pode ser desfeita!"
-        keyboard = confirmar_delecao_changelog(changelog_id)
-
-        if query.message.photo:
-            chat_id = query.message.chat_id
-            await query.message.delete()
-            await enviar_mensagem_no_topico(bot=query.get_bot(), chat_id=chat_id, text=texto, parse_mode='Markdown', reply_markup=keyboard)
-        else:
-            await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=keyboard)
 
-    elif data.startswith("changelog_confirma_del_"):
-        changelog_id = int(data.split("_")[3])
-        db.deletar_changelog(changelog_id)
-        await query.edit_message_text(
-            f"✅ Changelog #{changelog_id} deletado com sucesso!",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Menu Changelog", callback_data="changelog_menu")
-            ]])
-        )
+@rotas.rota("changelog_catidx_{idx:int}")
+async def rota_changelog_catidx(query, context, idx: int):
+    categorias = await db.listar_categorias_changelog()
+    categoria = categorias[idx]
+    await listar_changelogs_inline(query, categoria=categoria)
 
 
-async def mostrar_lista_filtrada(query, tarefas, titulo: str):
-    """Mostra lista de tarefas filtrada"""
-    if not tarefas:
-        await query.edit_message_text(
-            f"*{titulo}*\n\n❌ Nenhuma tarefa encontrada.",
-            parse_mode='Markdown',
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Voltar ao Menu", callback_data="menu_voltar")
-            ]])
-        )
+@rotas.rota("changelog_stats")
+async def rota_changelog_stats(query, context):
+    # Mostrar estatísticas
+    stats = await db.estatisticas_changelog()
+
+    texto = "📊 *Estatísticas de Changelog*\n\n"
+    texto += f"📋 *Total de changelogs:* `{stats['total']}`\n"
+    texto += f"📌 *Pinados:* `{stats['pinados']}`\n\n"
+
+    # Por categoria
+    if stats['por_categoria']:
+        texto += "*📁 Por Categoria:*\n"
+        for cat, count in stats['por_categoria'].items():
+            texto += f"• {cat}: `{count}`\n"
+        texto += "\n"
+
+    # Por autor
+    if stats['por_autor']:
+        texto += "*👥 Por Autor:*\n"
+        for autor, count in stats['por_autor'].items():
+            texto += f"• {autor}: `{count}`\n"
+
+    keyboard = [[InlineKeyboardButton("🔙 Voltar", callback_data="changelog_menu")]]
+    await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=InlineKeyboardMarkup(keyboard))
+
+
+@rotas.rota("changelog_ver_{changelog_id:int}")
+async def rota_changelog_ver(query, context, changelog_id: int):
+    await mostrar_changelog(query, changelog_id)
+
+
+@rotas.rota("changelog_pin_{changelog_id:int}")
+async def rota_changelog_pin(query, context, changelog_id: int):
+    changelog = await db.alternar_pinagem_changelog(changelog_id)
+    if not changelog:
+        await responder(query, "❌ Changelog não encontrado", show_alert=True)
         return
+    pin_status = "pinado" if changelog['pinado'] else "despinado"
+    await responder(query, f"✅ Changelog {pin_status}!")
+    await mostrar_changelog(query, changelog_id, changelog)
 
-    texto = f"*{titulo}*\n\n"
 
+@rotas.rota("changelog_editar_{changelog_id:int}")
+async def rota_changelog_editar(query, context, changelog_id: int):
+    texto = f"✏️ *Editar Changelog #{changelog_id}*\n\n_Selecione o que deseja editar:_"
+    keyboard = menu_edicao_changelog(changelog_id)
+    await editar_ou_enviar(query, texto, keyboard)
+
+
+@rotas.rota("changelog_edit_desc_{changelog_id:int}")
+async def rota_changelog_edit_desc(query, context, changelog_id: int):
+    context.user_data['editando_changelog_desc'] = changelog_id
+    await responder(query, "✍️ Digite a nova descrição...")
+    texto = f"📝 *Editar Descrição - Changelog #{changelog_id}*\n\n_Digite a nova descrição:_"
+    await editar_ou_enviar(query, texto)
+
+
+@rotas.rota("changelog_edit_cat_{changelog_id:int}")
+async def rota_changelog_edit_cat(query, context, changelog_id: int):
+    texto = f"📁 *Editar Categoria - Changelog #{changelog_id}*\n\n_Selecione a nova categoria:_"
+    categorias = await db.listar_categorias_changelog()
     buttons = []
-    for tarefa in tarefas[:20]:
-        emoji_status = STATUS_EMOJI.get(tarefa['status'], '📌')
-        emoji_pri = PRIORIDADE_EMOJI.get(tarefa['prioridade'], '🟡')
+    for idx, cat in enumerate(categorias):
+        buttons.append([InlineKeyboardButton(f"📍 {cat}", callback_data=f"changelog_setcatidx_{changelog_id}_{idx}")])
+    buttons.append([InlineKeyboardButton("❌ Cancelar", callback_data=f"changelog_ver_{changelog_id}")])
+
+    await editar_ou_enviar(query, texto, InlineKeyboardMarkup(buttons))
+
+
+@rotas.rota("changelog_setcatidx_{changelog_id:int}_{idx:int}")
+async def rota_changelog_setcatidx(query, context, changelog_id: int, idx: int):
+    categorias = await db.listar_categorias_changelog()
+    categoria = categorias[idx]
+    changelog = await db.atualizar_changelog(changelog_id, categoria=categoria)
+    await responder(query, f"✅ Categoria atualizada para {categoria}!")
+    await mostrar_changelog(query, changelog_id, changelog)
 
-        label = f"{emoji_status} {emoji_pri} #{tarefa['id']} - {tarefa['titulo'][:30]}"
-        buttons.append([InlineKeyboardButton(label, callback_data=f"ver_{tarefa['id']}")])
 
-    buttons.append([InlineKeyboardButton("🔙 Voltar ao Menu", callback_data="menu_voltar")])
+@rotas.rota("changelog_deletar_{changelog_id:int}")
+async def rota_changelog_deletar(query, context, changelog_id: int):
+    changelog = await db.obter_changelog(changelog_id)
+    texto = f"⚠️ *Confirmar exclusão*\n\n"
+    texto += f"Tem certeza que deseja deletar o changelog:\n\n"
+    texto += f"#{changelog_id} - {changelog['categoria']}\n"
+    texto += f"{changelog['descricao'][:100]}...\n\n"
+    texto += "Esta ação não pode ser desfeita!"
+    keyboard = confirmar_delecao_changelog(changelog_id)
+
+    await editar_ou_enviar(query, texto, keyboard)
 
+
+@rotas.rota("changelog_confirma_del_{changelog_id:int}")
+async def rota_changelog_confirma_del(query, context, changelog_id: int):
+    removido = await db.deletar_changelog(changelog_id, autor_id=query.from_user.id)
     await query.edit_message_text(
-        texto,
-        parse_mode='Markdown',
-        reply_markup=InlineKeyboardMarkup(buttons)
+        f"✅ Changelog #{changelog_id} deletado com sucesso!" if removido
+        else f"❌ O changelog #{changelog_id} não existe mais ou não foi criado por você.",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Menu Changelog", callback_data="changelog_menu")
+        ]])
     )
 
 
-async def handle_filtro(query, context):
-    """Processa filtros de tarefas"""
-    data = query.data
-    
-    # Extrair filtro
-    if "filtro_cat_" in data:
-        categoria = data.replace("filtro_cat_", "")
-        tarefas = db.listar_tarefas(categoria=categoria if categoria != "Todas" else None)
-        titulo = f"📁 Categoria: {categoria}"
-    
-    elif "filtro_status_" in data:
-        status = data.replace("filtro_status_", "")
-        tarefas = db.listar_tarefas(status=status)
-        status_nome = status.replace('_', ' ').title()
-        titulo = f"{STATUS_EMOJI.get(status, '📌')} Status: {status_nome}"
-    
-    elif data == "filtro_refresh":
-        tarefas = db.listar_tarefas()
-        titulo = "📋 Todas as tarefas"
-
-    elif data == "filtro_categorias":
-        # Mostrar menu de categorias
-        categorias = db.listar_categorias()
-        keyboard = menu_categorias(categorias)
-        await query.edit_message_text(
-            "*🖥️ Selecione uma categoria:*",
-            reply_markup=keyboard,
-            parse_mode='Markdown'
-        )
-        return
+def argumentos_filtro(filtro: str) -> Dict:
+    """Converte o código de filtro das callbacks (todas, arq, s_<status>, c_<id>, a_<id>) em filtros do banco"""
+    tipo, _, valor = filtro.partition("_")
+
+    if tipo == "arq":
+        return {'arquivo': True}
+
+    if tipo == "s":
+        return {'status': valor}
+    if tipo == "c":
+        return {'categoria_id': int(valor)}
+    if tipo == "a":
+        return {'autor_id': int(valor)}
+    return {}
 
+
+async def titulo_filtro(filtro: str) -> str:
+    """Título exibido no topo de uma lista filtrada"""
+    tipo, _, valor = filtro.partition("_")
+
+    if tipo == "s":
+        status_nome = valor.replace('_', ' ').title()
+        return f"{STATUS_EMOJI.get(valor, '📌')} Status: {status_nome}"
+
+    if tipo == "c":
+        categoria_nome = db.nome_categoria(int(valor)) or "Desconhecida"
+        return f"📁 Categoria: {categoria_nome}"
+
+    if tipo == "a":
+        return "👤 Suas tarefas"
+
+    if tipo == "arq":
+        return "🗄️ Arquivo"
+
+    return "📋 Todas as tarefas"
+
+
+async def mostrar_lista_filtrada(query, filtro: str, origem: str = "m",
+                                 direcao: Optional[str] = None, cursor: Optional[int] = None):
+    """Mostra uma página da lista de tarefas filtrada
+
+    origem indica para onde o botão de voltar leva: "m" (menu principal) ou "f" (filtros).
+    direcao/cursor vêm dos botões de navegação: "p" avança após o id, "a" volta antes dele.
+    """
+    texto, keyboard = await montar_lista_filtrada(filtro, origem, direcao, cursor)
+    await query.edit_message_text(texto, parse_mode='Markdown', reply_markup=keyboard)
+
+
+async def montar_lista_filtrada(filtro: str, origem: str = "m",
+                                direcao: Optional[str] = None, cursor: Optional[int] = None):
+    """Monta o texto e os botões de uma página da lista filtrada"""
+    pagina = await db.listar_tarefas_pagina(
+        tamanho=TAREFAS_POR_PAGINA,
+        apos_id=cursor if direcao == "p" else None,
+        antes_id=cursor if direcao == "a" else None,
+        **argumentos_filtro(filtro)
+    )
+    titulo = await titulo_filtro(filtro)
+
+    if origem == "f":
+        voltar_callback, voltar_texto = "voltar_filtros", "🔙 Voltar aos filtros"
     else:
-        return
-    
-    if not tarefas:
-        await query.edit_message_text(
-            f"{titulo}\n\n❌ Nenhuma tarefa encontrada.",
-            reply_markup=keyboard_filtros()
-        )
-        return
-    
-    # Mostrar lista de tarefas
+        voltar_callback, voltar_texto = "menu_voltar", "🔙 Voltar ao Menu"
+
+    if not pagina['tarefas']:
+        if origem == "f":
+            keyboard = keyboard_filtros()
+        else:
+            keyboard = InlineKeyboardMarkup([[InlineKeyboardButton(voltar_texto, callback_data=voltar_callback)]])
+        return f"*{titulo}*\n\n❌ Nenhuma tarefa encontrada.", keyboard
+
     texto = f"*{titulo}*\n\n"
-    
-    buttons = []
-    for tarefa in tarefas[:20]:  # Limita a 20
-        emoji_status = STATUS_EMOJI.get(tarefa['status'], '📌')
-        emoji_pri = PRIORIDADE_EMOJI.get(tarefa['prioridade'], '🟡')
-        
-        label = f"{emoji_status} {emoji_pri} #{tarefa['id']} - {tarefa['titulo'][:30]}"
-        buttons.append([InlineKeyboardButton(label, callback_data=f"ver_{tarefa['id']}")])
-    
-    buttons.append([InlineKeyboardButton("🔙 Voltar aos filtros", callback_data="voltar_filtros")])
-    
+
+    return texto, lista_tarefas_paginada(pagina, f"pag_{origem}", filtro, voltar_callback, voltar_texto)
+
+
+@rotas.rota("filtro_cat_{categoria_id:int}")
+async def rota_filtro_cat(query, context, categoria_id: int):
+    await mostrar_lista_filtrada(query, f"c_{categoria_id}", origem="f")
+
+
+@rotas.rota("filtro_status_{status:resto}")
+async def rota_filtro_status(query, context, status: str):
+    await mostrar_lista_filtrada(query, f"s_{status}", origem="f")
+
+
+@rotas.rota("filtro_refresh")
+async def rota_filtro_refresh(query, context):
+    await mostrar_lista_filtrada(query, "todas", origem="f")
+
+
+@rotas.rota("filtro_arquivo")
+async def rota_filtro_arquivo(query, context):
+    await mostrar_lista_filtrada(query, "arq", origem="f")
+
+
+@rotas.rota("filtro_categorias")
+async def rota_filtro_categorias(query, context):
+    # Mostrar menu de categorias
+    keyboard = menu_categorias(db.catalogo_categorias())
     await query.edit_message_text(
-        texto,
-        parse_mode='Markdown',
-        reply_markup=InlineKeyboardMarkup(buttons)
+        "*🖥️ Selecione uma categoria:*",
+        reply_markup=keyboard,
+        parse_mode='Markdown'
     )
 
 
-async def mostrar_tarefa(query, tarefa_id: int):
-    """Mostra detalhes de uma tarefa"""
-    tarefa = db.obter_tarefa(tarefa_id)
+async def mostrar_tarefa(query, tarefa_id: int, tarefa: Optional[dict] = None):
+    """Mostra detalhes de uma tarefa (a recebida, se já veio de uma alteração)"""
+    global edicoes_evitadas
+
+    if tarefa is None:
+        tarefa = await db.obter_tarefa(tarefa_id)
 
     if not tarefa:
         await query.edit_message_text("❌ Tarefa não encontrada.")
         return
 
-    texto = formatar_tarefa(tarefa)
-
-    # Obter ID do usuário que está visualizando
-    user_id = query.from_user.id
+    # Texto e botões de acordo com quem está visualizando (arquivadas são somente leitura)
+    render = renderizar_tarefa(tarefa, query.from_user.id)
+    texto, keyboard = render
 
-    # Criar keyboard de ações
-    keyboard = acoes_tarefa(tarefa_id, tarefa['autor_id'], user_id)
+    # Nada mudou desde a última exibição (ex.: status clicado de novo): não reenvia
+    if ja_exibida(query.message, render, bool(tarefa['imagem_file_id'])):
+        edicoes_evitadas += 1
+        return
 
     # Se tem imagem, envia como caption
     if tarefa['imagem_file_id']:
         # Deletar mensagem anterior e enviar nova com foto no tópico correto
         chat_id = query.message.chat_id
         await query.message.delete()
-        await enviar_foto_no_topico(
+        enviada = await enviar_foto_no_topico(
             bot=query.get_bot(),
             chat_id=chat_id,
             photo=tarefa['imagem_file_id'],
@@ -1822,28 +2070,47 @@ async def mostrar_tarefa(query, tarefa_id: int):
             reply_markup=keyboard
         )
     else:
-        await query.edit_message_text(
-            texto,
-            parse_mode='Markdown',
-            reply_markup=keyboard
-        )
-
-
-async def mudar_status(query, tarefa_id: int, novo_status: str):
-    """Muda o status de uma tarefa"""
-    db.atualizar_status(tarefa_id, novo_status)
+        try:
+            enviada = await query.edit_message_text(
+                texto,
+                parse_mode='Markdown',
+                reply_markup=keyboard
+            )
+        except BadRequest as e:
+            # Mesma renderização, mas mostrada antes de o bot reiniciar
+            if "not modified" not in str(e).lower():
+                raise
+            edicoes_evitadas += 1
+            enviada = query.message
+    registrar_exibicao(enviada, render)
+
+
+async def mudar_status(query, tarefa_id: int, novo_status: str, status_atual: str):
+    """Muda o status de uma tarefa, se ainda estiver no status que o usuário viu"""
+    tarefa = await db.atualizar_status(tarefa_id, novo_status, status_atual=status_atual)
+    if not tarefa:
+        if not await db.obter_tarefa(tarefa_id):
+            await responder(query, "❌ Tarefa não encontrada", show_alert=True)
+            return
+        # Outra pessoa mudou o status antes: mostra como ficou em vez de sobrescrever
+        await responder(query, TAREFA_MUDOU, show_alert=True)
+        await mostrar_tarefa(query, tarefa_id)
+        return
     
     emoji = STATUS_EMOJI.get(novo_status, '📌')
     status_nome = novo_status.replace('_', ' ').title()
-    await query.answer(f"{emoji} Status atualizado para: {status_nome}")
+    await responder(query, f"{emoji} Status atualizado para: {status_nome}")
     
-    # Atualiza a visualização
-    await mostrar_tarefa(query, tarefa_id)
+    # Atualiza a visualização com a linha que a alteração devolveu
+    await mostrar_tarefa(query, tarefa_id, tarefa)
 
 
 async def confirmar_delecao(query, tarefa_id: int):
     """Pede confirmação para deletar"""
-    tarefa = db.obter_tarefa(tarefa_id)
+    tarefa = await db.obter_tarefa(tarefa_id)
+    if not tarefa:
+        await responder(query, "❌ Tarefa não encontrada", show_alert=True)
+        return
 
     texto = f"⚠️ *Confirmar exclusão*\n\n"
     texto += f"Tem certeza que deseja deletar a tarefa:\n\n"
@@ -1870,8 +2137,15 @@ async def confirmar_delecao(query, tarefa_id: int):
 
 
 async def deletar_tarefa(query, tarefa_id: int):
-    """Deleta uma tarefa"""
-    db.deletar_tarefa(tarefa_id)
+    """Deleta uma tarefa (apenas o autor)"""
+    if not await db.deletar_tarefa(tarefa_id, autor_id=query.from_user.id):
+        await query.edit_message_text(
+            f"❌ A tarefa #{tarefa_id} não existe mais ou não foi criada por você.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("📋 Ver tarefas", callback_data="voltar_lista")
+            ]])
+        )
+        return
     
     await query.edit_message_text(
         f"✅ Tarefa #{tarefa_id} deletada com sucesso!",
@@ -1907,7 +2181,11 @@ async def mostrar_opcoes_edicao(query, tarefa_id: int):
 
 async def mostrar_comentarios(query, tarefa_id: int):
     """Mostra comentários de uma tarefa"""
-    comentarios = db.listar_comentarios(tarefa_id)
+    tarefa = await db.obter_tarefa(tarefa_id)
+    if not tarefa:
+        await responder(query, "❌ Tarefa não encontrada", show_alert=True)
+        return
+    comentarios = await db.listar_comentarios(tarefa_id)
 
     texto = f"💬 *Comentários da Tarefa #{tarefa_id}*\n\n"
 
@@ -1915,8 +2193,7 @@ async def mostrar_comentarios(query, tarefa_id: int):
         texto += "Nenhum comentário ainda.\n"
     else:
         for com in comentarios:
-            data = datetime.fromisoformat(com['data'])
-            texto += f"👤 *{com['autor_nome']}* - `{data.strftime('%d/%m %H:%M')}`\n"
+            texto += f"👤 *{com['autor_nome']}* - `{formatar_data(com['data'], '%d/%m %H:%M')}`\n"
             texto += f"{com['comentario']}\n\n"
 
     # Verificar se a mensagem tem foto (não tem texto para editar)
@@ -1929,14 +2206,14 @@ async def mostrar_comentarios(query, tarefa_id: int):
             chat_id=chat_id,
             text=texto,
             parse_mode='Markdown',
-            reply_markup=voltar_tarefa(tarefa_id)
+            reply_markup=voltar_tarefa(tarefa_id, tarefa['arquivada'])
         )
     else:
         # Se não tem foto, apenas editar o texto
         await query.edit_message_text(
             texto,
             parse_mode='Markdown',
-            reply_markup=voltar_tarefa(tarefa_id)
+            reply_markup=voltar_tarefa(tarefa_id, tarefa['arquivada'])
         )
 
 
@@ -1957,13 +2234,17 @@ async def adicionar_comentario_cmd(update: Update, context: ContextTypes.DEFAULT
         tarefa_id = int(context.args[0])
         comentario = " ".join(context.args[1:])
 
-        tarefa = db.obter_tarefa(tarefa_id)
+        tarefa = await db.obter_tarefa(tarefa_id)
         if not tarefa:
             await update.message.reply_text("❌ Tarefa não encontrada")
             return
 
+        if tarefa['arquivada']:
+            await update.message.reply_text("🗄️ Tarefa arquivada não recebe novos comentários")
+            return
+
         user = update.effective_user
-        db.adicionar_comentario(tarefa_id, user.id, user.first_name, comentario)
+        await db.adicionar_comentario(tarefa_id, user.id, user.first_name, comentario)
 
         await update.message.reply_text(f"✅ Comentário adicionado à tarefa #{tarefa_id}!")
 
@@ -2005,20 +2286,10 @@ async def iniciar_adicionar_comentario(query, tarefa_id: int):
 
 async def voltar_lista(query):
     """Volta para a lista de tarefas com filtros"""
-    tarefas = db.listar_tarefas()
-    
-    texto = "📋 *Tarefas do Ashy Task*\n\n"
-    texto += "_Use os filtros abaixo para organizar:_\n\n"
-
-    for status in STATUS:
-        count = len([t for t in tarefas if t['status'] == status])
-        emoji = STATUS_EMOJI.get(status, '📌')
-        # Substituir underscore por espaço e capitalizar
-        status_nome = status.replace('_', ' ').title()
-        texto += f"{emoji} {status_nome}: `{count}`\n"
+    contagem = await db.contar_tarefas()
 
     await query.edit_message_text(
-        texto,
+        texto_resumo_tarefas(contagem),
         parse_mode='Markdown',
         reply_markup=keyboard_filtros()
     )
@@ -2026,6 +2297,45 @@ async def voltar_lista(query):
 
 # ============ MAIN ============
 
+async def iniciar(application: Application):
+    """Abre os bancos já existentes (conferindo os contadores) antes de atender updates"""
+    if db.particionado:
+        logger.info(f"🧱 Um banco por chat em {db.diretorio} ({len(db.chats())} existente(s))")
+    await db.em_todos("versao_schema")
+
+
+async def selecionar_shard(update: object, context: ContextTypes.DEFAULT_TYPE):
+    """Aponta o banco para o shard do chat do update (roda antes dos demais handlers)"""
+    chat = update.effective_chat if isinstance(update, Update) else None
+    chat_atual.set(chat.id if chat else None)
+
+    # Abre o banco do chat fora do event loop antes que os handlers o usem e
+    # o retém até o fim do update
+    if chat or not db.particionado:
+        await db.reter()
+
+
+async def job_arquivar(context: ContextTypes.DEFAULT_TYPE):
+    """Job diário: move para o arquivo as tarefas concluídas há mais de ARQUIVO_DIAS dias"""
+    await db.em_todos("arquivar", context.job.data)
+
+
+async def job_backup(context: ContextTypes.DEFAULT_TYPE):
+    """Job periódico: grava um backup de cada banco e registra tamanho e duração no log"""
+    resultados = await db.em_todos("fazer_backup", BACKUP_DIR, BACKUP_MANTER)
+
+    for resultado in resultados.values():
+        logger.info(
+            f"Backup {resultado.caminho}: {resultado.tamanho / 1024:.1f} KiB "
+            f"em {resultado.duracao:.2f}s ({resultado.removidos} antigo(s) removido(s))"
+        )
+
+
+async def encerrar(application: Application):
+    """Fecha o banco ao desligar o bot"""
+    await db.fechar()
+
+
 def main():
     """Função principal"""
     # Carregar token do arquivo .env
@@ -2038,8 +2348,20 @@ def main():
         return
 
     # Criar aplicação
-    application = Application.builder().token(TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .rate_limiter(limitador)
+        .update_queue(fila_updates)
+        .concurrent_updates(processador)
+        .post_init(iniciar)
+        .post_shutdown(encerrar)
+        .build()
+    )
     
+    # Escolhe o banco do chat antes de qualquer outro handler
+    application.add_handler(TypeHandler(Update, selecionar_shard), group=-1)
+
     # Handlers de comandos
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("ajuda", ajuda))
@@ -2050,9 +2372,15 @@ def main():
     application.add_handler(CommandHandler("minhas", minhas_tarefas))
     application.add_handler(CommandHandler("comentar", adicionar_comentario_cmd))
     application.add_handler(CommandHandler("buscar", handlers.buscar_tarefas))
+    application.add_handler(CommandHandler("arquivo", arquivo))
     application.add_handler(CommandHandler("addcategoria", handlers.adicionar_categoria))
     application.add_handler(CommandHandler("topicoid", topicoid))
     application.add_handler(CommandHandler("settopico", settopico))
+    application.add_handler(CommandHandler("dbinfo", dbinfo))
+    application.add_handler(CommandHandler("backup", backup))
+    application.add_handler(CommandHandler("importar", importar))
+    application.add_handler(CommandHandler("exportar", exportar))
+    application.add_handler(MessageHandler(filters.Document.ALL & filters.CaptionRegex(r"^/importar\b"), importar))
     
     # ConversationHandler para criar nova tarefa
     conv_handler = ConversationHandler(
@@ -2078,9 +2406,52 @@ def main():
     # Handler para capturar mensagens de texto (edição inline e comentários)
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, processar_mensagem_texto))
 
+    # Tarefas periódicas: arquivamento das concluídas e backup do banco
+    if application.job_queue:
+        if ARQUIVO_DIAS > 0:
+            application.job_queue.run_repeating(
+                job_arquivar, interval=86400, first=60, data=ARQUIVO_DIAS, name="arquivar"
+            )
+        if BACKUP_INTERVALO_HORAS > 0:
+            application.job_queue.run_repeating(
+                job_backup, interval=BACKUP_INTERVALO_HORAS * 3600, first=300, name="backup"
+            )
+    elif ARQUIVO_DIAS > 0 or BACKUP_INTERVALO_HORAS > 0:
+        logger.warning("JobQueue indisponível: instale python-telegram-bot[job-queue] para arquivar e fazer backups")
+
     # Iniciar bot
     logger.info(f"🚀 Ashy Task Bot v{VERSION} iniciado!")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if WEBHOOK_URL:
+        iniciar_webhook(application)
+    else:
+        application.run_polling(allowed_updates=UPDATES_TRATADOS)
+
+
+def iniciar_webhook(application: Application):
+    """Registra o webhook no Telegram e atende os updates por HTTP"""
+    secret = WEBHOOK_SECRET
+    if not secret:
+        # Sem segredo configurado, um novo a cada início (o webhook é registrado de novo)
+        secret = secrets.token_urlsafe(32)
+    elif not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", secret):
+        logger.error("❌ WEBHOOK_SECRET deve ter de 1 a 256 caracteres entre A-Z, a-z, 0-9, _ e -")
+        return
+
+    # O servidor escuta no mesmo caminho da URL pública
+    caminho = urlsplit(WEBHOOK_URL).path.strip("/")
+
+    logger.info(f"🌐 Webhook em {WEBHOOK_URL} (escutando em {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{caminho})")
+    application.run_webhook(
+        listen=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        url_path=caminho,
+        webhook_url=WEBHOOK_URL,
+        secret_token=secret,
+        cert=WEBHOOK_CERT,
+        key=WEBHOOK_KEY,
+        max_connections=WEBHOOK_MAX_CONEXOES,
+        allowed_updates=UPDATES_TRATADOS
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class CacheLRU:
+    """Cache LRU com expiração (TTL) e contadores de acerto/erro.
+
+    Seguro entre threads. Para evitar guardar um valor lido antes de uma
+    invalidação concorrente, quem lê do banco captura ``geracao()`` antes
+    da consulta e a repassa a ``guardar()``: se houve invalidação nesse
+    meio tempo, o valor é descartado.
+    """
+
+    def __init__(self, capacidade: int = 256, ttl: Optional[float] = 300.0):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.acertos = 0
+        self.erros = 0
+        self._itens: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave: Hashable) -> Optional[Any]:
+        """Retorna o valor guardado ou None (ausente ou expirado)"""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                valor, expira = item
+                if expira is None or expira > time.monotonic():
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return valor
+                del self._itens[chave]
+            self.erros += 1
+            return None
+
+    def geracao(self) -> int:
+        """Marca o início de uma leitura no banco (ver guardar)"""
+        return self._geracao
+
+    def guardar(self, chave: Hashable, valor: Any, geracao: Optional[int] = None):
+        """Guarda um valor, descartando-o se houve invalidação desde ``geracao``"""
+        if self.capacidade <= 0:
+            return
+
+        expira = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if geracao is not None and geracao != self._geracao:
+                return
+            self._itens[chave] = (valor, expira)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, chave: Hashable):
+        """Remove uma chave do cache"""
+        with self._lock:
+            self._geracao += 1
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        """Esvazia o cache"""
+        with self._lock:
+            self._geracao += 1
+            self._itens.clear()
+
+    def estatisticas(self) -> Dict:
+        """Retorna ocupação e taxa de acerto do cache"""
+        consultas = self.acertos + self.erros
+        return {
+            'itens': len(self._itens),
+            'capacidade': self.capacidade,
+            'acertos': self.acertos,
+            'erros': self.erros,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0
+        }
@@ -1,20 +1,389 @@
+import asyncio
+import functools
+import logging
+import os
+import queue
+import re
 import sqlite3
-from datetime import datetime
-from typing import List, Dict, Optional
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Dict, NamedTuple, Optional, Tuple
+
+from backup import ResultadoBackup, fazer_backup, nome_base
+from cache import CacheLRU
+from fila_escrita import FilaEscrita
+from registros import Changelog, Comentario, Tarefa
+from importacao import (COLUNAS_EXPORTACAO, RegistroInvalido, escrever_registros,
+                        ler_registros, validar_tarefa)
+
+# Perfil de PRAGMAs aplicado a cada conexão (sobrescrito por DB_<NOME> no .env)
+PRAGMAS_PADRAO = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": "5000",       # ms
+    "cache_size": "-16000",       # negativo = KiB (~16 MB por conexão)
+    "mmap_size": "268435456",     # 256 MB de I/O mapeado em memória
+    "temp_store": "MEMORY",
+}
+
+
+logger = logging.getLogger(__name__)
+
+
+def agora() -> int:
+    """Momento atual em epoch UTC (segundos), formato de todas as datas do banco"""
+    return int(time.time())
+
+
+# ============ MIGRAÇÕES ============
+#
+# Cada migração leva o schema da versão anterior para a sua; a versão
+# aplicada fica em schema_version. Bancos novos já nascem no schema atual
+# (ver Database._criar_tabelas) e são marcados com a última versão.
+# Migrações são fixas: nunca altere uma já publicada, acrescente outra.
+
+def _reconstruir_tabela(cursor: sqlite3.Cursor, tabela: str, ddl: str, colunas: str, select: str):
+    """Recria ``tabela`` com um novo ``ddl``, copiando as linhas via ``select``
+
+    SQLite não altera o tipo de uma coluna: cria-se a tabela nova, copia-se
+    e troca-se o nome. Índices e gatilhos da antiga somem junto com ela e
+    são recriados por _criar_tabelas. Exige foreign_keys desligado.
+    """
+    sequencia = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabela,)).fetchone()
+
+    cursor.execute(ddl.format(tabela=f"{tabela}_nova"))
+    cursor.execute(f"INSERT INTO {tabela}_nova ({colunas}) {select.format(tabela=tabela)}")
+    cursor.execute(f"DROP TABLE {tabela}")
+    cursor.execute(f"ALTER TABLE {tabela}_nova RENAME TO {tabela}")
+
+    # Preserva o AUTOINCREMENT: ids de linhas apagadas não devem ser reutilizados
+    if sequencia:
+        cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequencia[0], tabela))
+
+
+def _epoch(coluna: str, obrigatoria: bool = False) -> str:
+    """Expressão SQL que converte texto 'AAAA-MM-DD HH:MM:SS' (hora local) em epoch UTC"""
+    expressao = f"CAST(strftime('%s', {coluna}, 'utc') AS INTEGER)"
+    if obrigatoria:
+        expressao = f"COALESCE({expressao}, CAST(strftime('%s', 'now') AS INTEGER))"
+    return expressao
+
+
+def _migracao_datas_epoch(cursor: sqlite3.Cursor):
+    """Datas em texto viram inteiros (epoch UTC)"""
+    _reconstruir_tabela(cursor, "tarefas", """
+        CREATE TABLE {tabela} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            titulo TEXT NOT NULL,
+            descricao TEXT,
+            categoria_id INTEGER,
+            autor_id INTEGER NOT NULL,
+            autor_nome TEXT NOT NULL,
+            atribuido_id INTEGER,
+            atribuido_nome TEXT,
+            status TEXT DEFAULT 'pendente',
+            prioridade TEXT DEFAULT 'media',
+            imagem_file_id TEXT,
+            data_criacao INTEGER NOT NULL,
+            data_conclusao INTEGER,
+            FOREIGN KEY (categoria_id) REFERENCES categorias(id)
+        )
+    """, "id, titulo, descricao, categoria_id, autor_id, autor_nome, atribuido_id, atribuido_nome, "
+         "status, prioridade, imagem_file_id, data_criacao, data_conclusao", f"""
+        SELECT id, titulo, descricao, categoria_id, autor_id, autor_nome, atribuido_id, atribuido_nome,
+               status, prioridade, imagem_file_id, {_epoch('data_criacao', True)}, {_epoch('data_conclusao')}
+        FROM {{tabela}}
+    """)
+
+    _reconstruir_tabela(cursor, "comentarios", """
+        CREATE TABLE {tabela} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tarefa_id INTEGER NOT NULL,
+            autor_id INTEGER NOT NULL,
+            autor_nome TEXT NOT NULL,
+            comentario TEXT NOT NULL,
+            data INTEGER NOT NULL,
+            FOREIGN KEY (tarefa_id) REFERENCES tarefas(id) ON DELETE CASCADE
+        )
+    """, "id, tarefa_id, autor_id, autor_nome, comentario, data", f"""
+        SELECT id, tarefa_id, autor_id, autor_nome, comentario, {_epoch('data', True)}
+        FROM {{tabela}}
+    """)
+
+    _reconstruir_tabela(cursor, "changelogs", """
+        CREATE TABLE {tabela} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            categoria TEXT NOT NULL,
+            descricao TEXT NOT NULL,
+            autor_id INTEGER NOT NULL,
+            autor_nome TEXT NOT NULL,
+            data_criacao INTEGER NOT NULL,
+            pinado INTEGER DEFAULT 0
+        )
+    """, "id, categoria, descricao, autor_id, autor_nome, data_criacao, pinado", f"""
+        SELECT id, categoria, descricao, autor_id, autor_nome, {_epoch('data_criacao', True)}, pinado
+        FROM {{tabela}}
+    """)
+
+
+def _migracao_atividade(cursor: sqlite3.Cursor):
+    """Tarefas ganham total de comentários e data da última atividade"""
+    tabelas = [("tarefas", "comentarios")]
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tarefas_arquivo'").fetchone():
+        tabelas.append(("tarefas_arquivo", "comentarios_arquivo"))
+
+    for tarefas, comentarios in tabelas:
+        cursor.execute(f"ALTER TABLE {tarefas} ADD COLUMN total_comentarios INTEGER NOT NULL DEFAULT 0")
+        cursor.execute(f"ALTER TABLE {tarefas} ADD COLUMN ultima_atividade INTEGER")
+        cursor.execute(f"""
+            UPDATE {tarefas} SET
+                total_comentarios = (SELECT COUNT(*) FROM {comentarios} WHERE tarefa_id = {tarefas}.id),
+                ultima_atividade = MAX(
+                    data_criacao,
+                    COALESCE(data_conclusao, 0),
+                    COALESCE((SELECT MAX(data) FROM {comentarios} WHERE tarefa_id = {tarefas}.id), 0)
+                )
+        """)
+
+
+def _migracao_versao(cursor: sqlite3.Cursor):
+    """Tarefas ganham um número de versão, incrementado a cada alteração"""
+    tabelas = ["tarefas"]
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tarefas_arquivo'").fetchone():
+        tabelas.append("tarefas_arquivo")
+
+    for tarefas in tabelas:
+        cursor.execute(f"ALTER TABLE {tarefas} ADD COLUMN versao INTEGER NOT NULL DEFAULT 0")
+
+
+# (versão, descrição, função) em ordem crescente de versão
+MIGRACOES = [
+    (1, "Datas como epoch UTC inteiro", _migracao_datas_epoch),
+    (2, "Total de comentários e última atividade das tarefas", _migracao_atividade),
+    (3, "Versão das tarefas", _migracao_versao),
+]
+
+
+class ConfigTopico(NamedTuple):
+    """Tópico configurado por /settopico, já convertido para uso direto"""
+    id: Optional[str]
+    nome: Optional[str]
+    chat_id: Optional[str]
+    thread_id: Optional[int]    # None quando não há restrição de tópico
+
+    @classmethod
+    def de_config(cls, config: Dict[str, str]) -> "ConfigTopico":
+        topico_id = config.get('topico_permitido')
+        try:
+            thread_id = int(topico_id) if topico_id and topico_id != 'off' else None
+        except ValueError:
+            thread_id = None
+        return cls(topico_id, config.get('topico_nome'), config.get('topico_chat_id'), thread_id)
+
+
+def carregar_pragmas() -> Dict[str, str]:
+    """Monta o perfil de PRAGMAs a partir do padrão e das variáveis DB_*"""
+    pragmas = {}
+    for nome, padrao in PRAGMAS_PADRAO.items():
+        valor = os.getenv(f"DB_{nome.upper()}", padrao).strip()
+        # Valores de PRAGMA não aceitam parâmetros: só palavras e números
+        if not valor.lstrip("-").isalnum():
+            raise ValueError(f"Valor inválido para DB_{nome.upper()}: {valor!r}")
+        pragmas[nome] = valor
+    return pragmas
+
 
 class Database:
-    def __init__(self, db_name: str = "tarefas_bot.db"):
+    def __init__(self, db_name: str = "tarefas_bot.db", tamanho_pool: int = 5,
+                 pragmas: Optional[Dict[str, str]] = None,
+                 cache_tarefas: int = 256, ttl_cache: float = 300.0,
+                 janela_escrita: float = 0.005):
         self.db_name = db_name
+        self.tamanho_pool = tamanho_pool
+        self.pragmas = pragmas if pragmas is not None else carregar_pragmas()
+        self.fts = False
+
+        # Pool de conexões de leitura: reaproveitadas durante toda a vida do processo
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(tamanho_pool)
+
+        # Conexão única de escrita, fora do pool: leitores ocupando todas as
+        # vagas não atrasam uma escrita, e escritas nunca disputam o lock do SQLite
+        self._escritor: Optional[sqlite3.Connection] = None
+        self._lock_escrita = threading.Lock()
+
+        # Inserções frequentes passam pela fila de commit em grupo
+        self.fila = FilaEscrita(self.conexao_escrita, janela=janela_escrita)
+
+        # Cache de leitura de obter_tarefa, invalidado por toda escrita na tarefa
+        self.cache_tarefas = CacheLRU(cache_tarefas, ttl_cache)
+
+        # Cache de configurações (ver recarregar_config)
+        self._config_lock = threading.Lock()
+        self._config: Dict[str, str] = {}
+        self._topico = ConfigTopico.de_config(self._config)
+
+        # Catálogo de categorias (ver recarregar_categorias)
+        self._categorias: Tuple[Tuple[int, str], ...] = ()
+        self._categoria_por_id: Dict[int, str] = {}
+        self._categoria_por_nome: Dict[str, int] = {}
+
         self.init_db()
-    
-    def get_connection(self):
-        return sqlite3.connect(self.db_name)
-    
+        self.recarregar_config()
+        self.recarregar_categorias()
+
+    def _criar_conexao(self) -> sqlite3.Connection:
+        """Abre uma nova conexão com o banco (usada apenas pelo pool)"""
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        for nome, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nome} = {valor}")
+        return conn
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão do pool e a devolve ao final do bloco"""
+        # Bloqueia se todas as conexões do pool estiverem em uso
+        self._vagas.acquire()
+        try:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = self._criar_conexao()
+            try:
+                yield conn
+            finally:
+                # Nunca devolver ao pool uma conexão com transação pendente
+                if conn.in_transaction:
+                    conn.rollback()
+                self._pool.put(conn)
+        finally:
+            self._vagas.release()
+
+    @contextmanager
+    def conexao_escrita(self):
+        """Empresta a conexão de escrita; quem escreve espera a vez aqui, não no SQLite"""
+        with self._lock_escrita:
+            if self._escritor is None:
+                self._escritor = self._criar_conexao()
+            conn = self._escritor
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+
+    @contextmanager
+    def transacao(self):
+        """Executa o bloco em uma transação: commit no sucesso, rollback em erro"""
+        with self.conexao_escrita() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def fechar(self):
+        """Grava o que estiver na fila de escrita e fecha a conexão de escrita e as ociosas do pool"""
+        self.fila.fechar()
+        with self._lock_escrita:
+            if self._escritor is not None:
+                self._escritor.close()
+                self._escritor = None
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+    def info_banco(self) -> Dict:
+        """Retorna informações do banco e os PRAGMAs efetivamente em uso"""
+        with self.conexao() as conn:
+            pragmas = {}
+            for nome in self.pragmas:
+                row = conn.execute(f"PRAGMA {nome}").fetchone()
+                pragmas[nome] = str(row[0]) if row else "?"
+
+        return {
+            'arquivo': self.db_name,
+            'tamanho': os.path.getsize(self.db_name) if os.path.exists(self.db_name) else 0,
+            'sqlite': sqlite3.sqlite_version,
+            'schema': self.versao_schema(),
+            'pool': self.tamanho_pool,
+            'pragmas': pragmas,
+            'cache_tarefas': self.cache_tarefas.estatisticas(),
+            'fila_escrita': self.fila.metricas()
+        }
+
+    def fazer_backup(self, diretorio: str, manter: int = 7) -> ResultadoBackup:
+        """Grava um snapshot comprimido do banco em ``diretorio`` (ver backup.py)
+
+        A cópia usa uma conexão do pool e avança em passos curtos, sem
+        travar as escritas do bot por mais que um passo.
+        """
+        with self.conexao() as conn:
+            return fazer_backup(conn, diretorio, nome_base(self.db_name), manter)
+
     def init_db(self):
-        """Inicializa o banco de dados com as tabelas necessárias"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+        """Inicializa o banco: aplica as migrações pendentes e cria o que faltar"""
+        with self.conexao_escrita() as conn:
+            # Reconstruir tabelas exige FKs desligadas, e o PRAGMA não tem
+            # efeito dentro de transação
+            conn.execute("PRAGMA foreign_keys = OFF")
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.cursor()
+
+                novo = cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tarefas'"
+                ).fetchone() is None
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        versao INTEGER PRIMARY KEY,
+                        descricao TEXT NOT NULL,
+                        aplicada_em INTEGER NOT NULL
+                    )
+                """)
+
+                if novo:
+                    self._criar_tabelas(cursor)
+                    pendentes = MIGRACOES
+                else:
+                    versao = cursor.execute("SELECT COALESCE(MAX(versao), 0) FROM schema_version").fetchone()[0]
+                    pendentes = [m for m in MIGRACOES if m[0] > versao]
+                    for numero, descricao, migrar in pendentes:
+                        logger.info(f"Aplicando migração {numero}: {descricao}")
+                        migrar(cursor)
+                    self._criar_tabelas(cursor)
+
+                # Banco novo já está no schema atual: só registra as versões
+                cursor.executemany(
+                    "INSERT INTO schema_version (versao, descricao, aplicada_em) VALUES (?, ?, ?)",
+                    [(numero, descricao, agora()) for numero, descricao, _ in pendentes]
+                )
+
+                if pendentes and not novo:
+                    for tabela, linha, pai, _ in cursor.execute("PRAGMA foreign_key_check"):
+                        logger.warning(f"Chave estrangeira órfã: {tabela} rowid {linha} -> {pai}")
+
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                conn.execute(f"PRAGMA foreign_keys = {self.pragmas.get('foreign_keys', 'ON')}")
+
+    def versao_schema(self) -> int:
+        """Retorna a versão do schema aplicada ao banco"""
+        with self.conexao() as conn:
+            return conn.execute("SELECT COALESCE(MAX(versao), 0) FROM schema_version").fetchone()[0]
+
+    def _criar_tabelas(self, cursor: sqlite3.Cursor):
+        """Cria as tabelas e insere os dados padrão"""
         # Tabela de categorias
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS categorias (
@@ -37,8 +406,11 @@ class Database:
                 status TEXT DEFAULT 'pendente',
                 prioridade TEXT DEFAULT 'media',
                 imagem_file_id TEXT,
-                data_criacao TEXT NOT NULL,
-                data_conclusao TEXT,
+                data_criacao INTEGER NOT NULL,
+                data_conclusao INTEGER,
+                total_comentarios INTEGER NOT NULL DEFAULT 0,
+                ultima_atividade INTEGER,
+                versao INTEGER NOT NULL DEFAULT 0,
                 FOREIGN KEY (categoria_id) REFERENCES categorias(id)
             )
         """)
@@ -51,7 +423,7 @@ class Database:
                 autor_id INTEGER NOT NULL,
                 autor_nome TEXT NOT NULL,
                 comentario TEXT NOT NULL,
-                data TEXT NOT NULL,
+                data INTEGER NOT NULL,
                 FOREIGN KEY (tarefa_id) REFERENCES tarefas(id) ON DELETE CASCADE
             )
         """)
@@ -64,7 +436,7 @@ class Database:
                 descricao TEXT NOT NULL,
                 autor_id INTEGER NOT NULL,
                 autor_nome TEXT NOT NULL,
-                data_criacao TEXT NOT NULL,
+                data_criacao INTEGER NOT NULL,
                 pinado INTEGER DEFAULT 0
             )
         """)
@@ -85,6 +457,37 @@ class Database:
             )
         """)
 
+        # Índices para os caminhos de consulta mais usados
+        # (o rowid/id faz parte de todo índice, então "ORDER BY t.id DESC" também é atendido)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_categoria ON tarefas (categoria_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_categoria_status ON tarefas (categoria_id, status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_status ON tarefas (status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_autor ON tarefas (autor_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_data_criacao ON tarefas (data_criacao)")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tarefas_data_conclusao ON tarefas (data_conclusao)
+            WHERE data_conclusao IS NOT NULL
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_atividade ON tarefas (ultima_atividade)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_comentarios_tarefa_data ON comentarios (tarefa_id, data)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_changelogs_pinado_data ON changelogs (pinado DESC, data_criacao DESC)")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_changelogs_categoria_pinado_data
+            ON changelogs (categoria, pinado DESC, data_criacao DESC)
+        """)
+
+        # Índice de busca textual
+        self.fts = self._criar_busca(cursor)
+
+        # Contadores materializados para os resumos
+        self._criar_contadores(cursor)
+
+        # Total de comentários e última atividade por tarefa
+        self._criar_atividade(cursor)
+
+        # Arquivo das tarefas concluídas há muito tempo
+        self._criar_arquivo(cursor)
+
         # Inserir categorias padrão de tarefas
         categorias_padrao = ["XFCE", "Cinnamon", "GNOME", "Geral"]
         for cat in categorias_padrao:
@@ -95,161 +498,526 @@ class Database:
         for cat in categorias_changelog_padrao:
             cursor.execute("INSERT OR IGNORE INTO categorias_changelog (nome) VALUES (?)", (cat,))
 
-        conn.commit()
-        conn.close()
-    
+    def _criar_busca(self, cursor: sqlite3.Cursor) -> bool:
+        """Cria o índice FTS5 de tarefas e os gatilhos que o mantêm sincronizado"""
+        existia = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tarefas_fts'"
+        ).fetchone()
+
+        try:
+            # rowid = id da tarefa; acentos são ignorados ("configuração" ~ "configuracao")
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS tarefas_fts USING fts5(
+                    titulo, descricao, comentarios,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )
+            """)
+        except sqlite3.OperationalError:
+            # SQLite compilado sem FTS5: a busca usa LIKE
+            return False
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS tarefas_fts_insert AFTER INSERT ON tarefas BEGIN
+                INSERT INTO tarefas_fts (rowid, titulo, descricao) VALUES (new.id, new.titulo, new.descricao);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS tarefas_fts_update AFTER UPDATE OF titulo, descricao ON tarefas BEGIN
+                UPDATE tarefas_fts SET titulo = new.titulo, descricao = new.descricao WHERE rowid = new.id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS tarefas_fts_delete AFTER DELETE ON tarefas BEGIN
+                DELETE FROM tarefas_fts WHERE rowid = old.id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS comentarios_fts_insert AFTER INSERT ON comentarios BEGIN
+                UPDATE tarefas_fts
+                SET comentarios = COALESCE(comentarios || ' ', '') || new.comentario
+                WHERE rowid = new.tarefa_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS comentarios_fts_delete AFTER DELETE ON comentarios BEGIN
+                UPDATE tarefas_fts
+                SET comentarios = (SELECT group_concat(comentario, ' ') FROM comentarios
+                                   WHERE tarefa_id = old.tarefa_id)
+                WHERE rowid = old.tarefa_id;
+            END
+        """)
+
+        # Banco já existente: indexar as tarefas cadastradas antes do FTS
+        if not existia:
+            cursor.execute("""
+                INSERT INTO tarefas_fts (rowid, titulo, descricao, comentarios)
+                SELECT t.id, t.titulo, t.descricao,
+                       (SELECT group_concat(comentario, ' ') FROM comentarios WHERE tarefa_id = t.id)
+                FROM tarefas t
+            """)
+
+        return True
+
+    def _criar_atividade(self, cursor: sqlite3.Cursor):
+        """Gatilhos que mantêm total_comentarios e ultima_atividade em tarefas
+
+        Com as duas colunas na própria linha, as listas mostram a discussão
+        de cada tarefa sem uma consulta de comentários por linha. Mudanças de
+        status e edições atualizam ultima_atividade no próprio UPDATE.
+        """
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS atividade_comentario_insert AFTER INSERT ON comentarios BEGIN
+                UPDATE tarefas
+                SET total_comentarios = total_comentarios + 1,
+                    ultima_atividade = MAX(COALESCE(ultima_atividade, 0), new.data)
+                WHERE id = new.tarefa_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS atividade_comentario_delete AFTER DELETE ON comentarios BEGIN
+                UPDATE tarefas SET total_comentarios = total_comentarios - 1 WHERE id = old.tarefa_id;
+            END
+        """)
+
+    def _criar_arquivo(self, cursor: sqlite3.Cursor):
+        """Cria as tabelas frias para onde arquivar() move as tarefas antigas
+
+        Mesmas colunas das tabelas quentes (mais a data de arquivamento) e
+        sem gatilhos de contadores: o arquivo não entra nos resumos. As
+        tarefas arquivadas continuam no índice FTS com o mesmo rowid, já que
+        os ids (AUTOINCREMENT) nunca são reaproveitados.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tarefas_arquivo (
+                id INTEGER PRIMARY KEY,
+                titulo TEXT NOT NULL,
+                descricao TEXT,
+                categoria_id INTEGER,
+                autor_id INTEGER NOT NULL,
+                autor_nome TEXT NOT NULL,
+                atribuido_id INTEGER,
+                atribuido_nome TEXT,
+                status TEXT,
+                prioridade TEXT,
+                imagem_file_id TEXT,
+                data_criacao INTEGER NOT NULL,
+                data_conclusao INTEGER,
+                total_comentarios INTEGER NOT NULL DEFAULT 0,
+                ultima_atividade INTEGER,
+                versao INTEGER NOT NULL DEFAULT 0,
+                arquivada_em INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS comentarios_arquivo (
+                id INTEGER PRIMARY KEY,
+                tarefa_id INTEGER NOT NULL,
+                autor_id INTEGER NOT NULL,
+                autor_nome TEXT NOT NULL,
+                comentario TEXT NOT NULL,
+                data INTEGER NOT NULL,
+                FOREIGN KEY (tarefa_id) REFERENCES tarefas_arquivo(id) ON DELETE CASCADE
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_arquivo_categoria ON tarefas_arquivo (categoria_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_arquivo_autor ON tarefas_arquivo (autor_id)")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_comentarios_arquivo_tarefa_data ON comentarios_arquivo (tarefa_id, data)"
+        )
+
+    def _criar_contadores(self, cursor: sqlite3.Cursor):
+        """Cria a tabela de contadores e os gatilhos que a mantêm exata
+
+        Uma linha por (categoria, status, prioridade); categoria_id 0 agrupa
+        as tarefas sem categoria. Os resumos leem no máximo
+        categorias x status x prioridades linhas, seja qual for o
+        tamanho de tarefas.
+        """
+        existia = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contadores'"
+        ).fetchone()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS contadores (
+                categoria_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                prioridade TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (categoria_id, status, prioridade)
+            ) WITHOUT ROWID
+        """)
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS contadores_insert AFTER INSERT ON tarefas BEGIN
+                INSERT INTO contadores (categoria_id, status, prioridade, total)
+                VALUES (COALESCE(new.categoria_id, 0), COALESCE(new.status, ''),
+                        COALESCE(new.prioridade, ''), 1)
+                ON CONFLICT (categoria_id, status, prioridade) DO UPDATE SET total = total + 1;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS contadores_delete AFTER DELETE ON tarefas BEGIN
+                UPDATE contadores SET total = total - 1
+                WHERE categoria_id = COALESCE(old.categoria_id, 0)
+                  AND status = COALESCE(old.status, '')
+                  AND prioridade = COALESCE(old.prioridade, '');
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS contadores_update
+            AFTER UPDATE OF categoria_id, status, prioridade ON tarefas
+            WHEN old.categoria_id IS NOT new.categoria_id
+              OR old.status IS NOT new.status
+              OR old.prioridade IS NOT new.prioridade
+            BEGIN
+                UPDATE contadores SET total = total - 1
+                WHERE categoria_id = COALESCE(old.categoria_id, 0)
+                  AND status = COALESCE(old.status, '')
+                  AND prioridade = COALESCE(old.prioridade, '');
+                INSERT INTO contadores (categoria_id, status, prioridade, total)
+                VALUES (COALESCE(new.categoria_id, 0), COALESCE(new.status, ''),
+                        COALESCE(new.prioridade, ''), 1)
+                ON CONFLICT (categoria_id, status, prioridade) DO UPDATE SET total = total + 1;
+            END
+        """)
+
+        # Banco já existente: contar as tarefas cadastradas antes da tabela
+        if not existia:
+            self._recontar(cursor)
+
+    def _recontar(self, cursor: sqlite3.Cursor):
+        """Reconstrói os contadores a partir de tarefas"""
+        cursor.execute("DELETE FROM contadores")
+        cursor.execute("""
+            INSERT INTO contadores (categoria_id, status, prioridade, total)
+            SELECT COALESCE(categoria_id, 0), COALESCE(status, ''), COALESCE(prioridade, ''), COUNT(*)
+            FROM tarefas
+            GROUP BY 1, 2, 3
+        """)
+
+    def verificar_contadores(self, reparar: bool = True) -> bool:
+        """Confere os contadores contra uma contagem real de tarefas
+
+        Retorna True se estavam corretos. Com reparar=True, uma divergência
+        é corrigida reconstruindo a tabela na mesma transação.
+        """
+        with self.transacao() as conn:
+            cursor = conn.cursor()
+            divergente = cursor.execute("""
+                SELECT 1 FROM (
+                    SELECT COALESCE(categoria_id, 0) AS categoria_id, COALESCE(status, '') AS status,
+                           COALESCE(prioridade, '') AS prioridade, COUNT(*) AS total
+                    FROM tarefas
+                    GROUP BY 1, 2, 3
+                    EXCEPT
+                    SELECT categoria_id, status, prioridade, total FROM contadores WHERE total <> 0
+                )
+                UNION ALL
+                SELECT 1 FROM (
+                    SELECT categoria_id, status, prioridade, total FROM contadores WHERE total <> 0
+                    EXCEPT
+                    SELECT COALESCE(categoria_id, 0), COALESCE(status, ''),
+                           COALESCE(prioridade, ''), COUNT(*)
+                    FROM tarefas
+                    GROUP BY 1, 2, 3
+                )
+                LIMIT 1
+            """).fetchone()
+
+            if divergente and reparar:
+                self._recontar(cursor)
+
+        return divergente is None
+
+    def contar_tarefas(self, categoria_id: Optional[int] = None) -> Dict:
+        """Retorna o total e a contagem por status a partir dos contadores"""
+        sql = "SELECT status, SUM(total) FROM contadores"
+        params = []
+        if categoria_id is not None:
+            sql += " WHERE categoria_id = ?"
+            params.append(categoria_id)
+        sql += " GROUP BY status"
+
+        with self.conexao() as conn:
+            por_status = {"pendente": 0, "em_andamento": 0, "concluido": 0}
+            for status, total in conn.execute(sql, params):
+                por_status[status] = total
+
+        return {"total": sum(por_status.values()), "por_status": por_status}
+
+    # Categorias mudam raramente: o catálogo fica em memória como uma tupla
+    # imutável de (id, nome), trocada inteira quando uma categoria é criada.
+
+    def recarregar_categorias(self):
+        """Recarrega o catálogo de categorias a partir do banco"""
+        with self.conexao() as conn:
+            categorias = tuple(conn.execute("SELECT id, nome FROM categorias ORDER BY nome"))
+
+        self._categoria_por_id = dict(categorias)
+        self._categoria_por_nome = {nome: cat_id for cat_id, nome in categorias}
+        self._categorias = categorias
+
     def adicionar_categoria(self, nome: str) -> bool:
         """Adiciona nova categoria"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO categorias (nome) VALUES (?)", (nome,))
-            conn.commit()
-            conn.close()
-            return True
+            with self.transacao() as conn:
+                conn.execute("INSERT INTO categorias (nome) VALUES (?)", (nome,))
         except sqlite3.IntegrityError:
             return False
-    
+
+        self.recarregar_categorias()
+        return True
+
     def listar_categorias(self) -> List[Dict]:
-        """Lista todas as categorias"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, nome FROM categorias ORDER BY nome")
-        categorias = [{"id": row[0], "nome": row[1]} for row in cursor.fetchall()]
-        conn.close()
-        return categorias
-    
+        """Lista todas as categorias (do catálogo em memória)"""
+        return [{"id": cat_id, "nome": nome} for cat_id, nome in self._categorias]
+
+    def catalogo_categorias(self) -> Tuple[Tuple[int, str], ...]:
+        """Retorna o catálogo como tupla de (id, nome), ordenado por nome"""
+        return self._categorias
+
+    def nome_categoria(self, categoria_id: int) -> Optional[str]:
+        """Retorna o nome de uma categoria pelo id"""
+        return self._categoria_por_id.get(categoria_id)
+
+    def id_categoria(self, nome: str) -> Optional[int]:
+        """Retorna o id de uma categoria pelo nome"""
+        return self._categoria_por_nome.get(nome)
+
     def criar_tarefa(self, titulo: str, descricao: str, categoria_id: int, 
                      autor_id: int, autor_nome: str, prioridade: str = "media",
                      imagem_file_id: Optional[str] = None) -> int:
         """Cria uma nova tarefa"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        data_criacao = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        cursor.execute("""
+        return self._submeter_tarefa(titulo, descricao, categoria_id, autor_id, autor_nome,
+                                     prioridade, imagem_file_id).result()
+
+    def _submeter_tarefa(self, titulo: str, descricao: str, categoria_id: int,
+                         autor_id: int, autor_nome: str, prioridade: str = "media",
+                         imagem_file_id: Optional[str] = None) -> Future:
+        return self.fila.submeter(self._inserir_tarefa, titulo, descricao, categoria_id,
+                                  autor_id, autor_nome, prioridade, imagem_file_id, agora())
+
+    def _inserir_tarefa(self, conn: sqlite3.Connection, titulo: str, descricao: str,
+                        categoria_id: int, autor_id: int, autor_nome: str, prioridade: str,
+                        imagem_file_id: Optional[str], data_criacao: int) -> int:
+        cursor = conn.execute("""
             INSERT INTO tarefas (titulo, descricao, categoria_id, autor_id, autor_nome,
-                               prioridade, imagem_file_id, data_criacao, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pendente')
-        """, (titulo, descricao, categoria_id, autor_id, autor_nome, prioridade, 
-              imagem_file_id, data_criacao))
-        
-        tarefa_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return tarefa_id
+                               prioridade, imagem_file_id, data_criacao, ultima_atividade, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'pendente')
+        """, (titulo, descricao, categoria_id, autor_id, autor_nome, prioridade,
+              imagem_file_id, data_criacao, data_criacao))
+        return cursor.lastrowid
     
-    def listar_tarefas(self, categoria_id: Optional[int] = None, 
-                       status: Optional[str] = None,
-                       autor_id: Optional[int] = None) -> List[Dict]:
-        """Lista tarefas com filtros opcionais"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT t.id, t.titulo, t.descricao, c.nome as categoria, t.autor_nome,
-                   t.atribuido_nome, t.status, t.prioridade, t.data_criacao,
-                   t.imagem_file_id
-            FROM tarefas t
-            LEFT JOIN categorias c ON t.categoria_id = c.id
-            WHERE 1=1
-        """
+    def _filtros_tarefas(self, categoria_id: Optional[int] = None,
+                         status: Optional[str] = None,
+                         autor_id: Optional[int] = None):
+        """Monta o trecho WHERE (e parâmetros) dos filtros de tarefas"""
+        where = ""
         params = []
         
         if categoria_id:
-            query += " AND t.categoria_id = ?"
+            where += " AND t.categoria_id = ?"
             params.append(categoria_id)
         
         if status:
-            query += " AND t.status = ?"
+            where += " AND t.status = ?"
             params.append(status)
         
         if autor_id:
-            query += " AND t.autor_id = ?"
+            where += " AND t.autor_id = ?"
             params.append(autor_id)
-        
-        query += " ORDER BY t.id DESC"
-        
-        cursor.execute(query, params)
-        tarefas = []
-        for row in cursor.fetchall():
-            tarefas.append({
-                "id": row[0],
-                "titulo": row[1],
-                "descricao": row[2],
-                "categoria": row[3],
-                "autor_nome": row[4],
-                "atribuido_nome": row[5],
-                "status": row[6],
-                "prioridade": row[7],
-                "data_criacao": row[8],
-                "imagem_file_id": row[9]
-            })
-        
-        conn.close()
-        return tarefas
+
+        return where, params
+
+    # {tabela}: "tarefas" ou "tarefas_arquivo"
+    _SELECT_TAREFAS = """
+        SELECT t.id, t.titulo, t.descricao, c.nome as categoria, t.autor_id, t.autor_nome,
+               t.atribuido_nome, t.status, t.prioridade, t.data_criacao,
+               t.imagem_file_id, t.total_comentarios, t.ultima_atividade
+        FROM {tabela} t
+        LEFT JOIN categorias c ON t.categoria_id = c.id
+        WHERE 1=1
+    """
+
+    # Ordenações aceitas por listar_tarefas/iter_tarefas
+    _ORDENS_TAREFAS = {
+        "id": "t.id DESC",
+        "atividade": "t.ultima_atividade DESC, t.id DESC",
+    }
+
+    def listar_tarefas(self, categoria_id: Optional[int] = None, 
+                       status: Optional[str] = None,
+                       autor_id: Optional[int] = None,
+                       ordem: str = "id") -> List[Tarefa]:
+        """Lista tarefas com filtros opcionais
+
+        ordem="atividade" traz primeiro as tarefas com atividade (criação,
+        comentário, mudança) mais recente.
+        """
+        return list(self.iter_tarefas(categoria_id, status, autor_id, ordem=ordem))
+
+    def iter_tarefas(self, categoria_id: Optional[int] = None,
+                     status: Optional[str] = None,
+                     autor_id: Optional[int] = None,
+                     tamanho_lote: int = 200,
+                     ordem: str = "id") -> Iterator[Tarefa]:
+        """Gera as tarefas filtradas sem montar a lista inteira
+
+        A conexão fica emprestada até o fim da iteração: use para varrer ou
+        contar, e prefira listar_tarefas em código assíncrono.
+        """
+        where, params = self._filtros_tarefas(categoria_id, status, autor_id)
+        query = (self._SELECT_TAREFAS.format(tabela="tarefas") + where
+                 + " ORDER BY " + self._ORDENS_TAREFAS[ordem])
+
+        with self.conexao() as conn:
+            cursor = Tarefa.aplicar(conn.execute(query, params))
+            while True:
+                lote = cursor.fetchmany(tamanho_lote)
+                if not lote:
+                    break
+                yield from lote
+
+    def listar_tarefas_pagina(self, categoria_id: Optional[int] = None,
+                              status: Optional[str] = None,
+                              autor_id: Optional[int] = None,
+                              tamanho: int = 20,
+                              apos_id: Optional[int] = None,
+                              antes_id: Optional[int] = None,
+                              arquivo: bool = False) -> Dict:
+        """Lista uma página de tarefas (mais recentes primeiro) com cursor por id
+
+        apos_id avança para as tarefas mais antigas que esse id; antes_id volta
+        para as mais recentes. Cada página custa O(tamanho), não O(tabela).
+        Com arquivo=True a página vem de tarefas_arquivo.
+        """
+        where, params = self._filtros_tarefas(categoria_id, status, autor_id)
+        voltando = antes_id is not None
+        tabela = "tarefas_arquivo" if arquivo else "tarefas"
+        select = self._SELECT_TAREFAS.format(tabela=tabela)
+
+        if voltando:
+            query = select + where + " AND t.id > ? ORDER BY t.id ASC LIMIT ?"
+            params_pagina = params + [antes_id, tamanho + 1]
+        elif apos_id is not None:
+            query = select + where + " AND t.id < ? ORDER BY t.id DESC LIMIT ?"
+            params_pagina = params + [apos_id, tamanho + 1]
+        else:
+            query = select + where + " ORDER BY t.id DESC LIMIT ?"
+            params_pagina = params + [tamanho + 1]
+
+        with self.conexao() as conn:
+            tarefas = Tarefa.aplicar(conn.execute(query, params_pagina)).fetchall()
+
+            # A linha extra só indica que há mais uma página nessa direção
+            tem_mais = len(tarefas) > tamanho
+            tarefas = tarefas[:tamanho]
+            if voltando:
+                tarefas.reverse()
+
+            # Na direção oposta basta saber se existe ao menos uma tarefa
+            tem_outra = False
+            if tarefas:
+                if voltando:
+                    sql_outra = f"SELECT 1 FROM {tabela} t WHERE 1=1" + where + " AND t.id < ? LIMIT 1"
+                    limite = tarefas[-1].id
+                else:
+                    sql_outra = f"SELECT 1 FROM {tabela} t WHERE 1=1" + where + " AND t.id > ? LIMIT 1"
+                    limite = tarefas[0].id
+                tem_outra = conn.execute(sql_outra, params + [limite]).fetchone() is not None
+
+        return {
+            "tarefas": tarefas,
+            "tem_anterior": tem_mais if voltando else tem_outra,
+            "tem_proxima": tem_outra if voltando else tem_mais
+        }
     
-    def obter_tarefa(self, tarefa_id: int) -> Optional[Dict]:
-        """Obtém uma tarefa específica"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT t.id, t.titulo, t.descricao, c.nome as categoria, t.autor_nome,
-                   t.atribuido_nome, t.status, t.prioridade, t.data_criacao,
-                   t.data_conclusao, t.imagem_file_id, t.autor_id
-            FROM tarefas t
-            LEFT JOIN categorias c ON t.categoria_id = c.id
-            WHERE t.id = ?
-        """, (tarefa_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return {
-                "id": row[0],
-                "titulo": row[1],
-                "descricao": row[2],
-                "categoria": row[3],
-                "autor_nome": row[4],
-                "atribuido_nome": row[5],
-                "status": row[6],
-                "prioridade": row[7],
-                "data_criacao": row[8],
-                "data_conclusao": row[9],
-                "imagem_file_id": row[10],
-                "autor_id": row[11]
-            }
+    def obter_tarefa(self, tarefa_id: int) -> Optional[Tarefa]:
+        """Obtém uma tarefa específica (com cache por id)
+
+        Tarefas que não estão mais em tarefas são procuradas no arquivo e
+        voltam com ``arquivada`` verdadeiro.
+        """
+        tarefa = self.cache_tarefas.obter(tarefa_id)
+        if tarefa is not None:
+            # Cópia: quem chama pode alterar o registro à vontade
+            return tarefa.copiar()
+
+        geracao = self.cache_tarefas.geracao()
+        with self.conexao() as conn:
+            for tabela, arquivada in (("tarefas", 0), ("tarefas_arquivo", 1)):
+                cursor = Tarefa.aplicar(conn.execute(f"""
+                    SELECT t.id, t.titulo, t.descricao, c.nome as categoria, t.autor_nome,
+                           t.atribuido_nome, t.status, t.prioridade, t.data_criacao,
+                           t.data_conclusao, t.imagem_file_id, t.autor_id, t.total_comentarios,
+                           t.ultima_atividade, t.versao, {arquivada} AS arquivada
+                    FROM {tabela} t
+                    LEFT JOIN categorias c ON t.categoria_id = c.id
+                    WHERE t.id = ?
+                """, (tarefa_id,)))
+                tarefa = cursor.fetchone()
+                if tarefa:
+                    break
+
+        if tarefa:
+            self.cache_tarefas.guardar(tarefa_id, tarefa, geracao)
+            return tarefa.copiar()
         return None
     
-    def atualizar_status(self, tarefa_id: int, status: str) -> bool:
-        """Atualiza o status de uma tarefa"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+    # Colunas devolvidas pelas mutações de tarefa (categoria_id vira o nome
+    # da categoria em _tarefa_retornada, sem JOIN)
+    _RETORNO_TAREFA = """
+        RETURNING id, titulo, descricao, categoria_id AS categoria, autor_id, autor_nome,
+                  atribuido_nome, status, prioridade, data_criacao, data_conclusao,
+                  imagem_file_id, total_comentarios, ultima_atividade, versao
+    """
+
+    def _tarefa_retornada(self, cursor: sqlite3.Cursor) -> Optional[Tarefa]:
+        """Lê a linha de um UPDATE/DELETE ... RETURNING (None se nada casou)"""
+        linhas = Tarefa.aplicar(cursor).fetchall()
+        if not linhas:
+            return None
+        tarefa = linhas[0]
+        tarefa.categoria = self.nome_categoria(tarefa.categoria)
+        tarefa.arquivada = 0
+        return tarefa
+
+    def atualizar_status(self, tarefa_id: int, status: str,
+                         status_atual: Optional[str] = None) -> Optional[Tarefa]:
+        """Atualiza o status de uma tarefa e retorna a tarefa já atualizada
+
+        Com ``status_atual``, só altera se a tarefa ainda estiver nesse status
+        (compare-and-set): retorna None se não encontrou ou se o status mudou.
+        """
+        momento = agora()
         data_conclusao = None
         if status == "concluido":
-            data_conclusao = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        cursor.execute("""
-            UPDATE tarefas 
-            SET status = ?, data_conclusao = ?
-            WHERE id = ?
-        """, (status, data_conclusao, tarefa_id))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        return success
+            data_conclusao = momento
+
+        query = (
+            "UPDATE tarefas SET status = ?, data_conclusao = ?, ultima_atividade = ?, versao = versao + 1 "
+            "WHERE id = ?"
+        )
+        params = [status, data_conclusao, momento, tarefa_id]
+        if status_atual is not None:
+            query += " AND status = ?"
+            params.append(status_atual)
+
+        with self.transacao() as conn:
+            tarefa = self._tarefa_retornada(conn.execute(query + self._RETORNO_TAREFA, params))
+
+        self.cache_tarefas.invalidar(tarefa_id)
+        return tarefa
     
     def atualizar_tarefa(self, tarefa_id: int, titulo: Optional[str] = None,
                         descricao: Optional[str] = None, 
-                        prioridade: Optional[str] = None) -> bool:
-        """Atualiza informações de uma tarefa"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+                        prioridade: Optional[str] = None,
+                        autor_id: Optional[int] = None) -> Optional[Tarefa]:
+        """Atualiza informações de uma tarefa e retorna a tarefa já atualizada
+
+        Com ``autor_id``, só altera se a tarefa for desse autor.
+        """
         updates = []
         params = []
         
@@ -264,200 +1032,459 @@ class Database:
             params.append(prioridade)
         
         if not updates:
-            return False
+            return None
         
+        updates.append("ultima_atividade = ?")
+        params.append(agora())
+        updates.append("versao = versao + 1")
         params.append(tarefa_id)
         query = f"UPDATE tarefas SET {', '.join(updates)} WHERE id = ?"
+        if autor_id is not None:
+            query += " AND autor_id = ?"
+            params.append(autor_id)
         
-        cursor.execute(query, params)
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        return success
+        with self.transacao() as conn:
+            tarefa = self._tarefa_retornada(conn.execute(query + self._RETORNO_TAREFA, params))
+
+        self.cache_tarefas.invalidar(tarefa_id)
+        return tarefa
     
-    def deletar_tarefa(self, tarefa_id: int) -> bool:
-        """Deleta uma tarefa"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM tarefas WHERE id = ?", (tarefa_id,))
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        return success
+    def deletar_tarefa(self, tarefa_id: int, autor_id: Optional[int] = None) -> Optional[Tarefa]:
+        """Deleta uma tarefa e retorna a linha removida
+
+        Com ``autor_id``, só deleta se a tarefa for desse autor: a checagem e
+        a remoção são um único comando, sem janela entre elas.
+        """
+        query = "DELETE FROM tarefas WHERE id = ?"
+        params = [tarefa_id]
+        if autor_id is not None:
+            query += " AND autor_id = ?"
+            params.append(autor_id)
+
+        with self.transacao() as conn:
+            tarefa = self._tarefa_retornada(conn.execute(query + self._RETORNO_TAREFA, params))
+
+        self.cache_tarefas.invalidar(tarefa_id)
+        return tarefa
     
     def adicionar_comentario(self, tarefa_id: int, autor_id: int, 
                            autor_nome: str, comentario: str) -> bool:
         """Adiciona comentário a uma tarefa"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        data = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        cursor.execute("""
+        return self._submeter_comentario(tarefa_id, autor_id, autor_nome, comentario).result()
+
+    def _submeter_comentario(self, tarefa_id: int, autor_id: int,
+                             autor_nome: str, comentario: str) -> Future:
+        return self.fila.submeter(self._inserir_comentario, tarefa_id, autor_id, autor_nome,
+                                  comentario, agora())
+
+    def _inserir_comentario(self, conn: sqlite3.Connection, tarefa_id: int, autor_id: int,
+                            autor_nome: str, comentario: str, data: int) -> bool:
+        conn.execute("""
             INSERT INTO comentarios (tarefa_id, autor_id, autor_nome, comentario, data)
             VALUES (?, ?, ?, ?, ?)
         """, (tarefa_id, autor_id, autor_nome, comentario, data))
-        
-        conn.commit()
-        conn.close()
+
+        self.fila.apos_commit(lambda: self.cache_tarefas.invalidar(tarefa_id))
         return True
     
-    def listar_comentarios(self, tarefa_id: int) -> List[Dict]:
+    def listar_comentarios(self, tarefa_id: int) -> List[Comentario]:
         """Lista comentários de uma tarefa"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT autor_nome, comentario, data
-            FROM comentarios
-            WHERE tarefa_id = ?
-            ORDER BY data ASC
-        """, (tarefa_id,))
-        
-        comentarios = []
-        for row in cursor.fetchall():
-            comentarios.append({
-                "autor_nome": row[0],
-                "comentario": row[1],
-                "data": row[2]
-            })
-        
-        conn.close()
-        return comentarios
+        return list(self.iter_comentarios(tarefa_id))
+
+    def iter_comentarios(self, tarefa_id: int) -> Iterator[Comentario]:
+        """Gera os comentários de uma tarefa, do mais antigo ao mais recente
+
+        Uma tarefa está inteira em um dos lados (quente ou arquivo), então
+        no máximo uma das partes do UNION traz linhas.
+        """
+        with self.conexao() as conn:
+            cursor = Comentario.aplicar(conn.execute("""
+                SELECT id, tarefa_id, autor_id, autor_nome, comentario, data
+                FROM comentarios
+                WHERE tarefa_id = ?
+                UNION ALL
+                SELECT id, tarefa_id, autor_id, autor_nome, comentario, data
+                FROM comentarios_arquivo
+                WHERE tarefa_id = ?
+                ORDER BY data ASC
+            """, (tarefa_id, tarefa_id)))
+            yield from cursor
     
-    def buscar_tarefas(self, termo: str) -> List[Dict]:
-        """Busca tarefas por termo no título ou descrição"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT t.id, t.titulo, t.descricao, c.nome as categoria, t.autor_nome,
-                   t.status, t.prioridade
-            FROM tarefas t
-            LEFT JOIN categorias c ON t.categoria_id = c.id
-            WHERE t.titulo LIKE ? OR t.descricao LIKE ?
-            ORDER BY t.id DESC
-        """, (f"%{termo}%", f"%{termo}%"))
-        
-        tarefas = []
-        for row in cursor.fetchall():
-            tarefas.append({
-                "id": row[0],
-                "titulo": row[1],
-                "descricao": row[2],
-                "categoria": row[3],
-                "autor_nome": row[4],
-                "status": row[5],
-                "prioridade": row[6]
-            })
-
-        conn.close()
-        return tarefas
+    def buscar_tarefas(self, termo: str, limite: int = 20) -> List[Tarefa]:
+        """Busca tarefas por termo no título, descrição ou comentários (mais relevantes primeiro)
+
+        Inclui as tarefas arquivadas, marcadas com ``arquivada``.
+        """
+        campos = """
+            t.id AS id, t.titulo, t.descricao, c.nome as categoria, t.autor_nome,
+            t.status, t.prioridade
+        """
+
+        if self.fts:
+            # Cada palavra vira um prefixo obrigatório: "config pain" -> "config"* "pain"*
+            palavras = re.findall(r"\w+", termo)
+            if not palavras:
+                return []
+            consulta = " ".join(f'"{palavra}"*' for palavra in palavras)
+
+            # BM25 com pesos: título > descrição > comentários; LIMIT aplicado no índice.
+            # O índice cobre as duas tabelas; cada id casa com só uma delas.
+            query = f"""
+                WITH resultado AS (
+                    SELECT rowid AS id, bm25(tarefas_fts, 10.0, 5.0, 1.0) AS rank
+                    FROM tarefas_fts
+                    WHERE tarefas_fts MATCH ?
+                    ORDER BY rank
+                    LIMIT ?
+                )
+                SELECT {campos}, 0 AS arquivada, r.rank
+                FROM resultado r
+                JOIN tarefas t ON t.id = r.id
+                LEFT JOIN categorias c ON t.categoria_id = c.id
+                UNION ALL
+                SELECT {campos}, 1 AS arquivada, r.rank
+                FROM resultado r
+                JOIN tarefas_arquivo t ON t.id = r.id
+                LEFT JOIN categorias c ON t.categoria_id = c.id
+                ORDER BY rank
+            """
+            params = (consulta, limite)
+        else:
+            query = f"""
+                SELECT {campos}, 0 AS arquivada
+                FROM tarefas t
+                LEFT JOIN categorias c ON t.categoria_id = c.id
+                WHERE t.titulo LIKE ?1 OR t.descricao LIKE ?1
+                UNION ALL
+                SELECT {campos}, 1 AS arquivada
+                FROM tarefas_arquivo t
+                LEFT JOIN categorias c ON t.categoria_id = c.id
+                WHERE t.titulo LIKE ?1 OR t.descricao LIKE ?1
+                ORDER BY id DESC
+                LIMIT ?2
+            """
+            params = (f"%{termo}%", limite)
+
+        with self.conexao() as conn:
+            return Tarefa.aplicar(conn.execute(query, params)).fetchall()
 
     def estatisticas(self) -> Dict:
-        """Retorna estatísticas gerais das tarefas"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Retorna estatísticas gerais das tarefas
 
-        # Total de tarefas
-        cursor.execute("SELECT COUNT(*) FROM tarefas")
-        total = cursor.fetchone()[0]
+        Lido da tabela contadores, mantida pelos gatilhos de tarefas: o custo
+        não cresce com o número de tarefas nem de categorias. As concluídas
+        na última semana saem de uma faixa do índice de data_conclusao.
+        """
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT c.nome, k.status, k.prioridade, k.total
+                FROM contadores k
+                LEFT JOIN categorias c ON k.categoria_id = c.id
+                WHERE k.total > 0
+                ORDER BY c.nome
+            """)
+            grupos = cursor.fetchall()
 
-        # Tarefas por status
-        cursor.execute("SELECT COUNT(*) FROM tarefas WHERE status = 'pendente'")
-        pendentes = cursor.fetchone()[0]
+            concluidas_semana = cursor.execute(
+                "SELECT COUNT(*) FROM tarefas WHERE data_conclusao >= ?", (agora() - 7 * 86400,)
+            ).fetchone()[0]
 
-        cursor.execute("SELECT COUNT(*) FROM tarefas WHERE status = 'em_andamento'")
-        em_andamento = cursor.fetchone()[0]
+        total = 0
+        por_status = {"pendente": 0, "em_andamento": 0, "concluido": 0}
+        por_prioridade = {"alta": 0, "media": 0, "baixa": 0}
+        por_categoria = {}
 
-        cursor.execute("SELECT COUNT(*) FROM tarefas WHERE status = 'concluido'")
-        resolvidas = cursor.fetchone()[0]
+        for categoria, status, prioridade, quantidade in grupos:
+            total += quantidade
+            por_status[status] = por_status.get(status, 0) + quantidade
+            por_prioridade[prioridade] = por_prioridade.get(prioridade, 0) + quantidade
 
-        conn.close()
+            contagem = por_categoria.setdefault(
+                categoria or "Sem categoria",
+                {"total": 0, "pendente": 0, "em_andamento": 0, "concluido": 0}
+            )
+            contagem["total"] += quantidade
+            contagem[status] = contagem.get(status, 0) + quantidade
 
         return {
             'total': total,
-            'pendentes': pendentes,
-            'em_andamento': em_andamento,
-            'resolvidas': resolvidas
+            'pendentes': por_status["pendente"],
+            'em_andamento': por_status["em_andamento"],
+            'resolvidas': por_status["concluido"],
+            'por_status': por_status,
+            'por_prioridade': por_prioridade,
+            'por_categoria': por_categoria,
+            'concluidas_semana': concluidas_semana
         }
 
+    # ============ ARQUIVO ============
+
+    def arquivar(self, dias: int, tamanho_lote: int = 500) -> int:
+        """Move para o arquivo as tarefas concluídas há mais de ``dias`` dias
+
+        Tarefas e comentários vão para tarefas_arquivo/comentarios_arquivo
+        em lotes de ``tamanho_lote``, um lote por transação. Os gatilhos de
+        tarefas tiram as linhas dos contadores e do índice FTS; em seguida
+        elas voltam ao FTS (com os comentários) para a busca continuar
+        alcançando o arquivo. Retorna quantas tarefas foram arquivadas.
+        """
+        limite = agora() - dias * 86400
+        total = 0
+
+        while True:
+            with self.transacao() as conn:
+                # Trava de escrita antes do SELECT: os ids escolhidos não
+                # podem ser reabertos antes de serem movidos
+                conn.execute("BEGIN IMMEDIATE")
+
+                # Faixa do índice parcial de data_conclusao
+                ids = [linha[0] for linha in conn.execute("""
+                    SELECT id FROM tarefas
+                    WHERE data_conclusao < ? AND status = 'concluido'
+                    LIMIT ?
+                """, (limite, tamanho_lote))]
+                if not ids:
+                    break
+
+                marcadores = ",".join("?" * len(ids))
+                conn.execute(f"""
+                    INSERT INTO tarefas_arquivo (id, titulo, descricao, categoria_id, autor_id,
+                                                 autor_nome, atribuido_id, atribuido_nome, status,
+                                                 prioridade, imagem_file_id, data_criacao,
+                                                 data_conclusao, total_comentarios,
+                                                 ultima_atividade, versao, arquivada_em)
+                    SELECT id, titulo, descricao, categoria_id, autor_id, autor_nome, atribuido_id,
+                           atribuido_nome, status, prioridade, imagem_file_id, data_criacao,
+                           data_conclusao, total_comentarios, ultima_atividade, versao, ?
+                    FROM tarefas WHERE id IN ({marcadores})
+                """, [agora()] + ids)
+                conn.execute(f"""
+                    INSERT INTO comentarios_arquivo (id, tarefa_id, autor_id, autor_nome, comentario, data)
+                    SELECT id, tarefa_id, autor_id, autor_nome, comentario, data
+                    FROM comentarios WHERE tarefa_id IN ({marcadores})
+                """, ids)
+
+                # ON DELETE CASCADE leva os comentários junto
+                conn.execute(f"DELETE FROM tarefas WHERE id IN ({marcadores})", ids)
+
+                if self.fts:
+                    conn.execute(f"""
+                        INSERT INTO tarefas_fts (rowid, titulo, descricao, comentarios)
+                        SELECT t.id, t.titulo, t.descricao,
+                               (SELECT group_concat(comentario, ' ') FROM comentarios_arquivo
+                                WHERE tarefa_id = t.id)
+                        FROM tarefas_arquivo t WHERE t.id IN ({marcadores})
+                    """, ids)
+
+            for tarefa_id in ids:
+                self.cache_tarefas.invalidar(tarefa_id)
+            total += len(ids)
+
+        if total:
+            logger.info(f"{total} tarefa(s) concluída(s) há mais de {dias} dia(s) arquivada(s)")
+        return total
+
+    # ============ IMPORTAÇÃO / EXPORTAÇÃO ============
+
+    def importar_tarefas(self, registros: Iterable[Tuple[int, Dict]], autor_id: int,
+                         autor_nome: str, tamanho_lote: int = 500, max_erros: int = 20) -> Dict:
+        """Importa tarefas em lotes de ``tamanho_lote`` linhas por transação
+
+        ``registros`` gera (número da linha, registro), como
+        importacao.ler_registros. Linhas inválidas são puladas e relatadas
+        (até ``max_erros`` mensagens); as demais são gravadas com
+        executemany, um lote por vez, sem carregar o arquivo inteiro.
+        """
+        categorias = self._categoria_por_nome
+        ids_categoria = set(self._categoria_por_id)
+        lote = []
+        importadas = 0
+        total_erros = 0
+        erros = []
+
+        for numero, registro in registros:
+            try:
+                if isinstance(registro, RegistroInvalido):
+                    raise registro
+                lote.append(validar_tarefa(registro, categorias, ids_categoria, autor_id, autor_nome))
+            except RegistroInvalido as e:
+                total_erros += 1
+                if len(erros) < max_erros:
+                    erros.append(f"linha {numero}: {e}")
+                continue
+
+            if len(lote) >= tamanho_lote:
+                importadas += self._inserir_lote_tarefas(lote)
+                lote = []
+
+        if lote:
+            importadas += self._inserir_lote_tarefas(lote)
+
+        return {'importadas': importadas, 'total_erros': total_erros, 'erros': erros}
+
+    def _inserir_lote_tarefas(self, lote: List[Tuple]) -> int:
+        with self.transacao() as conn:
+            conn.executemany("""
+                INSERT INTO tarefas (titulo, descricao, categoria_id, autor_id, autor_nome,
+                                     atribuido_id, atribuido_nome, status, prioridade, data_criacao,
+                                     data_conclusao, ultima_atividade)
+                VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11, MAX(?10, COALESCE(?11, ?10)))
+            """, lote)
+        return len(lote)
+
+    def importar_arquivo(self, caminho: str, formato: str, autor_id: int, autor_nome: str) -> Dict:
+        """Importa tarefas de um arquivo JSONL ou CSV, lido em streaming"""
+        with open(caminho, newline="", encoding="utf-8-sig") as arquivo:
+            return self.importar_tarefas(ler_registros(arquivo, formato), autor_id, autor_nome)
+
+    def exportar(self, tabela: str, tamanho_lote: int = 500) -> Iterator[Dict]:
+        """Gera as linhas de tarefas, comentarios ou changelogs, um lote por vez
+
+        Tarefas e comentários incluem os arquivados (tarefas_arquivo e
+        comentarios_arquivo), na mesma sequência de ids; nas tarefas, a
+        coluna ``arquivada`` diz de onde veio cada linha.
+
+        Mantém uma conexão do pool emprestada até o fim da iteração. Em
+        código assíncrono, prefira exportar_arquivo.
+        """
+        if tabela not in COLUNAS_EXPORTACAO:
+            raise ValueError(f"Tabela não exportável: {tabela}")
+        colunas = COLUNAS_EXPORTACAO[tabela]
+
+        if tabela == "tarefas":
+            selects = [
+                f"""
+                SELECT {', '.join(
+                    ('c.nome' if col == 'categoria' else str(arquivada) if col == 'arquivada' else 't.' + col)
+                    + ' AS ' + col
+                    for col in colunas
+                )}
+                FROM {origem} t
+                LEFT JOIN categorias c ON t.categoria_id = c.id
+                """
+                for origem, arquivada in (("tarefas", 0), ("tarefas_arquivo", 1))
+            ]
+            sql = " UNION ALL ".join(selects) + " ORDER BY id"
+        elif tabela == "comentarios":
+            sql = " UNION ALL ".join(
+                f"SELECT {', '.join(colunas)} FROM {origem}" for origem in ("comentarios", "comentarios_arquivo")
+            ) + " ORDER BY id"
+        else:
+            sql = f"SELECT {', '.join(colunas)} FROM {tabela} ORDER BY id"
+
+        with self.conexao() as conn:
+            cursor = conn.execute(sql)
+            while True:
+                linhas = cursor.fetchmany(tamanho_lote)
+                if not linhas:
+                    break
+                for linha in linhas:
+                    yield dict(zip(colunas, linha))
+
+    def exportar_arquivo(self, tabela: str, caminho: str, formato: str) -> int:
+        """Exporta uma tabela para um arquivo JSONL ou CSV; retorna o número de linhas"""
+        with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+            return escrever_registros(self.exportar(tabela), arquivo, formato, COLUNAS_EXPORTACAO[tabela])
+
     # ============ CONFIGURAÇÕES ============
 
+    # As configurações ficam em memória: carregadas uma vez e trocadas por
+    # uma cópia nova a cada escrita. Leitores só consultam a referência
+    # atual, sem lock e sem I/O.
+
+    def recarregar_config(self):
+        """Recarrega o cache de configurações a partir do banco"""
+        with self._config_lock:
+            with self.conexao() as conn:
+                config = dict(conn.execute("SELECT chave, valor FROM configuracoes"))
+            self._publicar_config(config)
+
+    def _publicar_config(self, config: Dict[str, str]):
+        self._topico = ConfigTopico.de_config(config)
+        self._config = config
+
     def obter_config(self, chave: str) -> Optional[str]:
         """Obtém uma configuração"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT valor FROM configuracoes WHERE chave = ?", (chave,))
-        row = cursor.fetchone()
-        conn.close()
-        return row[0] if row else None
+        return self._config.get(chave)
 
     def salvar_config(self, chave: str, valor: str):
         """Salva ou atualiza uma configuração"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("INSERT OR REPLACE INTO configuracoes (chave, valor) VALUES (?, ?)", (chave, valor))
-        conn.commit()
-        conn.close()
+        self.salvar_configs({chave: valor})
+
+    def salvar_configs(self, valores: Dict[str, str]):
+        """Salva várias configurações em uma transação e atualiza o cache"""
+        with self._config_lock:
+            with self.transacao() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO configuracoes (chave, valor) VALUES (?, ?)",
+                    valores.items()
+                )
+            self._publicar_config({**self._config, **valores})
 
     def salvar_info_topico(self, topico_id: str, topico_nome: str, chat_id: str):
         """Salva informações completas do tópico"""
-        self.salvar_config('topico_permitido', topico_id)
-        self.salvar_config('topico_nome', topico_nome)
-        self.salvar_config('topico_chat_id', chat_id)
+        self.salvar_configs({
+            'topico_permitido': topico_id,
+            'topico_nome': topico_nome,
+            'topico_chat_id': chat_id
+        })
 
     def obter_info_topico(self) -> Dict[str, Optional[str]]:
         """Obtém informações completas do tópico configurado"""
+        topico = self._topico
         return {
-            'id': self.obter_config('topico_permitido'),
-            'nome': self.obter_config('topico_nome'),
-            'chat_id': self.obter_config('topico_chat_id')
+            'id': topico.id,
+            'nome': topico.nome,
+            'chat_id': topico.chat_id
         }
 
+    def topico(self) -> ConfigTopico:
+        """Retorna o tópico configurado (leitura do cache, sem I/O)"""
+        return self._topico
+
     # ============ CHANGELOGS ============
 
     def listar_categorias_changelog(self) -> List[str]:
         """Lista todas as categorias de changelog"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT nome FROM categorias_changelog ORDER BY nome")
-        categorias = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return categorias
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT nome FROM categorias_changelog ORDER BY nome")
+            return [row[0] for row in cursor.fetchall()]
 
     def adicionar_categoria_changelog(self, nome: str) -> bool:
         """Adiciona nova categoria de changelog"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO categorias_changelog (nome) VALUES (?)", (nome,))
-            conn.commit()
-            conn.close()
+            with self.transacao() as conn:
+                conn.execute("INSERT INTO categorias_changelog (nome) VALUES (?)", (nome,))
             return True
         except sqlite3.IntegrityError:
             return False
 
     def criar_changelog(self, categoria: str, descricao: str, autor_id: int, autor_nome: str) -> int:
         """Cria um novo changelog"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        data_criacao = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return self._submeter_changelog(categoria, descricao, autor_id, autor_nome).result()
 
-        cursor.execute("""
+    def _submeter_changelog(self, categoria: str, descricao: str, autor_id: int,
+                            autor_nome: str) -> Future:
+        return self.fila.submeter(self._inserir_changelog, categoria, descricao, autor_id,
+                                  autor_nome, agora())
+
+    def _inserir_changelog(self, conn: sqlite3.Connection, categoria: str, descricao: str,
+                           autor_id: int, autor_nome: str, data_criacao: int) -> int:
+        cursor = conn.execute("""
             INSERT INTO changelogs (categoria, descricao, autor_id, autor_nome, data_criacao, pinado)
             VALUES (?, ?, ?, ?, ?, 0)
         """, (categoria, descricao, autor_id, autor_nome, data_criacao))
+        return cursor.lastrowid
 
-        changelog_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return changelog_id
-
-    def listar_changelogs(self, categoria: Optional[str] = None, pinado: Optional[bool] = None) -> List[Dict]:
+    def listar_changelogs(self, categoria: Optional[str] = None, pinado: Optional[bool] = None) -> List[Changelog]:
         """Lista changelogs com filtros opcionais"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        return list(self.iter_changelogs(categoria, pinado))
 
+    def iter_changelogs(self, categoria: Optional[str] = None,
+                        pinado: Optional[bool] = None) -> Iterator[Changelog]:
+        """Gera os changelogs filtrados (pinados primeiro, mais recentes antes)"""
         query = "SELECT id, categoria, descricao, autor_id, autor_nome, data_criacao, pinado FROM changelogs WHERE 1=1"
         params = []
 
@@ -471,82 +1498,47 @@ class Database:
 
         query += " ORDER BY pinado DESC, data_criacao DESC"
 
-        cursor.execute(query, params)
-        changelogs = []
-        for row in cursor.fetchall():
-            changelogs.append({
-                'id': row[0],
-                'categoria': row[1],
-                'descricao': row[2],
-                'autor_id': row[3],
-                'autor_nome': row[4],
-                'data_criacao': row[5],
-                'pinado': row[6]
-            })
-
-        conn.close()
-        return changelogs
-
-    def obter_changelog(self, changelog_id: int) -> Optional[Dict]:
-        """Obtém um changelog específico"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT id, categoria, descricao, autor_id, autor_nome, data_criacao, pinado
-            FROM changelogs WHERE id = ?
-        """, (changelog_id,))
-
-        row = cursor.fetchone()
-        conn.close()
-
-        if row:
-            return {
-                'id': row[0],
-                'categoria': row[1],
-                'descricao': row[2],
-                'autor_id': row[3],
-                'autor_nome': row[4],
-                'data_criacao': row[5],
-                'pinado': row[6]
-            }
-        return None
+        with self.conexao() as conn:
+            yield from Changelog.aplicar(conn.execute(query, params))
 
-    def alternar_pinagem_changelog(self, changelog_id: int) -> bool:
-        """Alterna o estado de pinagem de um changelog"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def obter_changelog(self, changelog_id: int) -> Optional[Changelog]:
+        """Obtém um changelog específico"""
+        with self.conexao() as conn:
+            cursor = Changelog.aplicar(conn.execute("""
+                SELECT id, categoria, descricao, autor_id, autor_nome, data_criacao, pinado
+                FROM changelogs WHERE id = ?
+            """, (changelog_id,)))
+            return cursor.fetchone()
 
-        # Obter estado atual
-        cursor.execute("SELECT pinado FROM changelogs WHERE id = ?", (changelog_id,))
-        row = cursor.fetchone()
+    _RETORNO_CHANGELOG = " RETURNING id, categoria, descricao, autor_id, autor_nome, data_criacao, pinado"
 
-        if row is None:
-            conn.close()
-            return False
+    def _mutar_changelog(self, query: str, params) -> Optional[Changelog]:
+        """Executa um UPDATE/DELETE de changelog e retorna a linha resultante"""
+        with self.transacao() as conn:
+            linhas = Changelog.aplicar(conn.execute(query + self._RETORNO_CHANGELOG, params)).fetchall()
+        return linhas[0] if linhas else None
 
-        novo_estado = 0 if row[0] == 1 else 1
+    def alternar_pinagem_changelog(self, changelog_id: int) -> Optional[Changelog]:
+        """Alterna o estado de pinagem de um changelog e retorna o changelog atualizado
 
-        cursor.execute("UPDATE changelogs SET pinado = ? WHERE id = ?", (novo_estado, changelog_id))
-        conn.commit()
-        conn.close()
-        return True
+        Um único UPDATE: cliques simultâneos alternam uma vez cada, em ordem.
+        """
+        return self._mutar_changelog(
+            "UPDATE changelogs SET pinado = CASE pinado WHEN 1 THEN 0 ELSE 1 END WHERE id = ?",
+            (changelog_id,)
+        )
 
-    def deletar_changelog(self, changelog_id: int) -> bool:
-        """Deleta um changelog"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM changelogs WHERE id = ?", (changelog_id,))
-        deleted = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        return deleted
-
-    def atualizar_changelog(self, changelog_id: int, descricao: Optional[str] = None, categoria: Optional[str] = None) -> bool:
-        """Atualiza um changelog"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def deletar_changelog(self, changelog_id: int, autor_id: Optional[int] = None) -> Optional[Changelog]:
+        """Deleta um changelog (só do autor, se ``autor_id`` for informado) e retorna a linha removida"""
+        if autor_id is None:
+            return self._mutar_changelog("DELETE FROM changelogs WHERE id = ?", (changelog_id,))
+        return self._mutar_changelog(
+            "DELETE FROM changelogs WHERE id = ? AND autor_id = ?", (changelog_id, autor_id)
+        )
 
+    def atualizar_changelog(self, changelog_id: int, descricao: Optional[str] = None,
+                            categoria: Optional[str] = None) -> Optional[Changelog]:
+        """Atualiza um changelog e retorna o changelog atualizado"""
         updates = []
         params = []
 
@@ -559,50 +1551,41 @@ class Database:
             params.append(categoria)
 
         if not updates:
-            conn.close()
-            return False
+            return None
 
         params.append(changelog_id)
-        query = f"UPDATE changelogs SET {', '.join(updates)} WHERE id = ?"
-
-        cursor.execute(query, params)
-        updated = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        return updated
+        return self._mutar_changelog(f"UPDATE changelogs SET {', '.join(updates)} WHERE id = ?", params)
 
     def estatisticas_changelog(self) -> Dict:
         """Retorna estatísticas dos changelogs"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.conexao() as conn:
+            cursor = conn.cursor()
 
-        # Total geral
-        cursor.execute("SELECT COUNT(*) FROM changelogs")
-        total = cursor.fetchone()[0]
+            # Total geral
+            cursor.execute("SELECT COUNT(*) FROM changelogs")
+            total = cursor.fetchone()[0]
 
-        # Total pinados
-        cursor.execute("SELECT COUNT(*) FROM changelogs WHERE pinado = 1")
-        pinados = cursor.fetchone()[0]
+            # Total pinados
+            cursor.execute("SELECT COUNT(*) FROM changelogs WHERE pinado = 1")
+            pinados = cursor.fetchone()[0]
 
-        # Por categoria
-        cursor.execute("""
-            SELECT categoria, COUNT(*) as total
-            FROM changelogs
-            GROUP BY categoria
-            ORDER BY total DESC
-        """)
-        por_categoria = {row[0]: row[1] for row in cursor.fetchall()}
+            # Por categoria
+            cursor.execute("""
+                SELECT categoria, COUNT(*) as total
+                FROM changelogs
+                GROUP BY categoria
+                ORDER BY total DESC
+            """)
+            por_categoria = {row[0]: row[1] for row in cursor.fetchall()}
 
-        # Por autor
-        cursor.execute("""
-            SELECT autor_nome, COUNT(*) as total
-            FROM changelogs
-            GROUP BY autor_nome
-            ORDER BY total DESC
-        """)
-        por_autor = {row[0]: row[1] for row in cursor.fetchall()}
-
-        conn.close()
+            # Por autor
+            cursor.execute("""
+                SELECT autor_nome, COUNT(*) as total
+                FROM changelogs
+                GROUP BY autor_nome
+                ORDER BY total DESC
+            """)
+            por_autor = {row[0]: row[1] for row in cursor.fetchall()}
 
         return {
             'total': total,
@@ -610,3 +1593,102 @@ class Database:
             'por_categoria': por_categoria,
             'por_autor': por_autor
         }
+
+
+class AsyncDatabase:
+    """Fachada assíncrona do Database: executa as consultas fora do event loop.
+
+    Qualquer método público do Database fica disponível como corrotina
+    (ex.: ``await db.listar_tarefas()``). Leituras rodam em um pool de
+    threads; escritas rodam em uma única thread, em ordem de chegada, e
+    revezam com a fila de commit em grupo a conexão de escrita do Database.
+    Os métodos em SINCRONOS leem apenas caches em memória e continuam
+    síncronos (ex.: ``db.obter_config(...)``).
+    """
+
+    # Métodos que só leem memória: chamados direto, sem passar por thread
+    SINCRONOS = {
+        "obter_config",
+        "obter_info_topico",
+        "topico",
+        "listar_categorias",
+        "catalogo_categorias",
+        "nome_categoria",
+        "id_categoria",
+    }
+
+    # Inserções enviadas à fila de commit em grupo do Database: o event loop
+    # aguarda o Future da fila, sem ocupar thread do executor
+    ENFILEIRADAS = {
+        "criar_tarefa": "_submeter_tarefa",
+        "adicionar_comentario": "_submeter_comentario",
+        "criar_changelog": "_submeter_changelog",
+    }
+
+    # Métodos que alteram o banco (executados pela thread de escrita)
+    ESCRITAS = {
+        "adicionar_categoria",
+        "atualizar_status",
+        "atualizar_tarefa",
+        "deletar_tarefa",
+        "salvar_config",
+        "salvar_configs",
+        "salvar_info_topico",
+        "recarregar_config",
+        "recarregar_categorias",
+        "adicionar_categoria_changelog",
+        "alternar_pinagem_changelog",
+        "deletar_changelog",
+        "atualizar_changelog",
+        "verificar_contadores",
+        "importar_tarefas",
+        "importar_arquivo",
+        "arquivar",
+    }
+
+    def __init__(self, db: Database, max_leitores: Optional[int] = None):
+        self.db = db
+        self._leitura = ThreadPoolExecutor(
+            max_workers=max_leitores or db.tamanho_pool,
+            thread_name_prefix="db-leitura"
+        )
+        self._escrita = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-escrita")
+
+    def __getattr__(self, nome: str):
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        if nome.startswith("iter_"):
+            # Geradores leem do banco a cada passo: iterá-los travaria o event loop
+            raise AttributeError(f"{nome} não está disponível no modo assíncrono; use o listar_* correspondente")
+
+        metodo = getattr(self.db, nome)
+        if not callable(metodo) or nome in self.SINCRONOS:
+            return metodo
+
+        if nome in self.ENFILEIRADAS:
+            submeter = getattr(self.db, self.ENFILEIRADAS[nome])
+
+            @functools.wraps(metodo)
+            async def enfileirada(*args, **kwargs):
+                return await asyncio.wrap_future(submeter(*args, **kwargs))
+
+            setattr(self, nome, enfileirada)
+            return enfileirada
+
+        executor = self._escrita if nome in self.ESCRITAS else self._leitura
+
+        @functools.wraps(metodo)
+        async def chamada(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, functools.partial(metodo, *args, **kwargs))
+
+        # Guarda o wrapper para não recriá-lo a cada chamada
+        setattr(self, nome, chamada)
+        return chamada
+
+    async def fechar(self):
+        """Aguarda as consultas pendentes e fecha o banco"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._escrita.shutdown)
+        await loop.run_in_executor(None, self._leitura.shutdown)
+        self.db.fechar()
@@ -0,0 +1,237 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Prioridades de envio (menor sai primeiro). Pode ser passada em qualquer
+# chamada do bot com rate_limit_args=PRIORIDADE_FUNDO, por exemplo.
+PRIORIDADE_INTERATIVA = 0
+PRIORIDADE_NORMAL = 1
+PRIORIDADE_FUNDO = 2
+
+NOMES_PRIORIDADE = {
+    PRIORIDADE_INTERATIVA: "interativa",
+    PRIORIDADE_NORMAL: "normal",
+    PRIORIDADE_FUNDO: "fundo",
+}
+
+# Respostas a cliques: o usuário está olhando para a mensagem
+_ENDPOINTS_INTERATIVOS = {
+    "answerCallbackQuery",
+    "editMessageText",
+    "editMessageCaption",
+    "editMessageReplyMarkup",
+    "editMessageMedia",
+    "deleteMessage",
+}
+
+
+class _Balde:
+    """Balde de fichas: ``taxa`` fichas por segundo, acumulando até ``capacidade``"""
+
+    __slots__ = ("taxa", "capacidade", "fichas", "atualizado", "pausa_ate")
+
+    def __init__(self, taxa: float, capacidade: float):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.fichas = capacidade
+        self.atualizado = time.monotonic()
+        self.pausa_ate = 0.0
+
+    def espera(self, agora: float) -> float:
+        """Segundos até haver uma ficha (0 se já houver)"""
+        self.fichas = min(self.capacidade, self.fichas + (agora - self.atualizado) * self.taxa)
+        self.atualizado = agora
+        falta = 0.0 if self.fichas >= 1 else (1 - self.fichas) / self.taxa
+        return max(falta, self.pausa_ate - agora)
+
+    def retirar(self):
+        self.fichas -= 1
+
+    def pausar(self, segundos: float):
+        self.pausa_ate = max(self.pausa_ate, time.monotonic() + segundos)
+
+
+class LimitadorEnvio(BaseRateLimiter[int]):
+    """Despachante único de tudo que o bot envia à API do Telegram.
+
+    Cada chamada espera uma ficha do balde global e uma do balde do seu
+    chat (grupos têm limite bem menor que conversas privadas). Entre as
+    prontas, sai primeiro a de maior prioridade: edições e respostas a
+    cliques passam na frente de envios comuns, que passam na frente dos
+    de fundo. Um RetryAfter pausa o chat (ou tudo, se não houver chat)
+    pelo tempo pedido pelo servidor e a chamada volta para a fila.
+
+    Instalado com ``Application.builder().rate_limiter(LimitadorEnvio())``,
+    cobre toda chamada feita por ``bot``/``message``/``query``.
+    """
+
+    def __init__(self, global_por_segundo: float = 30.0, grupo_por_minuto: float = 20.0,
+                 privado_por_segundo: float = 1.0, max_tentativas: int = 3):
+        self.global_por_segundo = global_por_segundo
+        self.grupo_por_minuto = grupo_por_minuto
+        self.privado_por_segundo = privado_por_segundo
+        self.max_tentativas = max_tentativas
+
+        self._global = _Balde(global_por_segundo, global_por_segundo)
+        self._chats: Dict[Any, _Balde] = {}
+        self._espera: List[list] = []
+        self._sequencia = itertools.count()
+        self._novo: Optional[asyncio.Event] = None
+        self._despachante: Optional[asyncio.Task] = None
+
+        # Métricas
+        self.enviados = 0
+        self.reenvios = 0
+        self.maior_fila = 0
+        self.tempo_espera = 0.0
+        self.maior_espera = 0.0
+
+    async def initialize(self) -> None:
+        self._novo = asyncio.Event()
+        self._despachante = asyncio.create_task(self._despachar(), name="limitador-envio")
+
+    async def shutdown(self) -> None:
+        if self._despachante:
+            self._despachante.cancel()
+            try:
+                await self._despachante
+            except asyncio.CancelledError:
+                pass
+            self._despachante = None
+        for *_, futuro in self._espera:
+            if not futuro.done():
+                futuro.cancel()
+        self._espera.clear()
+
+    def _balde_chat(self, chat_id: Any) -> _Balde:
+        balde = self._chats.get(chat_id)
+        if balde is None:
+            # Ids negativos são grupos/canais
+            if isinstance(chat_id, int) and chat_id > 0 or str(chat_id).isdigit():
+                balde = _Balde(self.privado_por_segundo, 1)
+            else:
+                balde = _Balde(self.grupo_por_minuto / 60, 3)
+            self._chats[chat_id] = balde
+        return balde
+
+    async def _aguardar_vez(self, prioridade: int, chat_id: Any):
+        futuro = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._espera, [prioridade, next(self._sequencia), chat_id, futuro])
+        self.maior_fila = max(self.maior_fila, len(self._espera))
+        self._novo.set()
+        await futuro
+
+    async def _despachar(self):
+        """Libera, uma por vez, a chamada pronta de maior prioridade"""
+        while True:
+            # Chamadas canceladas enquanto esperavam (timeout, update cancelado) não gastam fichas
+            if any(entrada[3].done() for entrada in self._espera):
+                self._espera = [entrada for entrada in self._espera if not entrada[3].done()]
+                heapq.heapify(self._espera)
+
+            if not self._espera:
+                self._novo.clear()
+                await self._novo.wait()
+                continue
+
+            agora = time.monotonic()
+            espera_global = self._global.espera(agora)
+            escolhida, menor_espera = None, None
+            if espera_global <= 0:
+                # A fila é pequena: percorre em ordem de prioridade até achar um chat livre
+                for entrada in sorted(self._espera):
+                    chat_id = entrada[2]
+                    espera_chat = self._balde_chat(chat_id).espera(agora) if chat_id is not None else 0.0
+                    if espera_chat <= 0:
+                        escolhida = entrada
+                        break
+                    menor_espera = espera_chat if menor_espera is None else min(menor_espera, espera_chat)
+
+            if escolhida is None:
+                # Dorme até a próxima ficha ou até chegar outra chamada
+                self._novo.clear()
+                try:
+                    await asyncio.wait_for(self._novo.wait(), timeout=max(espera_global, menor_espera or 0.0))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._espera.remove(escolhida)
+            heapq.heapify(self._espera)
+            self._global.retirar()
+            if escolhida[2] is not None:
+                self._balde_chat(escolhida[2]).retirar()
+            escolhida[3].set_result(None)
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ):
+        if rate_limit_args is not None:
+            prioridade = rate_limit_args
+        elif endpoint in _ENDPOINTS_INTERATIVOS:
+            prioridade = PRIORIDADE_INTERATIVA
+        else:
+            prioridade = PRIORIDADE_NORMAL
+
+        # answerCallbackQuery não tem chat: só conta no limite global
+        chat_id = data.get("chat_id")
+
+        for tentativa in range(1, self.max_tentativas + 1):
+            inicio = time.monotonic()
+            await self._aguardar_vez(prioridade, chat_id)
+            espera = time.monotonic() - inicio
+            self.tempo_espera += espera
+            self.maior_espera = max(self.maior_espera, espera)
+
+            try:
+                resultado = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                segundos = e.retry_after
+                if isinstance(segundos, timedelta):
+                    segundos = segundos.total_seconds()
+                self.reenvios += 1
+                logger.warning(
+                    f"Flood control em {endpoint} (chat {chat_id}): aguardando {segundos}s "
+                    f"(tentativa {tentativa}/{self.max_tentativas})"
+                )
+                (self._balde_chat(chat_id) if chat_id is not None else self._global).pausar(segundos + 0.1)
+                if tentativa == self.max_tentativas:
+                    raise
+                continue
+
+            self.enviados += 1
+            return resultado
+
+    def metricas(self) -> Dict:
+        """Retorna o tamanho da fila (por prioridade), envios, reenvios e esperas"""
+        por_prioridade = {nome: 0 for nome in NOMES_PRIORIDADE.values()}
+        for prioridade, *_ in self._espera:
+            nome = NOMES_PRIORIDADE.get(prioridade, str(prioridade))
+            por_prioridade[nome] = por_prioridade.get(nome, 0) + 1
+
+        chamadas = self.enviados + self.reenvios
+        return {
+            'na_fila': len(self._espera),
+            'por_prioridade': por_prioridade,
+            'maior_fila': self.maior_fila,
+            'enviados': self.enviados,
+            'reenvios': self.reenvios,
+            'espera_media_ms': self.tempo_espera / chamadas * 1000 if chamadas else 0.0,
+            'maior_espera_ms': self.maior_espera * 1000,
+            'chats': len(self._chats)
+        }
@@ -0,0 +1,158 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sinal de encerramento da thread de escrita
+_FIM = object()
+
+
+class FilaEscrita:
+    """Fila de escrita com commit em grupo (group commit).
+
+    Uma única thread consome a fila. As operações que chegam dentro de
+    ``janela`` segundos da primeira (até ``max_lote``) são executadas em
+    uma só transação, cada uma em seu próprio SAVEPOINT: um erro desfaz
+    apenas a operação que falhou. Cada chamador recebe um Future com o
+    próprio resultado (ex.: o lastrowid do INSERT), resolvido só depois
+    do commit.
+
+    Uma operação é uma função ``funcao(conn, *args, **kwargs)``. Para
+    agir só após o commit (ex.: invalidar um cache), ela pode chamar
+    ``apos_commit(callback)`` durante a execução.
+    """
+
+    def __init__(self, abrir_conexao: Callable, janela: float = 0.005, max_lote: int = 100):
+        self.abrir_conexao = abrir_conexao
+        self.janela = janela
+        self.max_lote = max_lote
+
+        self._fila: "queue.Queue" = queue.Queue()
+        self._callbacks: Optional[List[Callable]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.lotes = 0
+        self.operacoes = 0
+        self.maior_lote = 0
+        self.tempo_commit = 0.0
+        self.maior_commit = 0.0
+
+    def submeter(self, funcao: Callable, *args, **kwargs) -> Future:
+        """Enfileira uma operação e retorna o Future do seu resultado"""
+        futuro: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="db-fila-escrita", daemon=True)
+                self._thread.start()
+            self._fila.put((futuro, funcao, args, kwargs))
+        return futuro
+
+    def executar(self, funcao: Callable, *args, **kwargs) -> Any:
+        """Enfileira uma operação e aguarda o resultado"""
+        return self.submeter(funcao, *args, **kwargs).result()
+
+    def apos_commit(self, callback: Callable):
+        """Agenda ``callback`` para depois do commit da operação em curso"""
+        if self._callbacks is None:
+            raise RuntimeError("apos_commit só pode ser chamado de dentro de uma operação da fila")
+        self._callbacks.append(callback)
+
+    def fechar(self, timeout: Optional[float] = None):
+        """Processa o que já está na fila e encerra a thread de escrita"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._fila.put(_FIM)
+        thread.join(timeout)
+
+    def metricas(self) -> Dict:
+        """Retorna tamanho dos lotes e latência dos commits"""
+        return {
+            'lotes': self.lotes,
+            'operacoes': self.operacoes,
+            'lote_medio': self.operacoes / self.lotes if self.lotes else 0.0,
+            'maior_lote': self.maior_lote,
+            'commit_medio_ms': self.tempo_commit / self.lotes * 1000 if self.lotes else 0.0,
+            'maior_commit_ms': self.maior_commit * 1000,
+            'pendentes': self._fila.qsize()
+        }
+
+    def _coletar_lote(self, primeiro) -> Tuple[List, bool]:
+        """Junta ao primeiro item o que chegar dentro da janela"""
+        lote = [primeiro]
+        limite = time.monotonic() + self.janela
+        while len(lote) < self.max_lote:
+            restante = limite - time.monotonic()
+            try:
+                item = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is _FIM:
+                return lote, True
+            lote.append(item)
+        return lote, False
+
+    def _executar(self):
+        encerrar = False
+        while not encerrar:
+            primeiro = self._fila.get()
+            if primeiro is _FIM:
+                break
+            lote, encerrar = self._coletar_lote(primeiro)
+            self._gravar_lote(lote)
+
+    def _gravar_lote(self, lote: List):
+        inicio = time.monotonic()
+        concluidas = []
+
+        try:
+            with self.abrir_conexao() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for futuro, funcao, args, kwargs in lote:
+                    if not futuro.set_running_or_notify_cancel():
+                        continue
+
+                    self._callbacks = []
+                    conn.execute("SAVEPOINT operacao")
+                    try:
+                        resultado = funcao(conn, *args, **kwargs)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO operacao")
+                        conn.execute("RELEASE operacao")
+                        futuro.set_exception(e)
+                    else:
+                        conn.execute("RELEASE operacao")
+                        concluidas.append((futuro, resultado, self._callbacks))
+                    finally:
+                        self._callbacks = None
+
+                conn.commit()
+        except Exception as e:
+            # Falha no BEGIN/COMMIT: nada do lote foi gravado
+            logger.error(f"Erro ao gravar lote de {len(lote)} escrita(s): {e}")
+            for futuro, *_ in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        duracao = time.monotonic() - inicio
+        self.lotes += 1
+        self.operacoes += len(lote)
+        self.maior_lote = max(self.maior_lote, len(lote))
+        self.tempo_commit += duracao
+        self.maior_commit = max(self.maior_commit, duracao)
+
+        for futuro, resultado, callbacks in concluidas:
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"Erro em callback pós-commit: {e}")
+            futuro.set_result(resultado)
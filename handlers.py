@@ -1,9 +1,9 @@
+import os
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.constants import ParseMode
-from database import Database
+from shards import RoteadorShards
 import keyboards
-import math
 
 # Versão do bot
 VERSION = "1.0.3"
@@ -17,7 +17,8 @@ EDITAR_TITULO, EDITAR_DESCRICAO, EDITAR_PRIORIDADE = range(5, 8)
 # Estado para comentário
 ADICIONAR_COMENTARIO = 8
 
-db = Database()
+# Com DB_SHARDS_DIR cada chat tem seu próprio banco nessa pasta; sem ele, todos usam tarefas_bot.db
+db = RoteadorShards(os.getenv("DB_SHARDS_DIR") or None, max_abertos=int(os.getenv("DB_SHARDS_ABERTOS", "16")))
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler do comando /start"""
@@ -63,7 +64,7 @@ async def listar_tarefas(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def minhas_tarefas(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handler do comando /minhas"""
     user_id = update.effective_user.id
-    tarefas = db.listar_tarefas(autor_id=user_id)
+    tarefas = await db.listar_tarefas(autor_id=user_id, ordem="atividade")
     
     if not tarefas:
         await update.message.reply_text("Você não tem tarefas cadastradas.")
@@ -86,7 +87,8 @@ async def buscar_tarefas(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     termo = " ".join(context.args)
-    tarefas = db.buscar_tarefas(termo)
+    # Pede um resultado a mais só para saber se há outros além dos exibidos
+    tarefas = await db.buscar_tarefas(termo, limite=11)
     
     if not tarefas:
         await update.message.reply_text(f"Nenhuma tarefa encontrada para '{termo}'")
@@ -98,7 +100,7 @@ async def buscar_tarefas(update: Update, context: ContextTypes.DEFAULT_TYPE):
         texto += "─" * 30 + "\n"
     
     if len(tarefas) > 10:
-        texto += f"\n_...e mais {len(tarefas) - 10} resultados_"
+        texto += "\n_...e mais resultados. Refine a busca para ver outros._"
     
     await update.message.reply_text(texto, parse_mode=ParseMode.MARKDOWN)
 
@@ -110,7 +112,7 @@ async def adicionar_categoria(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     nome = " ".join(context.args)
     
-    if db.adicionar_categoria(nome):
+    if await db.adicionar_categoria(nome):
         await update.message.reply_text(f"✅ Categoria '{nome}' adicionada com sucesso!")
     else:
         await update.message.reply_text(f"❌ Categoria '{nome}' já existe!")
@@ -119,8 +121,7 @@ async def adicionar_categoria(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def nova_tarefa_inicio(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Inicia o processo de criar nova tarefa"""
-    categorias = db.listar_categorias()
-    keyboard = keyboards.selecionar_categoria_nova_tarefa(categorias)
+    keyboard = keyboards.selecionar_categoria_nova_tarefa(db.catalogo_categorias())
     
     await update.message.reply_text(
         "*📝 Nova Tarefa*\n\nEscolha a categoria:",
@@ -212,7 +213,7 @@ async def finalizar_nova_tarefa(update: Update, context: ContextTypes.DEFAULT_TY
     dados = context.user_data['nova_tarefa']
     user = update.effective_user
     
-    tarefa_id = db.criar_tarefa(
+    tarefa_id = await db.criar_tarefa(
         titulo=dados['titulo'],
         descricao=dados.get('descricao', ''),
         categoria_id=dados['categoria_id'],
@@ -222,7 +223,7 @@ async def finalizar_nova_tarefa(update: Update, context: ContextTypes.DEFAULT_TY
         imagem_file_id=dados.get('imagem_file_id')
     )
     
-    tarefa = db.obter_tarefa(tarefa_id)
+    tarefa = await db.obter_tarefa(tarefa_id)
     texto = "✅ *Tarefa criada com sucesso!*\n\n" + keyboards.formatar_tarefa_texto(tarefa)
     
     await update.message.reply_text(texto, parse_mode=ParseMode.MARKDOWN)
@@ -238,223 +239,6 @@ async def cancelar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data.clear()
     return ConversationHandler.END
 
-# === CALLBACKS DE NAVEGAÇÃO ===
-
-async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handler geral para callbacks inline"""
-    query = update.callback_query
-    await query.answer()
-    
-    data = query.data
-    
-    # Ignorar callbacks de paginação placeholder
-    if data == "ignore":
-        return
-    
-    # Menu principal
-    if data == "voltar_menu":
-        await listar_tarefas(update, context)
-        return
-    
-    # Listagens
-    if data.startswith("lista_"):
-        status = data.split("_", 1)[1] if data != "lista_todas" else None
-        await mostrar_lista_tarefas(update, context, status=status)
-        return
-    
-    # Menu de categorias
-    if data == "menu_categorias":
-        categorias = db.listar_categorias()
-        keyboard = keyboards.menu_categorias(categorias)
-        await query.message.edit_text(
-            "*🖥️ Selecione uma categoria:*",
-            reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
-        )
-        return
-    
-    # Filtrar por categoria
-    if data.startswith("cat_"):
-        categoria_id = int(data.split("_")[1])
-        await mostrar_lista_tarefas(update, context, categoria_id=categoria_id)
-        return
-    
-    # Ver detalhes de uma tarefa
-    if data.startswith("ver_"):
-        tarefa_id = int(data.split("_")[1])
-        await mostrar_detalhes_tarefa(update, context, tarefa_id)
-        return
-    
-    # Mudar status
-    if data.startswith("status_"):
-        parts = data.split("_")
-        tarefa_id = int(parts[1])
-        novo_status = parts[2]
-        
-        if db.atualizar_status(tarefa_id, novo_status):
-            await query.answer(f"✅ Status atualizado para {novo_status.replace('_', ' ')}!")
-            await mostrar_detalhes_tarefa(update, context, tarefa_id)
-        else:
-            await query.answer("❌ Erro ao atualizar status", show_alert=True)
-        return
-    
-    # Deletar tarefa
-    if data.startswith("deletar_"):
-        tarefa_id = int(data.split("_")[1])
-        keyboard = keyboards.confirmar_delecao(tarefa_id)
-        await query.message.edit_text(
-            "⚠️ *Confirma a exclusão desta tarefa?*\n\nEsta ação não pode ser desfeita!",
-            reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
-        )
-        return
-    
-    # Confirmar deleção
-    if data.startswith("confirma_del_"):
-        tarefa_id = int(data.split("_")[2])
-        tarefa = db.obter_tarefa(tarefa_id)
-        
-        if tarefa and tarefa['autor_id'] == update.effective_user.id:
-            if db.deletar_tarefa(tarefa_id):
-                await query.message.edit_text("✅ Tarefa deletada com sucesso!")
-            else:
-                await query.message.edit_text("❌ Erro ao deletar tarefa")
-        else:
-            await query.answer("❌ Você não tem permissão para deletar esta tarefa", show_alert=True)
-        return
-    
-    # Cancelar deleção
-    if data.startswith("cancelar_del_"):
-        tarefa_id = int(data.split("_")[2])
-        await mostrar_detalhes_tarefa(update, context, tarefa_id)
-        return
-    
-    # Menu de edição
-    if data.startswith("editar_"):
-        tarefa_id = int(data.split("_")[1])
-        keyboard = keyboards.menu_edicao(tarefa_id)
-        await query.message.edit_text(
-            "*✏️ O que deseja editar?*",
-            reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
-        )
-        return
-    
-    # Ver comentários
-    if data.startswith("comentarios_"):
-        tarefa_id = int(data.split("_")[1])
-        await mostrar_comentarios(update, context, tarefa_id)
-        return
-
-async def mostrar_lista_tarefas(update: Update, context: ContextTypes.DEFAULT_TYPE, 
-                                status=None, categoria_id=None, pagina=0):
-    """Mostra lista de tarefas com paginação"""
-    query = update.callback_query
-    
-    tarefas = db.listar_tarefas(categoria_id=categoria_id, status=status)
-    
-    if not tarefas:
-        await query.message.edit_text(
-            "📭 Nenhuma tarefa encontrada.",
-            reply_markup=keyboards.menu_principal()
-        )
-        return
-    
-    # Paginação
-    itens_por_pagina = 5
-    total_paginas = math.ceil(len(tarefas) / itens_por_pagina)
-    inicio = pagina * itens_por_pagina
-    fim = inicio + itens_por_pagina
-    tarefas_pagina = tarefas[inicio:fim]
-    
-    texto = f"*📋 Tarefas* (Página {pagina+1}/{total_paginas})\n\n"
-    
-    keyboard = []
-    for tarefa in tarefas_pagina:
-        status_emoji = keyboards.STATUS_EMOJI.get(tarefa['status'], "❓")
-        prior_emoji = keyboards.PRIORIDADE_EMOJI.get(tarefa['prioridade'], "⚪")
-        
-        botao_texto = f"{status_emoji}{prior_emoji} #{tarefa['id']} - {tarefa['titulo'][:30]}"
-        keyboard.append([
-            InlineKeyboardButton(botao_texto, callback_data=f"ver_{tarefa['id']}")
-        ])
-    
-    # Adiciona botões de paginação
-    if total_paginas > 1:
-        pag_buttons = []
-        if pagina > 0:
-            pag_buttons.append(InlineKeyboardButton("⬅️", callback_data=f"pag_{pagina-1}"))
-        pag_buttons.append(InlineKeyboardButton(f"{pagina+1}/{total_paginas}", callback_data="ignore"))
-        if pagina < total_paginas - 1:
-            pag_buttons.append(InlineKeyboardButton("➡️", callback_data=f"pag_{pagina+1}"))
-        keyboard.append(pag_buttons)
-    
-    keyboard.append([InlineKeyboardButton("⬅️ Voltar ao Menu", callback_data="voltar_menu")])
-    
-    await query.message.edit_text(
-        texto,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode=ParseMode.MARKDOWN
-    )
-
-async def mostrar_detalhes_tarefa(update: Update, context: ContextTypes.DEFAULT_TYPE, tarefa_id: int):
-    """Mostra detalhes completos de uma tarefa"""
-    query = update.callback_query
-    tarefa = db.obter_tarefa(tarefa_id)
-    
-    if not tarefa:
-        await query.message.edit_text("❌ Tarefa não encontrada.")
-        return
-    
-    texto = keyboards.formatar_tarefa_texto(tarefa, mostrar_descricao=True)
-    keyboard = keyboards.acoes_tarefa(tarefa_id, tarefa['autor_id'], update.effective_user.id)
-    
-    # Se tem imagem, envia separadamente
-    if tarefa.get('imagem_file_id'):
-        await query.message.delete()
-        await context.bot.send_photo(
-            chat_id=query.message.chat_id,
-            photo=tarefa['imagem_file_id'],
-            caption=texto,
-            reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
-        )
-    else:
-        await query.message.edit_text(
-            texto,
-            reply_markup=keyboard,
-            parse_mode=ParseMode.MARKDOWN
-        )
-
-async def mostrar_comentarios(update: Update, context: ContextTypes.DEFAULT_TYPE, tarefa_id: int):
-    """Mostra comentários de uma tarefa"""
-    query = update.callback_query
-    comentarios = db.listar_comentarios(tarefa_id)
-    tarefa = db.obter_tarefa(tarefa_id)
-    
-    if not tarefa:
-        await query.answer("❌ Tarefa não encontrada", show_alert=True)
-        return
-    
-    texto = f"*💬 Comentários - Tarefa #{tarefa_id}*\n\n"
-    
-    if comentarios:
-        for com in comentarios:
-            texto += f"👤 *{com['autor_nome']}* ({com['data'][:16]})\n"
-            texto += f"{com['comentario']}\n\n"
-    else:
-        texto += "_Nenhum comentário ainda._\n\n"
-    
-    texto += "\n💡 Para adicionar um comentário, use:\n`/comentar {tarefa_id} [seu comentário]`"
-    
-    keyboard = keyboards.voltar_tarefa(tarefa_id)
-    
-    await query.message.edit_text(
-        texto,
-        reply_markup=keyboard,
-        parse_mode=ParseMode.MARKDOWN
-    )
-
 async def adicionar_comentario_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Adiciona comentário via comando /comentar"""
     if len(context.args) < 2:
@@ -465,13 +249,13 @@ async def adicionar_comentario_cmd(update: Update, context: ContextTypes.DEFAULT
         tarefa_id = int(context.args[0])
         comentario = " ".join(context.args[1:])
         
-        tarefa = db.obter_tarefa(tarefa_id)
+        tarefa = await db.obter_tarefa(tarefa_id)
         if not tarefa:
             await update.message.reply_text("❌ Tarefa não encontrada")
             return
         
         user = update.effective_user
-        db.adicionar_comentario(tarefa_id, user.id, user.first_name, comentario)
+        await db.adicionar_comentario(tarefa_id, user.id, user.first_name, comentario)
         
         await update.message.reply_text(f"✅ Comentário adicionado à tarefa #{tarefa_id}!")
         
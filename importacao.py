@@ -0,0 +1,170 @@
+import csv
+import json
+from datetime import datetime
+from typing import AbstractSet, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+# Formatos aceitos por /importar e /exportar
+FORMATOS = ("jsonl", "csv")
+
+# Colunas exportadas por tabela (também são os campos aceitos na importação de tarefas,
+# exceto ``arquivada``: tarefas importadas entram sempre como ativas)
+COLUNAS_EXPORTACAO = {
+    "tarefas": [
+        "id", "titulo", "descricao", "categoria", "autor_id", "autor_nome",
+        "atribuido_id", "atribuido_nome", "status", "prioridade",
+        "data_criacao", "data_conclusao", "arquivada"
+    ],
+    "comentarios": ["id", "tarefa_id", "autor_id", "autor_nome", "comentario", "data"],
+    "changelogs": ["id", "categoria", "descricao", "autor_id", "autor_nome", "data_criacao", "pinado"],
+}
+
+STATUS_VALIDOS = ("pendente", "em_andamento", "concluido")
+PRIORIDADES_VALIDAS = ("alta", "media", "baixa")
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+
+
+class RegistroInvalido(ValueError):
+    """Linha do arquivo de importação que não pode virar tarefa"""
+
+
+def formato_do_arquivo(nome: Optional[str]) -> Optional[str]:
+    """Deduz o formato pela extensão (.jsonl/.ndjson/.json ou .csv)"""
+    extensao = (nome or "").rsplit(".", 1)[-1].lower()
+    if extensao in ("jsonl", "ndjson", "json"):
+        return "jsonl"
+    if extensao == "csv":
+        return "csv"
+    return None
+
+
+def ler_registros(arquivo: IO[str], formato: str) -> Iterator[Tuple[int, Dict]]:
+    """Lê o arquivo linha a linha, gerando (número da linha, registro)
+
+    Uma linha JSONL malformada não interrompe a leitura: no lugar do
+    registro vem a exceção RegistroInvalido correspondente.
+    """
+    if formato == "csv":
+        leitor = csv.DictReader(arquivo)
+        for registro in leitor:
+            yield leitor.line_num, registro
+        return
+
+    for numero, linha in enumerate(arquivo, start=1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            registro = json.loads(linha)
+        except json.JSONDecodeError as e:
+            yield numero, RegistroInvalido(f"JSON inválido ({e.msg})")
+            continue
+        if not isinstance(registro, dict):
+            yield numero, RegistroInvalido("esperado um objeto JSON")
+            continue
+        yield numero, registro
+
+
+def escrever_registros(registros: Iterable[Dict], arquivo: IO[str], formato: str,
+                       colunas: List[str]) -> int:
+    """Grava os registros um a um no arquivo; retorna quantos foram gravados"""
+    total = 0
+    if formato == "csv":
+        escritor = csv.DictWriter(arquivo, fieldnames=colunas)
+        escritor.writeheader()
+        for registro in registros:
+            escritor.writerow(registro)
+            total += 1
+    else:
+        for registro in registros:
+            arquivo.write(json.dumps(registro, ensure_ascii=False))
+            arquivo.write("\n")
+            total += 1
+    return total
+
+
+def _texto(registro: Dict, campo: str) -> Optional[str]:
+    valor = registro.get(campo)
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def _data(registro: Dict, campo: str) -> Optional[int]:
+    """Lê uma data como epoch (inteiro) ou texto AAAA-MM-DD HH:MM:SS em hora local"""
+    valor = _texto(registro, campo)
+    if valor is None:
+        return None
+    if valor.isdigit():
+        return int(valor)
+    try:
+        return int(datetime.strptime(valor, FORMATO_DATA).timestamp())
+    except ValueError:
+        raise RegistroInvalido(f"{campo} deve ser epoch ou estar no formato AAAA-MM-DD HH:MM:SS") from None
+
+
+def _id_usuario(registro: Dict, campo: str) -> Optional[int]:
+    """Lê um id de usuário do Telegram (inteiro, negativo em canais)"""
+    valor = _texto(registro, campo)
+    if valor is None:
+        return None
+    if not valor.lstrip("-").isdigit():
+        raise RegistroInvalido(f"{campo} inválido: {valor}")
+    return int(valor)
+
+
+def validar_tarefa(registro: Dict, categorias: Dict[str, int], ids_categoria: AbstractSet[int],
+                   autor_id: int, autor_nome: str) -> Tuple:
+    """Converte um registro importado na tupla de colunas de INSERT INTO tarefas
+
+    ``categorias`` mapeia nome -> id e ``ids_categoria`` tem os ids válidos
+    (montado uma vez por importação, não a cada linha). A categoria pode
+    vir pelo nome (campo ``categoria``) ou pelo id (``categoria_id``). Autor e data
+    ausentes assumem quem importou e o momento da importação. Datas são
+    gravadas como epoch UTC, o mesmo formato que a exportação produz.
+    """
+    titulo = _texto(registro, "titulo")
+    if not titulo:
+        raise RegistroInvalido("titulo é obrigatório")
+
+    categoria = _texto(registro, "categoria")
+    categoria_id = _texto(registro, "categoria_id")
+    if categoria is not None:
+        if categoria not in categorias:
+            raise RegistroInvalido(f"categoria desconhecida: {categoria}")
+        categoria_id = categorias[categoria]
+    elif categoria_id is not None:
+        if not categoria_id.isdigit() or int(categoria_id) not in ids_categoria:
+            raise RegistroInvalido(f"categoria_id desconhecido: {categoria_id}")
+        categoria_id = int(categoria_id)
+    else:
+        raise RegistroInvalido("categoria é obrigatória")
+
+    status = _texto(registro, "status") or "pendente"
+    if status not in STATUS_VALIDOS:
+        raise RegistroInvalido(f"status inválido: {status}")
+
+    prioridade = _texto(registro, "prioridade") or "media"
+    if prioridade not in PRIORIDADES_VALIDAS:
+        raise RegistroInvalido(f"prioridade inválida: {prioridade}")
+
+    id_autor = _id_usuario(registro, "autor_id")
+
+    data_criacao = _data(registro, "data_criacao") or int(datetime.now().timestamp())
+    data_conclusao = _data(registro, "data_conclusao")
+    if status == "concluido" and data_conclusao is None:
+        data_conclusao = data_criacao
+
+    return (
+        titulo,
+        _texto(registro, "descricao"),
+        categoria_id,
+        id_autor if id_autor is not None else autor_id,
+        _texto(registro, "autor_nome") or autor_nome,
+        _id_usuario(registro, "atribuido_id"),
+        _texto(registro, "atribuido_nome"),
+        status,
+        prioridade,
+        data_criacao,
+        data_conclusao,
+    )
@@ -1,3 +1,6 @@
+from datetime import datetime
+from functools import lru_cache
+
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 # Emojis para status e prioridades
@@ -7,12 +10,27 @@ STATUS_EMOJI = {
     "concluido": "✅"
 }
 
+# Códigos curtos dos status no callback_data (os nomes já têm "_")
+CODIGO_STATUS = {
+    "pendente": "p",
+    "em_andamento": "a",
+    "concluido": "c"
+}
+STATUS_POR_CODIGO = {codigo: status for status, codigo in CODIGO_STATUS.items()}
+
 PRIORIDADE_EMOJI = {
     "alta": "🔴",
     "media": "🟡",
     "baixa": "🟢"
 }
 
+@lru_cache(maxsize=4096)
+def formatar_data(epoch, formato="%d/%m/%Y %H:%M"):
+    """Formata uma data do banco (epoch UTC) na hora local; resultado em cache"""
+    if epoch is None:
+        return ""
+    return datetime.fromtimestamp(epoch).strftime(formato)
+
 def menu_principal():
     """Teclado do menu principal de filtros"""
     keyboard = [
@@ -30,28 +48,37 @@ def menu_principal():
     ]
     return InlineKeyboardMarkup(keyboard)
 
-def menu_categorias(categorias):
+# Os teclados de categorias recebem o catálogo (tupla de (id, nome)) de
+# db.catalogo_categorias(). A tupla só muda quando uma categoria é criada,
+# então cada teclado é montado uma vez e reaproveitado.
+
+@lru_cache(maxsize=16)
+def menu_categorias(categorias, voltar_callback="voltar_menu", voltar_texto="⬅️ Voltar",
+                    nova_categoria=True):
     """Teclado com lista de categorias"""
     keyboard = []
-    for cat in categorias:
+    for cat_id, nome in categorias:
         keyboard.append([
-            InlineKeyboardButton(f"🖥️ {cat['nome']}", callback_data=f"cat_{cat['id']}")
+            InlineKeyboardButton(f"🖥️ {nome}", callback_data=f"cat_{cat_id}")
         ])
-    keyboard.append([InlineKeyboardButton("➕ Nova Categoria", callback_data="nova_categoria")])
-    keyboard.append([InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_menu")])
+    if nova_categoria:
+        keyboard.append([InlineKeyboardButton("➕ Nova Categoria", callback_data="nova_categoria")])
+    keyboard.append([InlineKeyboardButton(voltar_texto, callback_data=voltar_callback)])
     return InlineKeyboardMarkup(keyboard)
 
-def acoes_tarefa(tarefa_id, autor_id, user_id):
+def acoes_tarefa(tarefa_id, autor_id, user_id, status):
     """Botões de ação para uma tarefa específica"""
     keyboard = []
     
-    # Botões de status (todos podem mudar status)
+    # Botões de status (todos podem mudar status); levam o status exibido para
+    # que o clique não sobrescreva uma mudança feita por outra pessoa
+    atual = CODIGO_STATUS[status]
     keyboard.append([
-        InlineKeyboardButton("⏳ Pendente", callback_data=f"status_{tarefa_id}_pendente"),
-        InlineKeyboardButton("🔄 Em Andamento", callback_data=f"status_{tarefa_id}_em_andamento"),
+        InlineKeyboardButton("⏳ Pendente", callback_data=f"st_{tarefa_id}_{atual}_p"),
+        InlineKeyboardButton("🔄 Em Andamento", callback_data=f"st_{tarefa_id}_{atual}_a"),
     ])
     keyboard.append([
-        InlineKeyboardButton("✅ Concluir", callback_data=f"status_{tarefa_id}_concluido")
+        InlineKeyboardButton("✅ Concluir", callback_data=f"st_{tarefa_id}_{atual}_c")
     ])
     
     # Botões de ação (apenas autor pode editar/deletar)
@@ -72,6 +99,14 @@ def acoes_tarefa(tarefa_id, autor_id, user_id):
     
     return InlineKeyboardMarkup(keyboard)
 
+def acoes_tarefa_arquivada(tarefa_id):
+    """Botões de uma tarefa arquivada (somente leitura)"""
+    keyboard = [
+        [InlineKeyboardButton("💬 Ver Comentários", callback_data=f"comentarios_{tarefa_id}")],
+        [InlineKeyboardButton("⬅️ Voltar", callback_data="voltar_menu")]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
 def keyboard_confirmar_delecao(tarefa_id):
     """Teclado de confirmação de deleção"""
     keyboard = [
@@ -82,12 +117,13 @@ def keyboard_confirmar_delecao(tarefa_id):
     ]
     return InlineKeyboardMarkup(keyboard)
 
+@lru_cache(maxsize=4)
 def selecionar_categoria_nova_tarefa(categorias):
     """Teclado para selecionar categoria ao criar tarefa"""
     keyboard = []
-    for cat in categorias:
+    for cat_id, nome in categorias:
         keyboard.append([
-            InlineKeyboardButton(cat['nome'], callback_data=f"newcat_{cat['id']}")
+            InlineKeyboardButton(nome, callback_data=f"newcat_{cat_id}")
         ])
     keyboard.append([InlineKeyboardButton("❌ Cancelar", callback_data="cancelar_nova")])
     return InlineKeyboardMarkup(keyboard)
@@ -121,32 +157,47 @@ def menu_edicao(tarefa_id):
     ]
     return InlineKeyboardMarkup(keyboard)
 
-def voltar_tarefa(tarefa_id):
-    """Botão simples para voltar à visualização da tarefa"""
-    keyboard = [
-        [InlineKeyboardButton("➕ Adicionar Comentário", callback_data=f"add_comentario_{tarefa_id}")],
-        [InlineKeyboardButton("⬅️ Voltar", callback_data=f"ver_{tarefa_id}")]
-    ]
+def voltar_tarefa(tarefa_id, arquivada=False):
+    """Botão simples para voltar à visualização da tarefa (arquivadas não recebem comentários)"""
+    keyboard = []
+    if not arquivada:
+        keyboard.append([InlineKeyboardButton("➕ Adicionar Comentário", callback_data=f"add_comentario_{tarefa_id}")])
+    keyboard.append([InlineKeyboardButton("⬅️ Voltar", callback_data=f"ver_{tarefa_id}")])
     return InlineKeyboardMarkup(keyboard)
 
-def paginacao(pagina_atual, total_paginas, prefixo="pag"):
-    """Botões de paginação"""
+def lista_tarefas_paginada(pagina, prefixo, filtro, voltar_callback="voltar_menu",
+                           voltar_texto="⬅️ Voltar ao Menu"):
+    """Botões de uma página de tarefas com navegação por cursor
+
+    As callbacks de navegação seguem o formato ``{prefixo}_{a|p}_{id}_{filtro}``:
+    "a" volta para as tarefas mais recentes que o id e "p" avança para as mais antigas.
+    """
+    tarefas = pagina['tarefas']
     keyboard = []
+
+    for tarefa in tarefas:
+        status_emoji = STATUS_EMOJI.get(tarefa['status'], "❓")
+        prior_emoji = PRIORIDADE_EMOJI.get(tarefa['prioridade'], "⚪")
+        label = f"{status_emoji} {prior_emoji} #{tarefa['id']} - {tarefa['titulo'][:30]}"
+        if tarefa['total_comentarios']:
+            label += f" 💬{tarefa['total_comentarios']}"
+        keyboard.append([InlineKeyboardButton(label, callback_data=f"ver_{tarefa['id']}")])
+
     buttons = []
-    
-    if pagina_atual > 0:
-        buttons.append(InlineKeyboardButton("⬅️ Anterior", callback_data=f"{prefixo}_{pagina_atual-1}"))
-    
-    buttons.append(InlineKeyboardButton(f"{pagina_atual+1}/{total_paginas}", callback_data="ignore"))
-    
-    if pagina_atual < total_paginas - 1:
-        buttons.append(InlineKeyboardButton("➡️ Próximo", callback_data=f"{prefixo}_{pagina_atual+1}"))
-    
+    if tarefas and pagina['tem_anterior']:
+        buttons.append(InlineKeyboardButton(
+            "⬅️ Anterior", callback_data=f"{prefixo}_a_{tarefas[0]['id']}_{filtro}"
+        ))
+    if tarefas and pagina['tem_proxima']:
+        buttons.append(InlineKeyboardButton(
+            "➡️ Próxima", callback_data=f"{prefixo}_p_{tarefas[-1]['id']}_{filtro}"
+        ))
+
     if buttons:
         keyboard.append(buttons)
-    
-    keyboard.append([InlineKeyboardButton("⬅️ Voltar ao Menu", callback_data="voltar_menu")])
-    
+
+    keyboard.append([InlineKeyboardButton(voltar_texto, callback_data=voltar_callback)])
+
     return InlineKeyboardMarkup(keyboard)
 
 def formatar_tarefa_texto(tarefa, mostrar_descricao=True):
@@ -163,7 +214,10 @@ def formatar_tarefa_texto(tarefa, mostrar_descricao=True):
     if tarefa.get('atribuido_nome'):
         texto += f"👥 Atribuído: {tarefa['atribuido_nome']}\n"
 
-    texto += f"📅 Data: {tarefa['data_criacao'][:16]}\n"
+    texto += f"📅 Data: {formatar_data(tarefa['data_criacao'], '%Y-%m-%d %H:%M')}\n"
+
+    if tarefa.get('total_comentarios'):
+        texto += f"💬 Comentários: {tarefa['total_comentarios']}\n"
 
     if mostrar_descricao and tarefa.get('descricao'):
         texto += f"\n📝 *Descrição:*\n{tarefa['descricao']}\n"
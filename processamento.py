@@ -0,0 +1,181 @@
+import asyncio
+import inspect
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Deque, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Esperas guardadas para o percentil 95
+AMOSTRAS_ESPERA = 500
+
+# Momento em que o update chegou ao processador, antes de esperar uma vaga
+_chegada: ContextVar[float] = ContextVar("chegada_update")
+
+
+class _VezDoUsuario:
+    """Trava (FIFO) de um usuário e quantos updates dele estão no processador"""
+
+    __slots__ = ("trava", "pendentes")
+
+    def __init__(self):
+        self.trava = asyncio.Lock()
+        self.pendentes = 0
+
+
+class ProcessadorPorUsuario(BaseUpdateProcessor):
+    """Processa updates de usuários diferentes em paralelo, os de cada um em ordem.
+
+    O estado de edição e comentário fica em ``context.user_data``; dois
+    updates do mesmo usuário rodando juntos poderiam ler o estado um do
+    outro pela metade. Aqui, o update que chega enquanto outro do mesmo
+    usuário está em andamento espera a vez na trava desse usuário, dentro
+    da sua própria task: ele continua contando como em voo (e segurando a
+    vaga da ``FilaUpdates``) até ser processado. Quem espera a vez não
+    ocupa uma das ``max_concorrentes`` vagas, então um usuário apressado
+    não trava os demais.
+
+    Updates sem usuário (posts de canal, por exemplo) são ordenados pelo chat.
+
+    Este processador não limita quantos updates a Application tira da fila
+    de recepção (ela cria uma task para cada um); isso é feito pela
+    ``FilaUpdates``.
+    """
+
+    def __init__(self, max_concorrentes: int = 8):
+        super().__init__(max_concorrentes)
+        self.em_voo = 0
+        self._usuarios: Dict[Hashable, _VezDoUsuario] = {}
+
+        # Métricas (espera: da chegada ao processador até o início do processamento)
+        self.processados = 0
+        self.enfileirados = 0
+        self.maior_fila = 0
+        self.tempo_espera = 0.0
+        self.maior_espera = 0.0
+        self.tempo_processando = 0.0
+        self._esperas: Deque[float] = deque(maxlen=AMOSTRAS_ESPERA)
+
+    @staticmethod
+    def chave(update: object) -> Optional[Hashable]:
+        """Chave de ordenação do update: o usuário, ou o chat se não houver usuário"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user:
+            return ("usuario", update.effective_user.id)
+        if update.effective_chat:
+            return ("chat", update.effective_chat.id)
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        # A espera conta desde aqui, incluindo a vez do usuário e uma das max_concorrentes vagas
+        _chegada.set(time.monotonic())
+        self.em_voo += 1
+        chave = self.chave(update)
+        try:
+            if chave is None:
+                await super().process_update(update, coroutine)
+                return
+
+            vez = self._usuarios.get(chave)
+            if vez is None:
+                vez = self._usuarios[chave] = _VezDoUsuario()
+            vez.pendentes += 1
+            if vez.pendentes > 1:
+                self.enfileirados += 1
+                self.maior_fila = max(self.maior_fila, vez.pendentes - 1)
+
+            try:
+                async with vez.trava:
+                    await super().process_update(update, coroutine)
+            finally:
+                vez.pendentes -= 1
+                if not vez.pendentes:
+                    del self._usuarios[chave]
+        finally:
+            self.em_voo -= 1
+            # Cancelado antes da vez: descarta a corrotina sem deixá-la pendente
+            if inspect.getcoroutinestate(coroutine) == inspect.CORO_CREATED:
+                coroutine.close()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await self._executar(coroutine, _chegada.get(time.monotonic()))
+
+    async def _executar(self, coroutine: Awaitable[Any], chegada: float):
+        inicio = time.monotonic()
+        espera = inicio - chegada
+        self.tempo_espera += espera
+        self.maior_espera = max(self.maior_espera, espera)
+        self._esperas.append(espera)
+        try:
+            await coroutine
+        except Exception as e:
+            # Erros dos handlers já vão para os error handlers; isto só protege a vez do usuário
+            logger.error(f"Erro ao processar update: {e}")
+        finally:
+            self.processados += 1
+            self.tempo_processando += time.monotonic() - inicio
+
+    def metricas(self) -> Dict:
+        """Retorna updates em andamento/na fila, processados e tempos de espera"""
+        esperas = sorted(self._esperas)
+        return {
+            'em_andamento': self.current_concurrent_updates,
+            'max_concorrentes': self.max_concurrent_updates,
+            'em_voo': self.em_voo,
+            'usuarios_ativos': len(self._usuarios),
+            'na_fila': sum(vez.pendentes - 1 for vez in self._usuarios.values()),
+            'processados': self.processados,
+            'enfileirados': self.enfileirados,
+            'maior_fila': self.maior_fila,
+            'espera_media_ms': self.tempo_espera / self.processados * 1000 if self.processados else 0.0,
+            'espera_p95_ms': esperas[int(len(esperas) * 0.95)] * 1000 if esperas else 0.0,
+            'maior_espera_ms': self.maior_espera * 1000,
+            'processamento_medio_ms': self.tempo_processando / self.processados * 1000 if self.processados else 0.0
+        }
+
+
+class FilaUpdates(asyncio.Queue):
+    """Fila de recepção que só entrega um update quando há vaga para processá-lo.
+
+    Com ``concurrent_updates``, a Application cria uma task para cada update
+    que tira da fila, sem esperar; limitar só o tamanho da fila não segura
+    nada. Aqui ``get()`` reserva uma de ``max_em_voo`` vagas antes de
+    entregar o update, e a vaga volta no ``task_done()`` que a Application
+    chama ao fim do processamento. Os excedentes ficam na fila e, com ela
+    cheia, a recepção (polling ou webhook) espera.
+    """
+
+    def __init__(self, maxsize: int = 0, max_em_voo: int = 64):
+        super().__init__(maxsize)
+        self.max_em_voo = max_em_voo
+        self._vagas = asyncio.Semaphore(max_em_voo)
+        self._reservadas = 0
+
+    async def get(self):
+        await self._vagas.acquire()
+        try:
+            item = await super().get()
+        except BaseException:
+            self._vagas.release()
+            raise
+        self._reservadas += 1
+        return item
+
+    def task_done(self):
+        super().task_done()
+        # No encerramento a Application descarta o resto com get_nowait(), sem reserva
+        if self._reservadas:
+            self._reservadas -= 1
+            self._vagas.release()
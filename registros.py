@@ -0,0 +1,91 @@
+import sqlite3
+from typing import Any, Dict, Iterator, Optional
+
+
+class Registro:
+    """Linha do banco com campos fixos em ``__slots__`` (sem dict por linha).
+
+    Aceita tanto ``registro.titulo`` quanto ``registro['titulo']`` e
+    ``registro.get('titulo')``, então continua servindo a quem tratava as
+    linhas como dicionários. Campos que a consulta não selecionou ficam
+    como None.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **campos):
+        for campo in self.__slots__:
+            setattr(self, campo, campos.get(campo))
+
+    @classmethod
+    def aplicar(cls, cursor: sqlite3.Cursor) -> sqlite3.Cursor:
+        """Faz o cursor (já executado) produzir instâncias desta classe
+
+        O mapeamento coluna -> campo é calculado uma vez por consulta, a
+        partir de ``cursor.description``; cada linha só copia os valores.
+        """
+        colunas = {descricao[0]: indice for indice, descricao in enumerate(cursor.description)}
+        plano = tuple((campo, colunas.get(campo)) for campo in cls.__slots__)
+        novo = object.__new__
+
+        def fabrica(_cursor, linha):
+            registro = novo(cls)
+            for campo, indice in plano:
+                setattr(registro, campo, linha[indice] if indice is not None else None)
+            return registro
+
+        cursor.row_factory = fabrica
+        return cursor
+
+    def __getitem__(self, chave: str) -> Any:
+        if chave not in self.__slots__:
+            raise KeyError(chave)
+        return getattr(self, chave)
+
+    def get(self, chave: str, padrao: Optional[Any] = None) -> Any:
+        return getattr(self, chave) if chave in self.__slots__ else padrao
+
+    def __contains__(self, chave: str) -> bool:
+        return chave in self.__slots__
+
+    def keys(self):
+        return self.como_dict().keys()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __eq__(self, outro) -> bool:
+        if type(outro) is not type(self):
+            return NotImplemented
+        return all(getattr(self, campo) == getattr(outro, campo) for campo in self.__slots__)
+
+    def __repr__(self) -> str:
+        campos = ", ".join(f"{campo}={getattr(self, campo)!r}" for campo in self.__slots__)
+        return f"{type(self).__name__}({campos})"
+
+    def copiar(self) -> "Registro":
+        """Retorna uma cópia rasa"""
+        copia = object.__new__(type(self))
+        for campo in self.__slots__:
+            setattr(copia, campo, getattr(self, campo))
+        return copia
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+
+class Tarefa(Registro):
+    __slots__ = (
+        "id", "titulo", "descricao", "categoria", "autor_id", "autor_nome",
+        "atribuido_nome", "status", "prioridade", "data_criacao",
+        "data_conclusao", "imagem_file_id", "total_comentarios", "ultima_atividade",
+        "versao", "arquivada"
+    )
+
+
+class Comentario(Registro):
+    __slots__ = ("id", "tarefa_id", "autor_id", "autor_nome", "comentario", "data")
+
+
+class Changelog(Registro):
+    __slots__ = ("id", "categoria", "descricao", "autor_id", "autor_nome", "data_criacao", "pinado")
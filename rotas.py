@@ -0,0 +1,190 @@
+import logging
+import re
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Conversores dos parâmetros de uma rota; "resto" junta o que sobrou (pode conter "_")
+TIPOS = {
+    "str": str,
+    "int": int,
+    "resto": str,
+}
+
+# Partes de um padrão: parâmetros entre chaves (o nome pode ter "_") ou texto entre "_"
+_PARTES_PADRAO = re.compile(r"\{[^}]*\}|[^_]+")
+
+
+class _Rota:
+    __slots__ = ("padrao", "funcao", "parametros", "quando", "chamadas", "tempo", "maior")
+
+    def __init__(self, padrao: str, funcao: Callable, parametros: List[Tuple[str, str]],
+                 quando: Optional[Callable]):
+        self.padrao = padrao
+        self.funcao = funcao
+        self.parametros = parametros
+        self.quando = quando
+        self.chamadas = 0
+        self.tempo = 0.0
+        self.maior = 0.0
+
+    def decodificar(self, partes: List[str]) -> Optional[Dict[str, Any]]:
+        """Converte as partes após o prefixo nos argumentos da rota (None se não servirem)"""
+        argumentos = {}
+        for posicao, (nome, tipo) in enumerate(self.parametros):
+            if tipo == "resto":
+                valor = "_".join(partes[posicao:])
+                if not valor:
+                    return None
+                argumentos[nome] = valor
+                return argumentos
+            if posicao >= len(partes):
+                return None
+            try:
+                argumentos[nome] = TIPOS[tipo](partes[posicao])
+            except ValueError:
+                return None
+        if len(partes) != len(self.parametros):
+            return None
+        return argumentos
+
+
+class _No:
+    __slots__ = ("filhos", "rotas")
+
+    def __init__(self):
+        self.filhos: Dict[str, "_No"] = {}
+        self.rotas: List[_Rota] = []
+
+
+class RoteadorCallbacks:
+    """Despacha o callback_data dos botões inline para a função da sua rota.
+
+    Uma rota é um padrão como ``"status_{tarefa_id:int}_{status:resto}"``:
+    partes fixas separadas por ``_`` seguidas dos parâmetros, que chegam
+    já convertidos como argumentos nomeados. Padrões sem parâmetros ficam
+    em um dicionário; os demais em uma árvore indexada pelas partes fixas,
+    então o despacho custa uma consulta por parte do callback_data (que o
+    Telegram limita a 64 bytes), não uma comparação por rota.
+
+    Se duas rotas servem, vence a de prefixo mais longo. ``quando`` recebe
+    o context e restringe a rota a um estado da conversa.
+    """
+
+    def __init__(self):
+        self._exatas: Dict[str, List[_Rota]] = {}
+        self._raiz = _No()
+        self._rotas: List[_Rota] = []
+        self.desconhecidos = 0
+        self.fora_de_contexto = 0
+
+    def rota(self, padrao: str, quando: Optional[Callable[[Any], bool]] = None):
+        """Decorador que registra ``funcao(query, context, **parametros)`` para o padrão"""
+        def registrar(funcao: Callable[..., Coroutine]):
+            self.adicionar(padrao, funcao, quando)
+            return funcao
+        return registrar
+
+    def adicionar(self, padrao: str, funcao: Callable[..., Coroutine],
+                  quando: Optional[Callable[[Any], bool]] = None):
+        """Registra uma rota; ValueError se o padrão for inválido ou repetido"""
+        if any(rota.padrao == padrao for rota in self._rotas):
+            raise ValueError(f"Rota repetida: {padrao}")
+
+        prefixo, parametros = [], []
+        for parte in _PARTES_PADRAO.findall(padrao):
+            if parte.startswith("{") and parte.endswith("}"):
+                nome, _, tipo = parte[1:-1].partition(":")
+                tipo = tipo or "str"
+                if tipo not in TIPOS:
+                    raise ValueError(f"Tipo desconhecido {tipo!r} na rota {padrao}")
+                if parametros and parametros[-1][1] == "resto":
+                    raise ValueError(f"Parâmetro resto precisa ser o último na rota {padrao}")
+                parametros.append((nome, tipo))
+            elif parametros:
+                raise ValueError(f"Partes fixas precisam vir antes dos parâmetros na rota {padrao}")
+            else:
+                prefixo.append(parte)
+
+        rota = _Rota(padrao, funcao, parametros, quando)
+        self._rotas.append(rota)
+
+        if not parametros:
+            self._exatas.setdefault(padrao, []).append(rota)
+            return
+
+        no = self._raiz
+        for parte in prefixo:
+            no = no.filhos.setdefault(parte, _No())
+        no.rotas.append(rota)
+
+    def _candidatas(self, data: str) -> List[Tuple[_Rota, List[str]]]:
+        """Rotas que podem atender data, da de prefixo mais longo à mais curta"""
+        candidatas = [(rota, []) for rota in self._exatas.get(data, ())]
+
+        partes = data.split("_")
+        no, profundidade, encontrados = self._raiz, 0, []
+        for parte in partes:
+            no = no.filhos.get(parte)
+            if no is None:
+                break
+            profundidade += 1
+            if no.rotas:
+                encontrados.append((no, profundidade))
+
+        for no, profundidade in reversed(encontrados):
+            candidatas.extend((rota, partes[profundidade:]) for rota in no.rotas)
+        return candidatas
+
+    async def despachar(self, query, context) -> bool:
+        """Executa a rota de query.data; retorna False (e registra no log) se nenhuma servir"""
+        data = query.data or ""
+        bloqueada = False
+
+        for rota, partes in self._candidatas(data):
+            argumentos = rota.decodificar(partes)
+            if argumentos is None:
+                continue
+            if rota.quando is not None and not rota.quando(context):
+                bloqueada = True
+                continue
+
+            inicio = time.monotonic()
+            try:
+                await rota.funcao(query, context, **argumentos)
+            finally:
+                duracao = time.monotonic() - inicio
+                rota.chamadas += 1
+                rota.tempo += duracao
+                rota.maior = max(rota.maior, duracao)
+            return True
+
+        if bloqueada:
+            # Botão de uma etapa que o usuário já deixou (ex.: prioridade após cancelar)
+            self.fora_de_contexto += 1
+            logger.info(f"Callback fora de contexto ignorado: {data!r}")
+        else:
+            self.desconhecidos += 1
+            logger.warning(f"Callback sem rota: {data!r} (usuário {query.from_user.id if query.from_user else '?'})")
+        return False
+
+    def metricas(self) -> Dict:
+        """Retorna chamadas e tempos por rota (as mais custosas primeiro) e os callbacks sem rota"""
+        rotas = [
+            {
+                'rota': rota.padrao,
+                'chamadas': rota.chamadas,
+                'media_ms': rota.tempo / rota.chamadas * 1000,
+                'maior_ms': rota.maior * 1000,
+                'total_ms': rota.tempo * 1000
+            }
+            for rota in self._rotas if rota.chamadas
+        ]
+        rotas.sort(key=lambda rota: rota['total_ms'], reverse=True)
+        return {
+            'rotas': rotas,
+            'registradas': len(self._rotas),
+            'desconhecidos': self.desconhecidos,
+            'fora_de_contexto': self.fora_de_contexto
+        }
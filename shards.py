@@ -0,0 +1,258 @@
+import asyncio
+import functools
+import glob
+import logging
+import os
+import re
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set
+
+from database import AsyncDatabase, Database
+
+logger = logging.getLogger(__name__)
+
+# Chat do update em processamento (definido por um handler que roda antes dos demais)
+chat_atual: ContextVar[Optional[int]] = ContextVar("chat_atual", default=None)
+
+_ARQUIVO_SHARD = re.compile(r"^chat_(-?\d+)\.db$")
+
+
+class RoteadorShards:
+    """Um banco SQLite por chat, com os abertos limitados por LRU.
+
+    Expõe a mesma interface do AsyncDatabase: ``await db.listar_tarefas()``
+    vai para o shard do chat em ``chat_atual``. Cada chat tem suas próprias
+    categorias, configurações de tópico e trava de escrita, então as
+    escritas de um grupo não esperam as de outro.
+
+    Os shards são abertos (com ``await abrir()``) na primeira vez que o
+    chat aparece e despejados quando passam de ``max_abertos``. A abertura
+    roda fora do event loop: cria o schema, aplica migrações e confere os
+    contadores. Um shard despejado só é fechado quando nenhuma chamada ou
+    update (ver reter) o usa mais, e o mesmo chat só é reaberto depois
+    disso: nunca há dois Database no mesmo arquivo. Os métodos síncronos do
+    AsyncDatabase só leem memória e exigem o shard já aberto.
+    Sem ``diretorio``, todos os chats usam ``db_name``: é o modo de um
+    banco só, com o mesmo código.
+    """
+
+    def __init__(self, diretorio: Optional[str] = None, db_name: str = "tarefas_bot.db",
+                 max_abertos: int = 16, **opcoes):
+        self.diretorio = diretorio
+        self.db_name = db_name
+        self.max_abertos = max(1, max_abertos)
+        self.opcoes = opcoes
+
+        self._abertos: "OrderedDict[Optional[int], AsyncDatabase]" = OrderedDict()
+        # Despejados do LRU ainda em uso (o fechamento espera o último uso) e
+        # os que estão fechando
+        self._despejados: Dict[Optional[int], AsyncDatabase] = {}
+        self._fechando: Dict[Optional[int], asyncio.Task] = {}
+        self._usos: Dict[Optional[int], int] = {}
+        self._abrindo: Dict[Optional[int], asyncio.Lock] = {}
+        self._verificados: Set[Optional[int]] = set()
+        self.aberturas = 0
+        self.despejos = 0
+
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    @property
+    def particionado(self) -> bool:
+        return self.diretorio is not None
+
+    def caminho(self, chat_id: Optional[int]) -> str:
+        """Arquivo do banco de um chat"""
+        if not self.particionado:
+            return self.db_name
+        if chat_id is None:
+            raise LookupError("Nenhum chat definido para escolher o shard do banco")
+        return os.path.join(self.diretorio, f"chat_{chat_id}.db")
+
+    def chats(self) -> List[Optional[int]]:
+        """Chats com banco criado (no modo de um banco só, [None])"""
+        if not self.particionado:
+            return [None]
+        chats = []
+        for caminho in glob.glob(os.path.join(glob.escape(self.diretorio), "chat_*.db")):
+            encontrado = _ARQUIVO_SHARD.match(os.path.basename(caminho))
+            if encontrado:
+                chats.append(int(encontrado.group(1)))
+        return sorted(chats)
+
+    def _chave(self, chat_id: Optional[int]) -> Optional[int]:
+        return (chat_id if chat_id is not None else chat_atual.get()) if self.particionado else None
+
+    async def abrir(self, chat_id: Optional[int] = None) -> AsyncDatabase:
+        """Banco do chat indicado (ou do chat atual), abrindo-o em uma thread se preciso"""
+        chave = self._chave(chat_id)
+        shard = self._aberto(chave)
+        if shard is not None:
+            return shard
+
+        # Uma abertura por chat: quem chega durante ela espera e reaproveita o shard
+        trava = self._abrindo.setdefault(chave, asyncio.Lock())
+        async with trava:
+            shard = self._aberto(chave)
+            if shard is None:
+                # Reabrir antes de o despejo terminar deixaria dois Database no mesmo arquivo
+                fechando = self._fechando.get(chave)
+                if fechando is not None:
+                    await asyncio.wait({fechando})
+                loop = asyncio.get_running_loop()
+                shard = await loop.run_in_executor(None, self._abrir, chave)
+                self._registrar(chave, shard)
+        if not trava.locked():
+            self._abrindo.pop(chave, None)
+        return shard
+
+    async def reter(self, chat_id: Optional[int] = None) -> AsyncDatabase:
+        """Abre o banco do chat e o mantém aberto até o fim da task atual
+
+        Chamado no início de cada update: se o shard for despejado do LRU no
+        meio do update, ele só é fechado depois que o update terminar, e os
+        métodos síncronos continuam achando-o.
+        """
+        chave = self._chave(chat_id)
+        shard = await self.abrir(chave)
+        self._usar(chave)
+        asyncio.current_task().add_done_callback(lambda _: self._liberar(chave))
+        return shard
+
+    def shard(self, chat_id: Optional[int] = None) -> AsyncDatabase:
+        """Banco já aberto do chat indicado (ou do chat atual)
+
+        Nunca abre bancos: os handlers chegam aqui depois de selecionar_shard
+        ter aguardado reter().
+        """
+        chave = self._chave(chat_id)
+        shard = self._aberto(chave)
+        if shard is None:
+            raise LookupError(f"Banco {self.caminho(chave)} não está aberto; aguarde abrir() antes")
+        return shard
+
+    def _aberto(self, chave: Optional[int]) -> Optional[AsyncDatabase]:
+        """Shard aberto da chave; um despejado que ainda não começou a fechar volta ao LRU"""
+        shard = self._abertos.get(chave)
+        if shard is not None:
+            self._abertos.move_to_end(chave)
+            return shard
+
+        shard = self._despejados.pop(chave, None)
+        if shard is not None:
+            self._registrar(chave, shard)
+        return shard
+
+    def _registrar(self, chave: Optional[int], shard: AsyncDatabase):
+        self._abertos[chave] = shard
+        while len(self._abertos) > self.max_abertos:
+            antiga, despejado = self._abertos.popitem(last=False)
+            self.despejos += 1
+            self._despejados[antiga] = despejado
+            self._fechar_se_livre(antiga)
+
+    def _usar(self, chave: Optional[int]):
+        self._usos[chave] = self._usos.get(chave, 0) + 1
+
+    def _liberar(self, chave: Optional[int]):
+        restantes = self._usos[chave] - 1
+        if restantes:
+            self._usos[chave] = restantes
+        else:
+            del self._usos[chave]
+            self._fechar_se_livre(chave)
+
+    def _fechar_se_livre(self, chave: Optional[int]):
+        """Começa a fechar um shard despejado que ninguém está usando"""
+        if self._usos.get(chave) or chave not in self._despejados:
+            return
+        shard = self._despejados.pop(chave)
+        self._fechando[chave] = asyncio.get_running_loop().create_task(self._fechar(chave, shard))
+
+    async def _fechar(self, chave: Optional[int], shard: AsyncDatabase):
+        """Fecha um shard despejado: o que já foi enviado a ele termina antes"""
+        try:
+            await shard.fechar()
+        except Exception as e:
+            logger.error(f"Erro ao fechar o banco {shard.db.db_name}: {e}")
+        finally:
+            self._fechando.pop(chave, None)
+
+    def _abrir(self, chave: Optional[int]) -> AsyncDatabase:
+        """Cria o schema/migra o banco e confere os contadores (roda no executor)"""
+        db = Database(self.caminho(chave), **self.opcoes)
+        self.aberturas += 1
+
+        # Contadores conferidos uma vez por processo, não a cada reabertura
+        if chave not in self._verificados:
+            if not db.verificar_contadores():
+                logger.warning(f"Tabela contadores de {db.db_name} estava divergente e foi reconstruída")
+            self._verificados.add(chave)
+
+        return AsyncDatabase(db)
+
+    def __getattr__(self, nome: str) -> Any:
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        if nome in AsyncDatabase.SINCRONOS:
+            return getattr(self.shard(), nome)
+
+        # Corrotinas: abrem o shard (se preciso) sem travar o event loop, e o
+        # seguram aberto até a chamada terminar
+        @functools.wraps(getattr(Database, nome))
+        async def chamada(*args, **kwargs):
+            chave = self._chave(None)
+            shard = await self.abrir(chave)
+            self._usar(chave)
+            try:
+                return await getattr(shard, nome)(*args, **kwargs)
+            finally:
+                self._liberar(chave)
+
+        # Guarda o wrapper para não recriá-lo a cada chamada (o shard é
+        # escolhido dentro dele)
+        setattr(self, nome, chamada)
+        return chamada
+
+    async def em_todos(self, nome: str, *args, **kwargs) -> Dict[Optional[int], Any]:
+        """Chama ``nome`` em cada shard, um por vez (para jobs de manutenção)
+
+        Um shard que falha é registrado no log e fica de fora do resultado.
+        """
+        resultados = {}
+        for chat_id in self.chats():
+            chave = self._chave(chat_id)
+            try:
+                shard = await self.abrir(chave)
+                self._usar(chave)
+                try:
+                    resultados[chat_id] = await getattr(shard, nome)(*args, **kwargs)
+                finally:
+                    self._liberar(chave)
+            except Exception as e:
+                logger.error(f"Erro em {nome} no banco {self.caminho(chat_id)}: {e}")
+        return resultados
+
+    def info_shards(self) -> Dict:
+        """Retorna quantos shards existem, estão abertos, e as aberturas/despejos"""
+        return {
+            'particionado': self.particionado,
+            'arquivos': len(self.chats()),
+            'abertos': len(self._abertos),
+            'em_uso': len(self._usos),
+            'max_abertos': self.max_abertos,
+            'aberturas': self.aberturas,
+            'despejos': self.despejos
+        }
+
+    async def fechar(self):
+        """Fecha todos os shards abertos"""
+        while self._abertos:
+            _, shard = self._abertos.popitem(last=False)
+            await shard.fechar()
+        while self._despejados:
+            _, shard = self._despejados.popitem()
+            await shard.fechar()
+        if self._fechando:
+            await asyncio.gather(*self._fechando.values())
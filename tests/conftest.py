@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Os módulos do bot ficam na raiz do repositório, sem pacote instalável
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Banco novo em um diretório temporário, fechado ao fim do teste"""
+    banco = Database(str(tmp_path / "tarefas_bot.db"))
+    yield banco
+    banco.fechar()
+
+
+@pytest.fixture
+def tarefa_id(db):
+    """Uma tarefa pendente do usuário 1 na categoria 1"""
+    return db.criar_tarefa("Tarefa", "descrição", 1, autor_id=1, autor_nome="Ana")
+
+
+class MensagemFalsa:
+    """Mensagem com botões, no formato que os handlers de callback leem"""
+    photo = None
+    chat_id = -100
+    message_id = 1
+    reply_markup = None
+
+
+class CallbackFalso:
+    """CallbackQuery que registra as respostas e edições em vez de chamar o Telegram"""
+
+    def __init__(self, data, user_id=1, mensagem=None):
+        self.data = data
+        self.from_user = type("Usuario", (), {"id": user_id, "first_name": "Ana"})()
+        self.message = mensagem or MensagemFalsa()
+        self.respostas = []
+        self.edicoes = []
+
+    async def answer(self, texto=None, show_alert=False):
+        self.respostas.append((texto, show_alert))
+
+    async def edit_message_text(self, texto, parse_mode=None, reply_markup=None):
+        self.edicoes.append(texto)
+        self.message.reply_markup = reply_markup
+        return self.message
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    """Módulo bot com o banco em um diretório temporário"""
+    import bot
+    from shards import RoteadorShards
+
+    roteador = RoteadorShards(db_name=str(tmp_path / "tarefas_bot.db"))
+    monkeypatch.setattr(bot, "db", roteador)
+    yield bot
+    asyncio.run(roteador.fechar())
+
+
+@pytest.fixture
+def clicar(bot):
+    """Passa um callback por callback_handler e retorna o CallbackFalso"""
+    async def clicar(data, user_id=1, mensagem=None):
+        await bot.db.abrir()
+        query = CallbackFalso(data, user_id, mensagem)
+        update = type("UpdateFalso", (), {"callback_query": query, "effective_user": query.from_user})()
+        contexto = type("ContextoFalso", (), {"user_data": {}})()
+        await bot.callback_handler(update, contexto)
+        return query
+
+    return lambda *args, **kwargs: asyncio.run(clicar(*args, **kwargs))
@@ -0,0 +1,40 @@
+"""Tarefas arquivadas saem das listas mas continuam visíveis, somente leitura"""
+import json
+
+
+def test_arquivada_continua_visivel_e_sai_na_exportacao(db, tarefa_id, tmp_path):
+    db.adicionar_comentario(tarefa_id, 1, "Ana", "feito")
+    db.atualizar_status(tarefa_id, "concluido")
+    assert db.arquivar(-1) == 1
+
+    tarefa = db.obter_tarefa(tarefa_id)
+    assert tarefa.arquivada
+    assert [c.comentario for c in db.listar_comentarios(tarefa_id)] == ["feito"]
+    # Tarefas arquivadas são somente leitura
+    assert db.atualizar_status(tarefa_id, "pendente") is None
+
+    caminho = tmp_path / "tarefas.jsonl"
+    assert db.exportar_arquivo("tarefas", str(caminho), "jsonl") == 1
+    linha = json.loads(caminho.read_text(encoding="utf-8"))
+    assert linha["id"] == tarefa_id
+    assert linha["arquivada"] == 1
+    assert db.exportar_arquivo("comentarios", str(tmp_path / "comentarios.csv"), "csv") == 1
+
+
+def test_arquivar_so_concluidas_antigas(db, tarefa_id):
+    concluida = db.criar_tarefa("Feita", "", 1, autor_id=1, autor_nome="Ana")
+    db.atualizar_status(concluida, "concluido")
+
+    # Concluída agora: ainda dentro do prazo de 30 dias
+    assert db.arquivar(30) == 0
+    assert db.arquivar(-1) == 1
+    assert not db.obter_tarefa(tarefa_id).arquivada
+    assert db.contar_tarefas()["total"] == 1
+
+
+def test_busca_inclui_arquivadas(db, tarefa_id):
+    db.atualizar_status(tarefa_id, "concluido")
+    db.arquivar(-1)
+
+    [tarefa] = db.buscar_tarefas("tarefa")
+    assert tarefa.id == tarefa_id and tarefa.arquivada
@@ -0,0 +1,58 @@
+"""Backup online e restauração: o banco restaurado volta com os mesmos dados"""
+import gzip
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+import backup
+from database import Database
+
+
+def test_backup_e_restauracao(db, tarefa_id, tmp_path):
+    db.adicionar_comentario(tarefa_id, 2, "Bia", "antes do backup")
+    resultado = db.fazer_backup(str(tmp_path / "backups"), manter=7)
+    assert resultado.caminho.endswith(".db.gz")
+    assert backup.listar_backups(str(tmp_path / "backups"), "tarefas_bot") == [resultado.caminho]
+
+    # Mudanças depois do backup se perdem na restauração
+    db.criar_tarefa("Depois", "", 1, autor_id=1, autor_nome="Ana")
+    db.fechar()
+
+    anterior = backup.restaurar(resultado.caminho, db.db_name)
+    with closing(sqlite3.connect(anterior)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM tarefas").fetchone()[0] == 2
+
+    restaurado = Database(db.db_name)
+    try:
+        assert restaurado.contar_tarefas()["total"] == 1
+        assert restaurado.obter_tarefa(tarefa_id).titulo == "Tarefa"
+        assert [c.comentario for c in restaurado.listar_comentarios(tarefa_id)] == ["antes do backup"]
+    finally:
+        restaurado.fechar()
+
+
+def test_manter_remove_os_mais_antigos(tmp_path):
+    origem = sqlite3.connect(":memory:")
+    origem.execute("CREATE TABLE tarefas (id INTEGER PRIMARY KEY)")
+    diretorio = tmp_path / "backups"
+    diretorio.mkdir()
+    for antigo in ("tarefas_bot-20200101-000000.db.gz", "tarefas_bot-20200102-000000.db.gz"):
+        (diretorio / antigo).write_bytes(b"")
+
+    resultado = backup.fazer_backup(origem, str(diretorio), "tarefas_bot", manter=2)
+    assert resultado.removidos == 1
+    assert [p.rsplit("/", 1)[-1] for p in backup.listar_backups(str(diretorio), "tarefas_bot")] == [
+        "tarefas_bot-20200102-000000.db.gz", resultado.caminho.rsplit("/", 1)[-1],
+    ]
+
+
+def test_restauracao_recusa_backup_corrompido(db, tarefa_id, tmp_path):
+    corrompido = tmp_path / "corrompido.db.gz"
+    with gzip.open(corrompido, "wb") as saida:
+        saida.write(b"isto nao e um banco sqlite" * 100)
+
+    with pytest.raises(sqlite3.DatabaseError):
+        backup.restaurar(str(corrompido), db.db_name)
+    # O banco atual segue intacto
+    assert db.obter_tarefa(tarefa_id) is not None
@@ -0,0 +1,34 @@
+"""A busca textual ignora acentos e ordena pela relevância"""
+import pytest
+
+
+@pytest.fixture
+def fts(db):
+    if not db.fts:
+        pytest.skip("SQLite sem FTS5")
+    return db
+
+
+def test_busca_ignora_acentos(fts):
+    tarefa_id = fts.criar_tarefa("Revisar ação de cobrança", "", 1, autor_id=1, autor_nome="Ana")
+
+    for termo in ("acao", "AÇÃO", "cobranca"):
+        assert [t["id"] for t in fts.buscar_tarefas(termo)] == [tarefa_id]
+
+
+def test_busca_por_prefixo_de_todas_as_palavras(fts):
+    ambas = fts.criar_tarefa("Configurar painel", "", 1, autor_id=1, autor_nome="Ana")
+    fts.criar_tarefa("Configurar servidor", "", 1, autor_id=1, autor_nome="Ana")
+
+    assert [t["id"] for t in fts.buscar_tarefas("config pain")] == [ambas]
+
+
+def test_titulo_pesa_mais_que_descricao_e_comentario(fts):
+    no_comentario = fts.criar_tarefa("Outra coisa", "", 1, autor_id=1, autor_nome="Ana")
+    fts.adicionar_comentario(no_comentario, 2, "Bia", "ver o relatório")
+    na_descricao = fts.criar_tarefa("Tarefa", "enviar relatório", 1, autor_id=1, autor_nome="Ana")
+    no_titulo = fts.criar_tarefa("Relatório mensal", "", 1, autor_id=1, autor_nome="Ana")
+
+    ids = [t["id"] for t in fts.buscar_tarefas("relatorio")]
+    assert ids == [no_titulo, na_descricao, no_comentario]
+
@@ -0,0 +1,47 @@
+"""Cache de tarefas: acerto na releitura e invalidação a cada escrita"""
+from cache import CacheLRU
+
+
+def test_obter_tarefa_usa_cache_e_devolve_copia(db, tarefa_id):
+    primeira = db.obter_tarefa(tarefa_id)
+    primeira.titulo = "alterado por quem chamou"
+
+    erros = db.cache_tarefas.erros
+    assert db.obter_tarefa(tarefa_id)["titulo"] == "Tarefa"
+    assert db.cache_tarefas.erros == erros
+
+
+def test_escritas_invalidam_a_tarefa(db, tarefa_id):
+    db.obter_tarefa(tarefa_id)
+    db.atualizar_tarefa(tarefa_id, titulo="Novo título")
+    assert db.obter_tarefa(tarefa_id)["titulo"] == "Novo título"
+
+    db.atualizar_status(tarefa_id, "em_andamento")
+    assert db.obter_tarefa(tarefa_id)["status"] == "em_andamento"
+
+    db.adicionar_comentario(tarefa_id, 2, "Bia", "ok")
+    assert db.obter_tarefa(tarefa_id)["total_comentarios"] == 1
+
+    db.deletar_tarefa(tarefa_id)
+    assert db.obter_tarefa(tarefa_id) is None
+
+
+def test_guardar_descarta_leitura_anterior_a_invalidacao():
+    cache = CacheLRU()
+    geracao = cache.geracao()
+    cache.invalidar(1)  # escrita concorrente entre a leitura e o guardar
+    cache.guardar(1, "antigo", geracao)
+    assert cache.obter(1) is None
+
+    cache.guardar(1, "atual", cache.geracao())
+    assert cache.obter(1) == "atual"
+
+
+def test_capacidade_despeja_o_menos_usado():
+    cache = CacheLRU(capacidade=2, ttl=None)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    cache.obter("a")
+    cache.guardar("c", 3)
+    assert cache.obter("b") is None
+    assert cache.obter("a") == 1 and cache.obter("c") == 3
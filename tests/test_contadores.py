@@ -0,0 +1,40 @@
+"""Os contadores mantidos pelos gatilhos acompanham cada mudança em tarefas"""
+
+
+def test_gatilhos_acompanham_criar_mudar_e_deletar(db):
+    a = db.criar_tarefa("A", "", 1, autor_id=1, autor_nome="Ana", prioridade="alta")
+    b = db.criar_tarefa("B", "", 2, autor_id=1, autor_nome="Ana")
+    assert db.contar_tarefas() == {
+        "total": 2, "por_status": {"pendente": 2, "em_andamento": 0, "concluido": 0},
+    }
+
+    db.atualizar_status(a, "concluido")
+    db.atualizar_tarefa(b, prioridade="baixa")
+    assert db.contar_tarefas(categoria_id=1)["por_status"] == {
+        "pendente": 0, "em_andamento": 0, "concluido": 1,
+    }
+
+    estatisticas = db.estatisticas()
+    assert estatisticas["por_prioridade"] == {"alta": 1, "media": 0, "baixa": 1}
+
+    db.deletar_tarefa(a)
+    assert db.contar_tarefas()["total"] == 1
+    assert db.contar_tarefas(categoria_id=1)["total"] == 0
+    assert db.verificar_contadores()
+
+
+def test_verificar_contadores_repara_divergencia(db, tarefa_id):
+    with db.transacao() as conn:
+        conn.execute("UPDATE contadores SET total = total + 5")
+
+    assert not db.verificar_contadores()
+    assert db.contar_tarefas()["total"] == 1
+    assert db.verificar_contadores()
+
+
+def test_verificar_sem_reparar_nao_altera(db, tarefa_id):
+    with db.transacao() as conn:
+        conn.execute("DELETE FROM contadores")
+
+    assert not db.verificar_contadores(reparar=False)
+    assert db.contar_tarefas()["total"] == 0
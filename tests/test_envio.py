@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from telegram.error import RetryAfter
+
+from envio import PRIORIDADE_FUNDO, LimitadorEnvio
+
+
+def executar(teste):
+    """Roda ``teste(limitador)`` com o despachante ativo"""
+    async def principal():
+        limitador = LimitadorEnvio(global_por_segundo=50)
+        await limitador.initialize()
+        try:
+            return await teste(limitador)
+        finally:
+            await limitador.shutdown()
+    return asyncio.run(principal())
+
+
+def enviar(limitador, ordem, nome, chat_id, endpoint="sendMessage", prioridade=None):
+    async def callback():
+        ordem.append(nome)
+        return nome
+    return limitador.process_request(callback, (), {}, endpoint, {"chat_id": chat_id}, prioridade)
+
+
+def test_interativas_passam_na_frente():
+    async def teste(limitador):
+        ordem = []
+        limitador._global.fichas = 0
+        envios = [
+            enviar(limitador, ordem, "fundo", -1, prioridade=PRIORIDADE_FUNDO),
+            enviar(limitador, ordem, "normal", -2),
+            enviar(limitador, ordem, "edicao", -3, endpoint="editMessageText"),
+        ]
+        await asyncio.gather(*envios)
+        return ordem
+
+    assert executar(teste) == ["edicao", "normal", "fundo"]
+
+
+def test_chat_privado_limitado_a_um_por_segundo():
+    async def teste(limitador):
+        ordem = []
+        loop = asyncio.get_running_loop()
+        inicio = loop.time()
+        await asyncio.gather(enviar(limitador, ordem, "a", 5), enviar(limitador, ordem, "b", 5))
+        return loop.time() - inicio
+
+    assert executar(teste) >= 0.9
+
+
+def test_cancelada_nao_gasta_fichas():
+    async def teste(limitador):
+        ordem = []
+        limitador._global.fichas = 0
+        canceladas = [asyncio.ensure_future(enviar(limitador, ordem, f"c{i}", -i)) for i in range(1, 5)]
+        viva = asyncio.ensure_future(enviar(limitador, ordem, "viva", -10))
+        await asyncio.sleep(0)
+        for tarefa in canceladas:
+            tarefa.cancel()
+
+        loop = asyncio.get_running_loop()
+        inicio = loop.time()
+        await viva
+        return ordem, loop.time() - inicio, limitador.metricas()["na_fila"]
+
+    ordem, espera, na_fila = executar(teste)
+    assert ordem == ["viva"]
+    # A primeira ficha (1/50 s) vai para a chamada viva, não para as canceladas
+    assert espera < 0.05
+    assert na_fila == 0
+
+
+def test_retry_after_pausa_e_repete():
+    async def teste(limitador):
+        tentativas = []
+
+        async def callback():
+            tentativas.append(asyncio.get_running_loop().time())
+            if len(tentativas) == 1:
+                raise RetryAfter(0.2)
+            return "ok"
+
+        resultado = await limitador.process_request(callback, (), {}, "sendMessage", {"chat_id": -1}, None)
+        return resultado, tentativas, limitador.metricas()
+
+    resultado, tentativas, metricas = executar(teste)
+    assert resultado == "ok"
+    assert tentativas[1] - tentativas[0] >= 0.2
+    assert metricas["reenvios"] == 1
+    assert metricas["enviados"] == 1
+
+
+def test_retry_after_desiste_apos_max_tentativas():
+    async def teste(limitador):
+        limitador.max_tentativas = 2
+
+        async def callback():
+            raise RetryAfter(0)
+
+        await limitador.process_request(callback, (), {}, "sendMessage", {"chat_id": -1}, None)
+
+    with pytest.raises(RetryAfter):
+        executar(teste)
@@ -0,0 +1,64 @@
+"""Escritas condicionadas: compare-and-set de status e checagem de autoria"""
+import asyncio
+
+
+def test_atualizar_status_cas(db, tarefa_id):
+    tarefa = db.atualizar_status(tarefa_id, "em_andamento", status_atual="pendente")
+    assert tarefa.status == "em_andamento"
+    assert tarefa.versao == 1
+
+    # Outro usuário ainda via "pendente": nada muda
+    assert db.atualizar_status(tarefa_id, "concluido", status_atual="pendente") is None
+    assert db.obter_tarefa(tarefa_id).status == "em_andamento"
+
+
+def test_atualizar_status_sem_cas(db, tarefa_id):
+    assert db.atualizar_status(tarefa_id, "concluido").data_conclusao is not None
+    assert db.atualizar_status(9999, "concluido") is None
+
+
+def test_atualizar_tarefa_so_pelo_autor(db, tarefa_id):
+    assert db.atualizar_tarefa(tarefa_id, prioridade="alta", autor_id=2) is None
+    assert db.obter_tarefa(tarefa_id).prioridade == "media"
+
+    tarefa = db.atualizar_tarefa(tarefa_id, titulo="Novo", autor_id=1)
+    assert tarefa.titulo == "Novo"
+    assert db.obter_tarefa(tarefa_id).versao == 1
+
+
+def test_deletar_tarefa_so_pelo_autor(db, tarefa_id):
+    assert db.deletar_tarefa(tarefa_id, autor_id=2) is None
+    assert db.deletar_tarefa(tarefa_id, autor_id=1).id == tarefa_id
+    assert db.obter_tarefa(tarefa_id) is None
+
+
+def criar(bot):
+    async def criar():
+        await bot.db.abrir()
+        return await bot.db.criar_tarefa("Tarefa", "", 1, autor_id=1, autor_nome="Ana")
+    return asyncio.run(criar())
+
+
+def test_botao_de_status_responde_uma_vez(bot, clicar):
+    tarefa_id = criar(bot)
+
+    query = clicar(f"st_{tarefa_id}_p_a")
+    assert query.respostas == [("🔄 Status atualizado para: Em Andamento", False)]
+
+    # Botão de uma mensagem que ainda mostrava "pendente": alerta e recarrega
+    query = clicar(f"st_{tarefa_id}_p_c")
+    assert query.respostas == [(bot.TAREFA_MUDOU, True)]
+    assert query.edicoes
+
+
+def test_alertas_das_rotas_nao_respondem_de_novo(bot, clicar):
+    tarefa_id = criar(bot)
+
+    assert clicar(f"st_{tarefa_id}_p_x").respostas == [("❌ Status inválido", True)]
+    assert clicar(f"set_prior_{tarefa_id}_alta", user_id=2).respostas == [(bot.TAREFA_MUDOU, True)]
+    assert len(clicar(f"status_{tarefa_id}_concluido").respostas) == 1
+
+
+def test_rota_sem_aviso_recebe_resposta_vazia(bot, clicar):
+    tarefa_id = criar(bot)
+    assert clicar(f"ver_{tarefa_id}").respostas == [(None, False)]
@@ -0,0 +1,70 @@
+"""Commit em grupo: operações de um mesmo lote falham isoladamente"""
+import pytest
+
+from fila_escrita import FilaEscrita
+
+
+@pytest.fixture
+def fila(db):
+    # Janela larga: tudo o que for submetido em seguida cai no mesmo lote
+    fila = FilaEscrita(db.conexao_escrita, janela=0.5)
+    yield fila
+    fila.fechar()
+
+
+def inserir(conn, nome):
+    return conn.execute("INSERT INTO categorias (nome) VALUES (?)", (nome,)).lastrowid
+
+
+def inserir_e_falhar(conn, nome):
+    inserir(conn, nome)
+    raise ValueError(nome)
+
+
+def nomes(db):
+    with db.conexao() as conn:
+        return {nome for (nome,) in conn.execute("SELECT nome FROM categorias")}
+
+
+def test_falha_desfaz_so_a_propria_operacao(db, fila):
+    antes = fila.submeter(inserir, "antes")
+    falha = fila.submeter(inserir_e_falhar, "falha")
+    depois = fila.submeter(inserir, "depois")
+
+    assert isinstance(antes.result(), int) and isinstance(depois.result(), int)
+    with pytest.raises(ValueError):
+        falha.result()
+
+    assert fila.lotes == 1 and fila.maior_lote == 3
+    assert {"antes", "depois"} <= nomes(db)
+    assert "falha" not in nomes(db)
+
+
+def test_callback_roda_so_apos_commit_da_operacao(db, fila):
+    chamados = []
+
+    def com_callback(conn, nome):
+        fila.apos_commit(lambda: chamados.append(nome))
+        return inserir(conn, nome)
+
+    def falha_com_callback(conn, nome):
+        fila.apos_commit(lambda: chamados.append(nome))
+        raise ValueError(nome)
+
+    ok = fila.submeter(com_callback, "ok")
+    erro = fila.submeter(falha_com_callback, "erro")
+    ok.result()
+    with pytest.raises(ValueError):
+        erro.result()
+
+    assert chamados == ["ok"]
+
+
+def test_operacao_cancelada_nao_e_executada(db, fila):
+    primeira = fila.submeter(inserir, "primeira")
+    cancelada = fila.submeter(inserir, "cancelada")
+    assert cancelada.cancel()
+
+    primeira.result()
+    fila.fechar()
+    assert "cancelada" not in nomes(db)
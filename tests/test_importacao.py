@@ -0,0 +1,33 @@
+"""Importação em lote: registros inválidos são recusados sem derrubar o arquivo"""
+import json
+
+
+def escrever_jsonl(caminho, registros):
+    caminho.write_text("\n".join(json.dumps(registro) for registro in registros), encoding="utf-8")
+
+
+def test_importacao_valida_e_preserva_atribuido(db, tmp_path):
+    caminho = tmp_path / "importar.jsonl"
+    escrever_jsonl(caminho, [
+        {"titulo": "a", "categoria_id": 1, "atribuido_id": 42, "atribuido_nome": "Zé"},
+        {"titulo": "b", "categoria_id": 99},
+        {"titulo": "c", "categoria": "XFCE", "atribuido_id": "x"},
+    ])
+
+    resultado = db.importar_arquivo(str(caminho), "jsonl", 1, "Ana")
+    assert resultado["importadas"] == 1
+    assert resultado["total_erros"] == 2
+
+    exportado = tmp_path / "exportado.jsonl"
+    db.exportar_arquivo("tarefas", str(exportado), "jsonl")
+    linha = json.loads(exportado.read_text(encoding="utf-8"))
+    assert (linha["atribuido_id"], linha["atribuido_nome"]) == (42, "Zé")
+
+
+def test_exportacao_em_csv_volta_pela_importacao(db, tarefa_id, tmp_path):
+    exportado = tmp_path / "tarefas.csv"
+    assert db.exportar_arquivo("tarefas", str(exportado), "csv") == 1
+
+    resultado = db.importar_arquivo(str(exportado), "csv", 2, "Bia")
+    assert (resultado["importadas"], resultado["total_erros"]) == (1, 0)
+    assert db.contar_tarefas()["total"] == 2
@@ -0,0 +1,85 @@
+"""As consultas das listas paginadas precisam usar os índices criados para elas"""
+from contextlib import contextmanager
+
+import pytest
+
+
+@pytest.fixture
+def consultas(db):
+    """Captura o SQL (com os parâmetros já expandidos) executado nas conexões de leitura"""
+    executadas = []
+    original = db.conexao
+
+    @contextmanager
+    def rastreada():
+        with original() as conn:
+            conn.set_trace_callback(executadas.append)
+            try:
+                yield conn
+            finally:
+                conn.set_trace_callback(None)
+
+    db.conexao = rastreada
+    yield executadas
+    db.conexao = original
+
+
+def planos(db, consultas):
+    with db.conexao() as conn:
+        return [
+            (sql, [linha[3] for linha in conn.execute("EXPLAIN QUERY PLAN " + sql)])
+            for sql in consultas if sql.lstrip().upper().startswith("SELECT")
+        ]
+
+
+def assert_usa_indice(db, consultas, tabela):
+    capturados = planos(db, consultas)
+    assert capturados
+    for sql, plano in capturados:
+        passos = [passo for passo in plano if f" {tabela} " in f" {passo} " or passo.endswith(f" {tabela}")]
+        assert passos, (sql, plano)
+        for passo in passos:
+            assert "USING INDEX" in passo or "USING COVERING INDEX" in passo, (sql, plano)
+        assert not any("TEMP B-TREE" in passo for passo in plano), (sql, plano)
+
+
+@pytest.mark.parametrize("filtros", [
+    {"categoria_id": 1},
+    {"categoria_id": 1, "status": "pendente"},
+    {"status": "pendente", "apos_id": 2},
+    {"status": "pendente", "antes_id": 1},
+    {"autor_id": 1},
+])
+def test_listar_tarefas_pagina_usa_indice(db, consultas, filtros):
+    for _ in range(3):
+        db.criar_tarefa("Tarefa", "", 1, autor_id=1, autor_nome="Ana")
+    consultas.clear()
+    db.listar_tarefas_pagina(tamanho=2, **filtros)
+    assert_usa_indice(db, consultas, "t")
+
+
+def test_listar_tarefas_pagina_sem_filtro_nao_ordena_em_memoria(db, consultas):
+    db.listar_tarefas_pagina(tamanho=2)
+    for sql, plano in planos(db, consultas):
+        assert not any("TEMP B-TREE" in passo for passo in plano), (sql, plano)
+
+
+def test_listar_comentarios_usa_indice(db, consultas, tarefa_id):
+    db.adicionar_comentario(tarefa_id, 1, "Ana", "primeiro")
+    consultas.clear()
+    db.listar_comentarios(tarefa_id)
+    assert_usa_indice(db, consultas, "comentarios")
+    assert_usa_indice(db, consultas, "comentarios_arquivo")
+
+
+@pytest.mark.parametrize("filtros", [
+    {},
+    {"categoria": "XFCE"},
+    {"categoria": "XFCE", "pinado": True},
+    {"pinado": True},
+])
+def test_listar_changelogs_usa_indice(db, consultas, filtros):
+    db.criar_changelog("XFCE", "novidade", 1, "Ana")
+    consultas.clear()
+    db.listar_changelogs(**filtros)
+    assert_usa_indice(db, consultas, "changelogs")
@@ -0,0 +1,120 @@
+"""Bancos criados por versões antigas do bot chegam ao schema atual sem perder dados"""
+import sqlite3
+from datetime import datetime
+
+from database import MIGRACOES, Database
+
+# Schema da primeira versão do bot (anterior a schema_version), datas em texto
+SCHEMA_ORIGINAL = """
+    CREATE TABLE categorias (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT NOT NULL UNIQUE);
+    CREATE TABLE tarefas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        titulo TEXT NOT NULL,
+        descricao TEXT,
+        categoria_id INTEGER,
+        autor_id INTEGER NOT NULL,
+        autor_nome TEXT NOT NULL,
+        atribuido_id INTEGER,
+        atribuido_nome TEXT,
+        status TEXT DEFAULT 'pendente',
+        prioridade TEXT DEFAULT 'media',
+        imagem_file_id TEXT,
+        data_criacao TEXT NOT NULL,
+        data_conclusao TEXT,
+        FOREIGN KEY (categoria_id) REFERENCES categorias(id)
+    );
+    CREATE TABLE comentarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tarefa_id INTEGER NOT NULL,
+        autor_id INTEGER NOT NULL,
+        autor_nome TEXT NOT NULL,
+        comentario TEXT NOT NULL,
+        data TEXT NOT NULL,
+        FOREIGN KEY (tarefa_id) REFERENCES tarefas(id) ON DELETE CASCADE
+    );
+    CREATE TABLE changelogs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        categoria TEXT NOT NULL,
+        descricao TEXT NOT NULL,
+        autor_id INTEGER NOT NULL,
+        autor_nome TEXT NOT NULL,
+        data_criacao TEXT NOT NULL,
+        pinado INTEGER DEFAULT 0
+    );
+    CREATE TABLE categorias_changelog (id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT NOT NULL UNIQUE);
+    CREATE TABLE configuracoes (chave TEXT PRIMARY KEY, valor TEXT NOT NULL);
+
+    INSERT INTO categorias (nome) VALUES ('XFCE'), ('Cinnamon'), ('GNOME'), ('Geral');
+    INSERT INTO tarefas (titulo, descricao, categoria_id, autor_id, autor_nome, status, data_criacao, data_conclusao)
+    VALUES ('Antiga', 'd', 1, 7, 'Ana', 'concluido', '2024-01-02 10:00:00', '2024-01-03 12:30:00'),
+           ('Apagada', 'd', 1, 7, 'Ana', 'pendente', '2024-01-02 11:00:00', NULL),
+           ('Aberta', 'd', 2, 8, 'Bia', 'pendente', '2024-01-04 09:00:00', NULL);
+    DELETE FROM tarefas WHERE titulo = 'Apagada';
+    INSERT INTO comentarios (tarefa_id, autor_id, autor_nome, comentario, data)
+    VALUES (1, 8, 'Bia', 'feito', '2024-01-05 08:00:00');
+    INSERT INTO changelogs (categoria, descricao, autor_id, autor_nome, data_criacao, pinado)
+    VALUES ('XFCE', 'novidade', 7, 'Ana', '2024-01-06 18:00:00', 1);
+    INSERT INTO configuracoes (chave, valor) VALUES ('topico_permitido', '42');
+"""
+
+
+def epoch(texto):
+    return int(datetime.strptime(texto, "%Y-%m-%d %H:%M:%S").timestamp())
+
+
+def criar_banco_original(caminho):
+    conn = sqlite3.connect(caminho)
+    conn.executescript(SCHEMA_ORIGINAL)
+    conn.close()
+
+
+def test_migra_banco_original_ate_a_versao_atual(tmp_path):
+    caminho = str(tmp_path / "antigo.db")
+    criar_banco_original(caminho)
+
+    db = Database(caminho)
+    try:
+        assert db.versao_schema() == MIGRACOES[-1][0]
+
+        antiga = db.obter_tarefa(1)
+        assert antiga.titulo == "Antiga"
+        assert antiga.data_criacao == epoch("2024-01-02 10:00:00")
+        assert antiga.data_conclusao == epoch("2024-01-03 12:30:00")
+        assert antiga.total_comentarios == 1
+        assert antiga.ultima_atividade == epoch("2024-01-05 08:00:00")
+        assert antiga.versao == 0
+
+        comentario, = db.listar_comentarios(1)
+        assert comentario.data == epoch("2024-01-05 08:00:00")
+
+        changelog, = db.listar_changelogs()
+        assert changelog.data_criacao == epoch("2024-01-06 18:00:00")
+        assert db.obter_config("topico_permitido") == "42"
+        assert db.verificar_contadores()
+
+        # AUTOINCREMENT preservado: o id da tarefa apagada não volta a ser usado
+        assert db.criar_tarefa("Nova", "", 1, autor_id=7, autor_nome="Ana") == 4
+    finally:
+        db.fechar()
+
+
+def test_migracoes_nao_reaplicam(tmp_path):
+    caminho = str(tmp_path / "antigo.db")
+    criar_banco_original(caminho)
+    Database(caminho).fechar()
+
+    db = Database(caminho)
+    try:
+        with db.conexao() as conn:
+            versoes = [linha[0] for linha in conn.execute("SELECT versao FROM schema_version ORDER BY versao")]
+        assert versoes == [numero for numero, _, _ in MIGRACOES]
+        assert db.obter_tarefa(1).data_criacao == epoch("2024-01-02 10:00:00")
+    finally:
+        db.fechar()
+
+
+def test_banco_novo_nasce_na_versao_atual(db):
+    assert db.versao_schema() == MIGRACOES[-1][0]
+    with db.conexao() as conn:
+        colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(tarefas)")}
+    assert {"total_comentarios", "ultima_atividade", "versao"} <= colunas
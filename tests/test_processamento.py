@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from telegram import Chat, Message, Update, User
+
+from processamento import FilaUpdates, ProcessadorPorUsuario
+
+
+def update(update_id, usuario_id):
+    """Mensagem privada do usuário ``usuario_id``"""
+    usuario = User(usuario_id, "Teste", False)
+    mensagem = Message(update_id, datetime.now(timezone.utc), Chat(usuario_id, Chat.PRIVATE), from_user=usuario)
+    return Update(update_id, message=mensagem)
+
+
+def test_mesmo_usuario_em_ordem_usuarios_diferentes_em_paralelo():
+    async def principal():
+        processador = ProcessadorPorUsuario(4)
+        eventos = []
+
+        async def tratar(nome, duracao):
+            eventos.append(("inicio", nome))
+            await asyncio.sleep(duracao)
+            eventos.append(("fim", nome))
+
+        await asyncio.gather(
+            processador.process_update(update(1, 10), tratar("a1", 0.05)),
+            processador.process_update(update(2, 10), tratar("a2", 0)),
+            processador.process_update(update(3, 20), tratar("b1", 0)),
+        )
+        return eventos, processador.metricas()
+
+    eventos, metricas = asyncio.run(principal())
+    assert eventos.index(("fim", "a1")) < eventos.index(("inicio", "a2"))
+    assert eventos.index(("fim", "b1")) < eventos.index(("fim", "a1"))
+    assert metricas["processados"] == 3
+    assert metricas["enfileirados"] == 1
+
+
+def test_espera_por_vaga_entra_na_metrica():
+    async def principal():
+        processador = ProcessadorPorUsuario(1)
+        await asyncio.gather(
+            processador.process_update(update(1, 10), asyncio.sleep(0.1)),
+            processador.process_update(update(2, 20), asyncio.sleep(0)),
+        )
+        return processador.metricas()
+
+    assert asyncio.run(principal())["maior_espera_ms"] >= 90
+
+
+@pytest.mark.parametrize("usuario", [
+    lambda i: 100 + i,      # usuários diferentes
+    lambda i: 100,          # o mesmo usuário: os seguintes esperam a vez ainda em voo
+], ids=["usuarios_diferentes", "mesmo_usuario"])
+def test_fila_so_entrega_com_vaga_em_voo(usuario):
+    async def principal():
+        processador = ProcessadorPorUsuario(2)
+        fila = FilaUpdates(maxsize=2, max_em_voo=3)
+        entregues = []
+        liberar = asyncio.Event()
+
+        async def consumidor():
+            # Como a Application: uma task por update, sem esperar o processamento
+            while True:
+                item = await fila.get()
+                entregues.append(item)
+                asyncio.ensure_future(processar(item))
+
+        async def processar(item):
+            try:
+                await processador.process_update(item, liberar.wait())
+            finally:
+                fila.task_done()
+
+        consumo = asyncio.ensure_future(consumidor())
+        recebidos = 0
+        for i in range(10):
+            try:
+                await asyncio.wait_for(fila.put(update(i, usuario(i))), 0.05)
+            except asyncio.TimeoutError:
+                break
+            recebidos += 1
+
+        situacao = (len(entregues), recebidos, processador.metricas()["em_voo"])
+        liberar.set()
+        await fila.join()
+        consumo.cancel()
+        return situacao, processador.metricas()
+
+    (entregues, recebidos, em_voo), metricas = asyncio.run(principal())
+    # 3 em voo + 2 aguardando na fila; o sexto put espera
+    assert (entregues, recebidos, em_voo) == (3, 5, 3)
+    assert metricas["em_voo"] == 0
+    assert metricas["processados"] == 5
+    assert metricas["na_fila"] == 0
@@ -0,0 +1,36 @@
+"""Renderização por versão: a mesma versão não é editada de novo na mesma mensagem"""
+import asyncio
+
+from conftest import MensagemFalsa
+
+
+def criar(bot):
+    async def criar():
+        await bot.db.abrir()
+        return await bot.db.criar_tarefa("Tarefa", "descrição", 1, autor_id=1, autor_nome="Ana")
+    return asyncio.run(criar())
+
+
+def test_mesma_versao_nao_e_reeditada(bot, clicar):
+    tarefa_id = criar(bot)
+    mensagem = MensagemFalsa()
+
+    assert len(clicar(f"ver_{tarefa_id}", mensagem=mensagem).edicoes) == 1
+    evitadas = bot.edicoes_evitadas
+    assert clicar(f"ver_{tarefa_id}", mensagem=mensagem).edicoes == []
+    assert bot.edicoes_evitadas == evitadas + 1
+
+    # Nova versão: a mensagem é editada de novo
+    assert len(clicar(f"set_prior_{tarefa_id}_alta", mensagem=mensagem).edicoes) == 1
+
+
+def test_texto_compartilhado_entre_autor_e_leitor(bot):
+    tarefa_id = criar(bot)
+
+    async def renderizar():
+        tarefa = await bot.db.obter_tarefa(tarefa_id)
+        return bot.renderizar_tarefa(tarefa, 1), bot.renderizar_tarefa(tarefa, 2)
+
+    (texto_autor, botoes_autor), (texto_leitor, botoes_leitor) = asyncio.run(renderizar())
+    assert texto_autor is texto_leitor
+    assert botoes_autor != botoes_leitor
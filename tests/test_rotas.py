@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from rotas import RoteadorCallbacks
+
+
+class Usuario:
+    id = 1
+
+
+class Query:
+    def __init__(self, data):
+        self.data = data
+        self.from_user = Usuario()
+
+
+class Contexto:
+    def __init__(self, **user_data):
+        self.user_data = user_data
+
+
+def despachar(roteador, data, context=None):
+    return asyncio.run(roteador.despachar(Query(data), context or Contexto()))
+
+
+@pytest.fixture
+def chamadas():
+    return []
+
+
+@pytest.fixture
+def roteador(chamadas):
+    rotas = RoteadorCallbacks()
+
+    def registrar(padrao, **opcoes):
+        @rotas.rota(padrao, **opcoes)
+        async def rota(query, context, **argumentos):
+            chamadas.append((padrao, argumentos))
+
+    registrar("menu_voltar")
+    registrar("ver_{tarefa_id:int}")
+    registrar("st_{tarefa_id:int}_{atual}_{novo}")
+    registrar("status_{tarefa_id:int}_{status:resto}")
+    registrar("changelog_menu")
+    registrar("changelog_ver_{changelog_id:int}")
+    registrar("changelog_edit_desc_{changelog_id:int}")
+    registrar("pag_{origem}_{direcao}_{cursor:int}_{filtro:resto}")
+    registrar("prior_{prioridade}", quando=lambda context: context.user_data.get("aguardando") == "prioridade")
+    return rotas
+
+
+def test_rota_exata(roteador, chamadas):
+    assert despachar(roteador, "menu_voltar")
+    assert chamadas == [("menu_voltar", {})]
+
+
+def test_parametros_convertidos(roteador, chamadas):
+    assert despachar(roteador, "ver_12")
+    assert despachar(roteador, "st_12_p_c")
+    assert chamadas == [
+        ("ver_{tarefa_id:int}", {"tarefa_id": 12}),
+        ("st_{tarefa_id:int}_{atual}_{novo}", {"tarefa_id": 12, "atual": "p", "novo": "c"}),
+    ]
+
+
+def test_resto_junta_partes_com_sublinhado(roteador, chamadas):
+    assert despachar(roteador, "status_3_em_andamento")
+    assert despachar(roteador, "pag_f_p_40_c_2_em_andamento")
+    assert chamadas == [
+        ("status_{tarefa_id:int}_{status:resto}", {"tarefa_id": 3, "status": "em_andamento"}),
+        ("pag_{origem}_{direcao}_{cursor:int}_{filtro:resto}",
+         {"origem": "f", "direcao": "p", "cursor": 40, "filtro": "c_2_em_andamento"}),
+    ]
+
+
+def test_prefixo_mais_longo_vence(roteador, chamadas):
+    assert despachar(roteador, "changelog_edit_desc_5")
+    assert despachar(roteador, "changelog_ver_5")
+    assert [padrao for padrao, _ in chamadas] == [
+        "changelog_edit_desc_{changelog_id:int}",
+        "changelog_ver_{changelog_id:int}",
+    ]
+
+
+@pytest.mark.parametrize("data", ["ver_abc", "ver_1_2", "ver_", "desconhecido", "", "st_1_p"])
+def test_dados_sem_rota(roteador, chamadas, data):
+    assert not despachar(roteador, data)
+    assert chamadas == []
+    assert roteador.desconhecidos == 1
+
+
+def test_quando_restringe_ao_estado_da_conversa(roteador, chamadas):
+    assert not despachar(roteador, "prior_alta", Contexto())
+    assert roteador.fora_de_contexto == 1
+    assert despachar(roteador, "prior_alta", Contexto(aguardando="prioridade"))
+    assert chamadas == [("prior_{prioridade}", {"prioridade": "alta"})]
+
+
+def test_metricas_por_rota(roteador):
+    despachar(roteador, "ver_1")
+    despachar(roteador, "ver_2")
+    metricas = roteador.metricas()
+    assert metricas["rotas"][0]["rota"] == "ver_{tarefa_id:int}"
+    assert metricas["rotas"][0]["chamadas"] == 2
+
+
+@pytest.mark.parametrize("padrao", [
+    "ver_{tarefa_id:int}",             # repetida
+    "x_{valor:float}",                 # tipo desconhecido
+    "x_{resto:resto}_{outro}",         # resto fora do fim
+    "x_{valor}_fixo",                  # parte fixa depois de parâmetro
+])
+def test_padroes_invalidos(roteador, padrao):
+    async def rota(query, context, **argumentos):
+        pass
+
+    with pytest.raises(ValueError):
+        roteador.adicionar(padrao, rota)
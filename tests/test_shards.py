@@ -0,0 +1,129 @@
+"""Roteamento por chat e despejo dos shards abertos"""
+import asyncio
+
+import pytest
+
+from database import Database
+from shards import RoteadorShards, chat_atual
+
+
+@pytest.fixture
+def fechados(monkeypatch):
+    """Caminhos dos Database fechados, na ordem"""
+    caminhos = []
+    original = Database.fechar
+
+    def fechar(self):
+        caminhos.append(self.db_name)
+        original(self)
+
+    monkeypatch.setattr(Database, "fechar", fechar)
+    return caminhos
+
+
+def no_chat(chat_id, corrotina):
+    """Roda ``corrotina`` em uma task própria com ``chat_atual`` definido (como um update)"""
+    async def update():
+        chat_atual.set(chat_id)
+        return await corrotina()
+    return asyncio.ensure_future(update())
+
+
+def test_cada_chat_tem_seu_banco(tmp_path):
+    async def cenario():
+        db = RoteadorShards(str(tmp_path), max_abertos=4)
+        try:
+            for chat_id, titulos in ((1, ["a"]), (2, ["b", "c"])):
+                for titulo in titulos:
+                    await no_chat(chat_id, lambda: db.criar_tarefa(titulo, "", 1, autor_id=1, autor_nome="Ana"))
+
+            assert db.chats() == [1, 2]
+            totais = await db.em_todos("contar_tarefas")
+            assert {chat: total["total"] for chat, total in totais.items()} == {1: 1, 2: 2}
+
+            # O wrapper de cada método é criado uma vez e escolhe o shard a cada chamada
+            assert db.contar_tarefas is db.contar_tarefas
+        finally:
+            await db.fechar()
+
+    asyncio.run(cenario())
+    assert (tmp_path / "chat_1.db").exists() and (tmp_path / "chat_2.db").exists()
+
+
+def test_despejo_fecha_o_menos_usado_e_reabre_com_os_dados(tmp_path, fechados):
+    async def cenario():
+        db = RoteadorShards(str(tmp_path), max_abertos=1)
+        try:
+            await no_chat(1, lambda: db.criar_tarefa("a", "", 1, autor_id=1, autor_nome="Ana"))
+            await db.abrir(2)
+            await asyncio.sleep(0.1)
+            assert fechados == [db.caminho(1)]
+            assert db.despejos == 1
+
+            with pytest.raises(LookupError):
+                db.shard(1)
+            assert (await (await db.abrir(1)).contar_tarefas())["total"] == 1
+            assert db.aberturas == 3
+        finally:
+            await db.fechar()
+
+    asyncio.run(cenario())
+
+
+def test_shard_retido_so_fecha_depois_do_update(tmp_path, fechados):
+    async def cenario():
+        db = RoteadorShards(str(tmp_path), max_abertos=1)
+        liberar = asyncio.Event()
+
+        async def update_longo():
+            retido = await db.reter()
+            await liberar.wait()
+            return retido
+
+        try:
+            tarefa = no_chat(1, update_longo)
+            await asyncio.sleep(0.05)
+            await db.abrir(2)
+            await asyncio.sleep(0.05)
+            # Despejado do LRU, mas sem fechar enquanto o update não termina
+            assert db.despejos == 1 and fechados == []
+            assert db.info_shards()["em_uso"] == 1
+
+            liberar.set()
+            retido = await tarefa
+            await asyncio.sleep(0.1)
+            assert fechados == [db.caminho(1)]
+
+            # Reabrir depois do fechamento cria um Database novo
+            assert await db.abrir(1) is not retido
+            assert db.aberturas == 3
+        finally:
+            await db.fechar()
+
+    asyncio.run(cenario())
+
+
+def test_despejado_em_uso_volta_sem_reabrir(tmp_path, fechados):
+    async def cenario():
+        db = RoteadorShards(str(tmp_path), max_abertos=1)
+        try:
+            liberar = asyncio.Event()
+
+            async def update_longo():
+                retido = await db.reter()
+                await liberar.wait()
+                # Despejado e ainda em uso: volta ao LRU em vez de abrir outro no arquivo
+                assert db.shard() is retido
+
+            tarefa = no_chat(1, update_longo)
+            await asyncio.sleep(0.05)
+            await db.abrir(2)
+            liberar.set()
+            await tarefa
+            assert db.aberturas == 2
+            await asyncio.sleep(0.1)
+            assert fechados == [db.caminho(2)]
+        finally:
+            await db.fechar()
+
+    asyncio.run(cenario())